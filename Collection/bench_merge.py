@@ -0,0 +1,96 @@
+"""
+Benchmark: chained pd.merge (the old merge.py) vs the key-index merge in merge.py.
+
+Builds a synthetic Dataset/ with every player file scaled `--scale` times
+(player names suffixed with the copy number) and runs each merge in its own
+process, reporting wall time and peak RSS above the interpreter + pandas baseline.
+
+    python -m Collection.bench_merge --scale 100
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import pandas as pd
+from Collection.merge import DATASET_DIR, merge_sources
+
+
+def legacy_merge(dataset_dir):
+    # The previous merge.py: one outer pd.merge per file, then fillna(0); limited to player files
+    csv_files = [path for path, _ in merge_sources(dataset_dir)]
+    dfs = []
+    column_groups = []
+    for f in csv_files:
+        df = pd.read_csv(f)
+        dfs.append(df)
+        column_groups.append([col for col in df.columns if col not in ["Player Name", "Team"]])
+    merged_df = dfs[0]
+    for df in dfs[1:]:
+        merged_df = pd.merge(merged_df, df, on=["Player Name", "Team"], how="outer")
+    merged_df = merged_df.fillna(0)
+    final_columns = ["Player Name", "Team"] + [col for group in column_groups for col in group]
+    return merged_df[final_columns]
+
+
+def make_dataset(target_dir, scale, source_dir=DATASET_DIR):
+    rows = 0
+    for path, _ in merge_sources(source_dir):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        copies = []
+        for i in range(scale):
+            copy = df.copy()
+            copy["Player Name"] = copy["Player Name"] + f" #{i}"
+            copies.append(copy)
+        scaled = pd.concat(copies, ignore_index=True)
+        scaled.to_csv(os.path.join(target_dir, os.path.basename(path)), index=False)
+        rows = max(rows, len(scaled))
+    return rows
+
+
+def _max_rss_mb():
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_one(method, dataset_dir):
+    from Collection.merge import merge_stats
+    baseline = _max_rss_mb()
+    start = time.perf_counter()
+    merged = legacy_merge(dataset_dir) if method == "legacy" else merge_stats(dataset_dir)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "method": method, "seconds": elapsed, "peak_mb": _max_rss_mb() - baseline,
+        "rows": len(merged), "frame_mb": merged.memory_usage(deep=True).sum() / 1e6,
+        "float_columns": int(sum(dtype.kind == "f" for dtype in merged.dtypes)),
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark chained vs key-index merge of the player CSVs.")
+    parser.add_argument("--scale", type=int, default=100, help="Copies of every player file")
+    parser.add_argument("--run", choices=["legacy", "indexed"], help=argparse.SUPPRESS)
+    parser.add_argument("--dataset-dir", default=DATASET_DIR, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.run:
+        run_one(args.run, args.dataset_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = make_dataset(tmp, args.scale)
+        print(f"{len(glob.glob(os.path.join(tmp, '*.csv')))} files, up to {rows} rows each ({args.scale}x)")
+        for method in ("legacy", "indexed"):
+            out = subprocess.run([sys.executable, "-m", "Collection.bench_merge", "--run", method, "--dataset-dir", tmp],
+                                 capture_output=True, text=True, check=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{method:<8} {result['seconds']:.2f}s, peak +{result['peak_mb']:.0f} MB, "
+                  f"{result['rows']} rows, frame {result['frame_mb']:.1f} MB, {result['float_columns']} float columns")
+
+
+if __name__ == "__main__":
+    main()
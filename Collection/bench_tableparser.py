@@ -0,0 +1,125 @@
+"""
+Benchmark: per-cell WebDriver extraction (the old scrape_table loop) vs one
+page_source snapshot parsed with Collection.tableparser.
+
+Fixtures are the stat pages in Collection/fixtures/stats_<config name>.html
+(see Collection/fixtures.py: reconstructed offline until replaced by
+`python -m Collection.fixtures capture`), or another directory of pages with
+the same names.
+
+    python -m Collection.bench_tableparser
+    python -m Collection.bench_tableparser --fixtures saved_pages/ --no-browser
+"""
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from contextlib import contextmanager
+import argparse
+import pathlib
+import sys
+import time
+from Collection.config import website_configs
+from Collection.driverpool import make_driver
+from Collection.fixtures import FIXTURE_DIR, fixture_path
+from Collection.tableparser import parse_stat_table
+
+TABLE_SELECTOR = "table.vbw-o-table.vbw-tournament-player-statistic-table.vbw-stats-scorers"
+
+
+def legacy_extract(driver, header_map, columns_to_keep):
+    # The original scrape_table body: one WebDriver command per element lookup/attribute/text
+    table = driver.find_element(By.CSS_SELECTOR, TABLE_SELECTOR)
+    th_elements = table.find_elements(By.TAG_NAME, "th")
+    for th in th_elements:
+        th.get_attribute("class")
+    data = {}
+    for row_elem in table.find_elements(By.CSS_SELECTOR, "tbody tr"):
+        cells = row_elem.find_elements(By.TAG_NAME, "td")
+        row_dict = {col: "0" for col in columns_to_keep}
+        for cell in cells:
+            for cls in cell.get_attribute("class").split():
+                if cls in header_map:
+                    row_dict[header_map[cls]] = cell.text if cell.text.strip() != "" else "0"
+        key = (row_dict.get("Player Name", ""), row_dict.get("Team", ""))
+        if key[0] and key[1]:
+            data[key] = row_dict
+    return data
+
+
+def snapshot_extract(driver, header_map, columns_to_keep):
+    return parse_stat_table(driver.page_source, header_map, columns_to_keep)
+
+
+@contextmanager
+def count_commands(driver):
+    # Every WebDriver and WebElement command goes through driver.execute
+    counter = {"commands": 0}
+    original = driver.execute
+
+    def execute(*args, **kwargs):
+        counter["commands"] += 1
+        return original(*args, **kwargs)
+
+    driver.execute = execute
+    try:
+        yield counter
+    finally:
+        del driver.execute
+
+
+def measure(driver, extract, config):
+    with count_commands(driver) as counter:
+        start = time.perf_counter()
+        data = extract(driver, config["header_map"], config["columns_to_keep"])
+        elapsed = time.perf_counter() - start
+    return data, counter["commands"], elapsed
+
+
+def load_fixtures(fixtures_dir=FIXTURE_DIR):
+    # {config name: saved page path}; raises FileNotFoundError naming every page not captured yet
+    pages = {config["name"]: pathlib.Path(fixture_path(f"stats_{config['name']}", fixtures_dir)).resolve()
+             for config in website_configs}
+    missing = [str(path) for path in pages.values() if not path.exists()]
+    if missing:
+        raise FileNotFoundError(f"Saved stat pages not found: {', '.join(missing)}. "
+                                f"Capture them with: python -m Collection.fixtures capture")
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Directory of saved stat pages named stats_<config name>.html")
+    parser.add_argument("--no-browser", action="store_true", help="Only time the in-process parser")
+    parser.add_argument("--repeat", type=int, default=5, help="Parser timing repetitions")
+    args = parser.parse_args(argv)
+
+    try:
+        pages = load_fixtures(args.fixtures)
+    except FileNotFoundError as e:
+        print(e)
+        return 1
+    driver = None if args.no_browser else make_driver(headless=True)
+    try:
+        print(f"{'table':<10} {'rows':>5} {'rpc old':>8} {'rpc new':>8} {'old s':>8} {'new s':>8} {'parse s':>8}  same")
+        for config in website_configs:
+            html = pages[config["name"]].read_text(encoding="utf-8")
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                parsed = parse_stat_table(html, config["header_map"], config["columns_to_keep"])
+            parse_time = (time.perf_counter() - start) / args.repeat
+            if driver is None:
+                print(f"{config['name']:<10} {len(parsed):>5} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {parse_time:>8.4f}     -")
+                continue
+            driver.get(pages[config["name"]].as_uri())
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, TABLE_SELECTOR)))
+            old, old_rpc, old_time = measure(driver, legacy_extract, config)
+            new, new_rpc, new_time = measure(driver, snapshot_extract, config)
+            print(f"{config['name']:<10} {len(new):>5} {old_rpc:>8} {new_rpc:>8} {old_time:>8.3f} {new_time:>8.3f} {parse_time:>8.4f}  {old == new}")
+    finally:
+        if driver is not None:
+            driver.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
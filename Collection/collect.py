@@ -0,0 +1,56 @@
+"""
+Run the whole collection phase (stat tables, player profiles, team standings,
+matches) through one shared pool of headless browsers, scheduled by the
+asyncio scraping engine:
+
+    python -m Collection.collect --workers 4
+    python -m Collection.collect --replay
+"""
+import argparse
+import sys
+from Collection.driverpool import DriverPool
+from Collection.engine import add_engine_arguments, engine_from_args
+from Collection.pagecache import add_cache_arguments, cache_from_args
+from Collection.personalscraper import scrape_profiles
+from Collection.webscraper import scrape_stat_tables
+from ML.matchdata import GENDER, SEASON_END, SEASON_START, scrape_matches
+from ML.teamdata import scrape_team_standings
+
+STAGES = ["tables", "profiles", "standings", "matches"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run all VNL scrapers on one shared browser pool.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of browsers in the shared pool")
+    parser.add_argument("--min-interval", type=float, default=0.0, help="Minimum seconds between page loads per browser")
+    parser.add_argument("--max-tasks", type=int, default=50, help="Pages a browser loads before it is recycled")
+    parser.add_argument("--only", nargs="+", choices=STAGES, default=STAGES, help="Run only these stages")
+    parser.add_argument("--max-age-days", type=float, default=None, help="Refetch stored player profiles older than this many days")
+    parser.add_argument("--incremental", action="store_true", help="Only scrape new or unfinished matches")
+    parser.add_argument("--season-start", default=SEASON_START, help="First schedule week to scan (YYYY-MM-DD)")
+    parser.add_argument("--season-end", default=SEASON_END, help="Last schedule week to scan (YYYY-MM-DD)")
+    parser.add_argument("--gender", default=GENDER, help="Competition gender on the schedule (men/women)")
+    add_cache_arguments(parser)
+    add_engine_arguments(parser)
+    args = parser.parse_args(argv)
+    cache = cache_from_args(args)
+
+    with DriverPool(size=args.workers, min_interval=args.min_interval, max_tasks=args.max_tasks) as pool, \
+            engine_from_args(args, pool) as engine:
+        if "tables" in args.only:
+            scrape_stat_tables(engine, cache=cache)
+        if "profiles" in args.only:
+            max_age = args.max_age_days * 24 * 60 * 60 if args.max_age_days is not None else None
+            scrape_profiles(engine, cache=cache, max_age=max_age)
+        if "standings" in args.only:
+            scrape_team_standings(engine, cache=cache)
+        failed = []
+        if "matches" in args.only:
+            failed = scrape_matches(engine, cache=cache, incremental=args.incremental, season_start=args.season_start,
+                                    season_end=args.season_end, gender=args.gender)
+        print(engine.summary())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
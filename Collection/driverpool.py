@@ -0,0 +1,157 @@
+"""
+Shared pool of headless Chrome drivers for all scrapers.
+
+Drivers start lazily, on the first task that actually needs a browser (cached
+pages and --replay runs never start one). Sessions are reused across tasks,
+health-checked before each use, and recycled after `max_tasks` pages.
+"""
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.chrome.options import Options
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+
+# Fonts are not needed to read the DOM; images are blocked via Chrome prefs
+BLOCKED_URLS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+
+
+def make_driver(headless=True):
+    # Lightweight page-load profile: eager load strategy, no images or web fonts
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    chrome_options.page_load_strategy = "eager"
+    service = ChromeService()
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    except Exception:
+        pass
+    return driver
+
+
+def driver_healthy(driver):
+    try:
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+
+class DriverPool:
+    """
+    Bounded pool of up to `size` headless Chrome drivers.
+    Each driver is used by one task at a time and waits at least `min_interval`
+    seconds between the pages it loads (per-worker rate limit).
+    """
+
+    def __init__(self, size=3, min_interval=0.0, headless=True, max_tasks=50):
+        self.size = max(1, int(size))
+        self.min_interval = min_interval
+        self.headless = headless
+        self.max_tasks = max_tasks
+        self._idle = queue.Queue()
+        self._drivers = set()
+        self._last_used = {}
+        self._tasks = {}
+        self._starting = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _start_driver(self):
+        driver = make_driver(headless=self.headless)
+        with self._lock:
+            self._drivers.add(driver)
+            self._last_used[id(driver)] = 0.0
+            self._tasks[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._drivers.discard(driver)
+            self._last_used.pop(id(driver), None)
+            self._tasks.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self):
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_start = len(self._drivers) + self._starting < self.size
+                if can_start:
+                    # Reserve the slot before the slow browser start
+                    self._starting += 1
+            if can_start:
+                try:
+                    return self._start_driver()
+                finally:
+                    with self._lock:
+                        self._starting -= 1
+            driver = self._idle.get()
+        # Recycle worn-out or dead sessions
+        with self._lock:
+            worn_out = self._tasks[id(driver)] >= self.max_tasks
+        if worn_out or not driver_healthy(driver):
+            self._discard(driver)
+            driver = self._start_driver()
+        with self._lock:
+            last = self._last_used[id(driver)]
+        delay = self.min_interval - (time.monotonic() - last)
+        if delay > 0:
+            time.sleep(delay)
+        return driver
+
+    def release(self, driver):
+        with self._lock:
+            self._last_used[id(driver)] = time.monotonic()
+            self._tasks[id(driver)] += 1
+        self._idle.put(driver)
+
+    def run(self, func, *args):
+        # Call func(driver, *args) on a pooled driver
+        driver = self.acquire()
+        try:
+            return func(driver, *args)
+        finally:
+            self.release(driver)
+
+    def map(self, func, items):
+        """
+        Run func(item) for every item on up to `size` threads, results in input order.
+        Tasks take a driver from the pool only when they need one (see fetch_page).
+        """
+        items = list(items)
+        if len(items) <= 1 or self.size == 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.size, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            drivers = list(self._drivers)
+            self._drivers = set()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
@@ -0,0 +1,233 @@
+"""
+Asyncio scraping engine shared by all scrapers.
+
+ScrapeEngine wraps a DriverPool and offers the same run/map interface, so the
+stage functions (and fetch_page) can be handed either one. Internally it runs
+an event loop on a background thread that schedules:
+
+- tasks from map() on an async queue, at most `concurrency` at a time;
+- page loads from run(), behind a global concurrency cap and a per-host token
+  bucket, retried with exponential backoff and full jitter;
+- a time budget per page: load functions size their waits with time_left(),
+  and a page is given up (PageTimeout) once its budget is spent.
+
+Selenium is blocking, so tasks and page loads execute on worker threads.
+Every load attempt is recorded by a PageRecorder (see instrument.py).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import asyncio
+import random
+import threading
+import time
+from Collection.instrument import (PageRecorder, add_metrics_arguments, instrument_driver, new_record, page_type,
+                                   recorder_from_args, recording)
+
+_local = threading.local()
+
+
+class PageTimeout(TimeoutError):
+    pass
+
+
+def time_left(default):
+    # Seconds a load function may wait: its default, capped by the current page's remaining budget
+    deadline = getattr(_local, "deadline", None)
+    if deadline is None:
+        return default
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise PageTimeout("page time budget spent")
+    return min(default, remaining)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ScrapeEngine:
+    def __init__(self, pool, concurrency=None, rate=1.0, burst=2, retries=2, backoff=1.0,
+                 max_backoff=30.0, page_budget=90.0, recorder=None):
+        self.pool = pool
+        self.recorder = recorder or PageRecorder()
+        self.concurrency = max(1, concurrency or pool.size)
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.page_budget = page_budget
+        self.stats = {"pages": 0, "retries": 0, "failures": 0, "timeouts": 0}
+        self._stats_lock = threading.Lock()
+        self._buckets = {}
+        # Task threads block on page-load threads, so both need room
+        self._executor = ThreadPoolExecutor(max_workers=2 * self.concurrency + 1, thread_name_prefix="scrape")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="scrape-engine", daemon=True)
+        self._thread.start()
+        self._page_slots = self._call(self._make_semaphore())
+
+    @property
+    def size(self):
+        return self.concurrency
+
+    async def _make_semaphore(self):
+        return asyncio.Semaphore(self.concurrency)
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    def _load_once(self, func, url, deadline, args, record):
+        # Runs on a worker thread: take a pooled driver and load within the page budget
+        driver = instrument_driver(self.pool.acquire())
+        _local.deadline = deadline
+        try:
+            with recording(record):
+                try:
+                    driver.set_page_load_timeout(max(1, time_left(self.page_budget)))
+                except PageTimeout:
+                    raise
+                except Exception:
+                    pass
+                return func(driver, url, *args)
+        finally:
+            _local.deadline = None
+            self.pool.release(driver)
+
+    def _finish(self, record, outcome, error=None):
+        record["outcome"] = outcome
+        record["error"] = f"{type(error).__name__}: {error}"[:300] if error is not None else None
+        self.recorder.add(record)
+
+    async def _run_page(self, func, url, args):
+        deadline = time.monotonic() + self.page_budget
+        attempt = 0
+        while True:
+            record = new_record(page_type(func), url, attempt)
+            queued = time.monotonic()
+            await self._bucket(url).acquire()
+            if time.monotonic() >= deadline:
+                self._count("timeouts")
+                error = PageTimeout(f"time budget spent before loading {url}")
+                self._finish(record, "timeout", error)
+                raise error
+            try:
+                async with self._page_slots:
+                    record["queued_s"] = time.monotonic() - queued
+                    result = await self._loop.run_in_executor(self._executor, self._load_once, func, url, deadline,
+                                                              args, record)
+                self._count("pages")
+                self._finish(record, "ok")
+                return result
+            except PageTimeout as e:
+                self._count("timeouts")
+                self._finish(record, "timeout", e)
+                raise
+            except Exception as e:
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                if time.monotonic() >= deadline:
+                    self._count("timeouts")
+                    self._finish(record, "timeout", e)
+                    raise
+                if attempt >= self.retries or time.monotonic() + delay >= deadline:
+                    self._count("failures")
+                    self._finish(record, "failed", e)
+                    raise
+                attempt += 1
+                self._count("retries")
+                record["backoff_s"] = delay
+                self._finish(record, "retry", e)
+                await asyncio.sleep(delay)
+
+    def run(self, func, url, *args):
+        """Load one page: func(driver, url, *args), rate limited, retried and time-boxed."""
+        return self._call(self._run_page(func, url, args))
+
+    async def _map(self, func, items):
+        queue = asyncio.Queue()
+        for index, item in enumerate(items):
+            queue.put_nowait((index, item))
+        results = [None] * len(items)
+        errors = []
+
+        async def worker():
+            while not queue.empty():
+                index, item = queue.get_nowait()
+                try:
+                    results[index] = await self._loop.run_in_executor(self._executor, func, item)
+                except Exception as e:
+                    errors.append(e)
+                    results[index] = e
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(items)) or 1)))
+        if errors:
+            raise errors[0]
+        return results
+
+    def map(self, func, items):
+        """Run func(item) for every item from the async task queue, results in input order."""
+        return self._call(self._map(func, list(items)))
+
+    def summary(self):
+        lines = [f"Engine: {self.stats['pages']} pages loaded, {self.stats['retries']} retries, "
+                 f"{self.stats['failures']} failures, {self.stats['timeouts']} timeouts"]
+        if self.recorder.records:
+            lines.append(self.recorder.summary())
+        if self.recorder.path:
+            lines.append(f"Page records appended to {self.recorder.path} (run {self.recorder.run_id})")
+        return "\n".join(lines)
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_engine_arguments(parser):
+    parser.add_argument("--rate", type=float, default=1.0, help="Page loads per second per host (token bucket rate)")
+    parser.add_argument("--burst", type=int, default=2, help="Page loads a host may receive back to back")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per page after a failed load")
+    parser.add_argument("--page-budget", type=float, default=90.0, help="Seconds a page (including retries) may take before it is given up")
+    add_metrics_arguments(parser)
+
+
+def engine_from_args(args, pool):
+    return ScrapeEngine(pool, rate=args.rate, burst=args.burst, retries=args.retries, page_budget=args.page_budget,
+                        recorder=recorder_from_args(args))
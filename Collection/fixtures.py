@@ -0,0 +1,467 @@
+"""
+Saved real pages for checking the in-process parsers against the scraped data.
+
+Each fixture is one page exactly as the site served it (driver.page_source),
+stored as Collection/fixtures/<name>.html with its URL in manifest.json.
+`check` parses every captured fixture with the code the scrapers use and
+compares the result with the rows already committed under Dataset/ and ML/:
+
+- stats_<table>: parse_stat_table + stat_rows == Dataset/<table>_stats.csv
+- profiles:      parse_player_links (Player Name, Team) == Dataset/player_profiles.csv
+- profile:       parse_player_bio == that player's row of Dataset/player_profiles.csv
+- standings:     parse_ranking_table == ML/team_stats.csv
+- schedule:      every parse_match_links link (last week) is in Dataset/match_links.csv
+- match:         parse_match_page + build_match_row == its row of ML/match_set_stats.csv
+
+A fixture that parses to no rows fails the check.
+
+The committed fixtures were reconstructed offline from those same rows in the
+site's markup (the classes and structure the scrapers select on, with page
+chrome, hidden labels, abbreviations and a non-advanced standings table around
+them), so they check the parsers against the site's structure, not its live
+content. The manifest records each page's "source"; `capture` replaces them
+with the pages the site serves.
+
+    python -m Collection.fixtures capture                # live, one headless browser
+    python -m Collection.fixtures capture --from-cache   # copy pages from .pagecache
+    python -m Collection.fixtures reconstruct            # rebuild the offline pages
+    python -m Collection.fixtures check
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from html import escape
+from urllib.parse import parse_qs, urlparse
+from Collection.config import website_configs
+from Collection.pagecache import CACHE_DIR, PageCache, _atomic_write
+from Collection.tableparser import parse_match_links, parse_match_page, parse_player_bio, parse_player_links, \
+    parse_ranking_table, parse_stat_table
+from Collection.teams import TeamRegistry, team_key
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_DIR = os.path.join(ROOT_DIR, "Collection", "fixtures")
+MANIFEST_FILE = os.path.join(FIXTURE_DIR, "manifest.json")
+DATASET_DIR = os.path.join(ROOT_DIR, "Dataset")
+PROFILES_FILE = os.path.join(DATASET_DIR, "player_profiles.csv")
+FIXTURE_NAMES = [f"stats_{config['name']}" for config in website_configs] + \
+    ["profiles", "profile", "standings", "schedule", "match"]
+
+
+def read_rows(path):
+    # CSV rows without the header
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def load_manifest(path=MANIFEST_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fixture_path(name, fixture_dir=FIXTURE_DIR):
+    return os.path.join(fixture_dir, f"{name}.html")
+
+
+def captured(fixture_dir=FIXTURE_DIR):
+    # Names of the fixtures with a saved page and a manifest entry
+    manifest = load_manifest(os.path.join(fixture_dir, "manifest.json"))
+    return [name for name in FIXTURE_NAMES if name in manifest and os.path.exists(fixture_path(name, fixture_dir))]
+
+
+def _stats_rows(config):
+    from Collection.webscraper import stat_rows
+
+    def rows(html, entry):
+        parsed = stat_rows(config, parse_stat_table(html, config["header_map"], config["columns_to_keep"]))
+        return parsed, read_rows(os.path.join(DATASET_DIR, f"{config['name']}_stats.csv"))
+    return rows
+
+
+def _profiles_rows(html, entry):
+    parsed = [[info["Player Name"], info["Team"]] for info in parse_player_links(html, entry["url"])]
+    return parsed, [row[:2] for row in read_rows(PROFILES_FILE)]
+
+
+def _profile_rows(html, entry):
+    from Collection.personalscraper import PROFILE_FIELDS
+    parsed = list(parse_player_bio(html, PROFILE_FIELDS).values())
+    expected = [row[2:] for row in read_rows(PROFILES_FILE) if row[:2] == entry["player"]]
+    return [parsed], expected
+
+
+def _standings_rows(html, entry):
+    return parse_ranking_table(html), read_rows(os.path.join(ROOT_DIR, "ML", "team_stats.csv"))
+
+
+def _schedule_rows(html, entry):
+    from ML.matchdata import MATCH_LINKS_FILE
+    parsed = [[link["date"], link["match_url"]] for link in parse_match_links(html, entry["url"])]
+    known = read_rows(MATCH_LINKS_FILE)
+    return parsed, [row for row in parsed if row in known]
+
+
+def _match_rows(html, entry):
+    from ML.matchdata import MATCH_FILE, STAT_NAME_MAPPING, build_match_row, match_data, match_key_from_link, \
+        match_key_from_row
+    link = {"date": entry["date"], "match_url": entry["url"]}
+    row = build_match_row(link, match_data(parse_match_page(html, list(STAT_NAME_MAPPING))))
+    parsed = ["" if value is None else value for value in row]  # csv.writer writes None as ""
+    expected = [row for row in read_rows(MATCH_FILE) if match_key_from_row(row) == match_key_from_link(link)]
+    return [parsed], expected
+
+
+ROWS = dict({f"stats_{config['name']}": _stats_rows(config) for config in website_configs},
+            profiles=_profiles_rows, profile=_profile_rows, standings=_standings_rows, schedule=_schedule_rows,
+            match=_match_rows)
+
+
+def compare(name, fixture_dir=FIXTURE_DIR):
+    """
+    Parse one captured fixture and compare it with the data files. Returns a
+    list of problems (empty when the parsed rows equal the committed rows).
+    """
+    entry = load_manifest(os.path.join(fixture_dir, "manifest.json"))[name]
+    with open(fixture_path(name, fixture_dir), encoding="utf-8") as f:
+        parsed, expected = ROWS[name](f.read(), entry)
+    if not parsed:
+        return [f"{name}: parsed no rows from {entry['url']}"]
+    problems = []
+    if len(parsed) != len(expected):
+        problems.append(f"{name}: {len(parsed)} parsed rows, {len(expected)} expected")
+    for i, (got, want) in enumerate(zip(parsed, expected)):
+        if got != want:
+            problems.append(f"{name}: row {i + 1} parsed {got}, expected {want}")
+            break
+    return problems
+
+
+def fixture_urls(pages):
+    # {name: manifest entry} to capture; profile and match depend on already-known pages and links
+    from Collection.personalscraper import url as profiles_url
+    from ML.matchdata import MATCH_LINKS_FILE, week_urls
+    from ML.teamdata import url as standings_url
+    entries = {f"stats_{config['name']}": {"url": config["url"]} for config in website_configs}
+    entries["profiles"] = {"url": profiles_url}
+    entries["standings"] = {"url": standings_url}
+    entries["schedule"] = {"url": week_urls()[0]}
+    links = read_rows(MATCH_LINKS_FILE)
+    if links:
+        entries["match"] = {"url": links[0][1], "date": links[0][0]}
+    if "profiles" in pages:
+        players = [info for info in parse_player_links(pages["profiles"], profiles_url) if info["Profile Link"]]
+        if players:
+            entries["profile"] = {"url": players[0]["Profile Link"],
+                                  "player": [players[0]["Player Name"], players[0]["Team"]]}
+    return entries
+
+
+def _loader(name):
+    if name.startswith("stats_") or name == "profiles":
+        from Collection.webscraper import load_table_page
+        return load_table_page
+    if name == "profile":
+        from Collection.personalscraper import load_profile_page
+        return load_profile_page
+    if name == "standings":
+        from ML.teamdata import load_standings_page
+        return load_standings_page
+    if name == "schedule":
+        from ML.matchdata import load_week_page
+        return load_week_page
+    from ML.matchdata import load_match_page
+    return load_match_page
+
+
+def capture(names, from_cache=False, cache_dir=CACHE_DIR, fixture_dir=FIXTURE_DIR):
+    """
+    Save the pages for `names` (live with one headless browser, or from the
+    page cache) and record their URLs in the manifest. Returns the names that
+    could not be captured.
+    """
+    os.makedirs(fixture_dir, exist_ok=True)
+    manifest_path = os.path.join(fixture_dir, "manifest.json")
+    manifest = load_manifest(manifest_path)
+    cache = PageCache(cache_dir, replay=True) if from_cache else None
+    driver = None
+    pages, failed = {}, []
+    try:
+        # profiles first: the profile fixture is the first player linked from it
+        for name in sorted(names, key=lambda n: n == "profile"):
+            entry = fixture_urls(pages).get(name)
+            if entry is None:
+                print(f"{name}: no URL to capture (needs the profiles page / Dataset/match_links.csv)")
+                failed.append(name)
+                continue
+            if cache is not None:
+                html = cache.get(entry["url"])
+            else:
+                if driver is None:
+                    from Collection.driverpool import make_driver
+                    driver = make_driver(headless=True)
+                html = _loader(name)(driver, entry["url"])
+            if html is None:
+                print(f"{name}: {entry['url']} is not in the page cache")
+                failed.append(name)
+                continue
+            pages[name] = html
+            _atomic_write(fixture_path(name, fixture_dir), html)
+            manifest[name] = dict(entry, source="captured")
+            print(f"{name}: saved {entry['url']}")
+    finally:
+        if driver is not None:
+            driver.quit()
+        if pages:
+            _atomic_write(manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False) + "\n")
+    return failed
+
+
+def _page(title, body):
+    # The chrome every page shares: scripts, styles, navigation and hidden templates around the content
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{escape(title)} | Volleyball World</title>
+<link rel="stylesheet" href="/assets/vbw.css">
+<style>.d-none{{display:none}} .vbw-o-table__cell{{padding:4px}}</style>
+<script>window.dataLayer = window.dataLayer || []; dataLayer.push({{"page": "{escape(title)}"}});</script>
+</head>
+<body class="vbw-body">
+<header class="vbw-header"><nav class="vbw-nav"><ul>
+<li><a href="/volleyball/competitions/volleyball-nations-league/">VNL</a></li>
+<li><a href="/volleyball/competitions/volleyball-nations-league/schedule/">Schedule</a></li>
+<li><a href="/volleyball/competitions/volleyball-nations-league/standings/men/">Standings</a></li>
+<li><a href="/volleyball/competitions/volleyball-nations-league/statistics/men/best-scorers/">Statistics</a></li>
+</ul></nav></header>
+<template id="vbw-cookie-banner"><div class="vbw-cookie"><p>We use cookies</p><button>Accept</button></div></template>
+<main class="vbw-main">
+{body}
+</main>
+<footer class="vbw-footer"><p>&copy; Volleyball World</p></footer>
+<noscript><p>Enable JavaScript to see this page</p></noscript>
+<script src="/assets/vbw.js" defer></script>
+</body>
+</html>
+"""
+
+
+def _cell(cls, value, label=None):
+    # A table cell with the column label the mobile layout shows (hidden on desktop)
+    hidden = f'<span class="d-none" style="display:none">{escape(label)}</span>' if label else ""
+    return f'<td class="vbw-o-table__cell {cls}">{hidden}{escape(value)}</td>'
+
+
+def _player_href(name, team):
+    return f"/volleyball/competitions/volleyball-nations-league/teams/men/{team.lower()}/players/{team_key(name)}"
+
+
+def _player_table(columns, rows):
+    # A player statistic table: `columns` is [(cell class, label)], rows are lists of cell values
+    head = "".join(f'<th class="vbw-o-table__header {cls}">{escape(label)}</th>' for cls, label in columns)
+    body = []
+    for values in rows:
+        cells = []
+        for (cls, label), value in zip(columns, values):
+            if cls == "playername":
+                cells.append(f'<td class="vbw-o-table__cell playername"><a href="{_player_href(value, values[2])}">'
+                             f'<span class="vbw-o-table__player-name">{escape(value)}</span></a></td>')
+            else:
+                cells.append(_cell(cls, value, label))
+        body.append(f'<tr class="vbw-o-table__row">{"".join(cells)}</tr>')
+    return ('<table class="vbw-o-table vbw-tournament-player-statistic-table vbw-stats-scorers">'
+            f'<thead><tr>{head}</tr></thead><tbody>\n' + "\n".join(body) + '\n</tbody></table>')
+
+
+def _render_stats(config):
+    # Kept columns from the CSV; the rank and the two derived columns the site also shows
+    labels = {value: key for key, value in config["header_map"].items()}
+    kept = config["columns_to_keep"]
+    columns = [("rank", "Rank")] + [(labels[col], col) for col in kept] + \
+        [(labels[col], col) for col in config["header_map"].values() if col not in kept and col != "Rank"]
+    rows = []
+    for rank, row in enumerate(read_rows(os.path.join(DATASET_DIR, f"{config['name']}_stats.csv")), 1):
+        total = sum(float(value) for value in row[2:5])
+        success = f"{100 * float(row[2]) / total:.2f}" if total else "0"
+        rows.append([str(rank)] + row + [success, f"{total:g}"])
+    return _page(f"Best {config['name']}", f"<h1>Statistics</h1>\n{_player_table(columns, rows)}")
+
+
+def _render_profiles():
+    columns = [("rank", "Rank"), ("playername", "Player Name"), ("federation", "Team")]
+    rows = [[str(rank), row[0], row[1]] for rank, row in enumerate(read_rows(PROFILES_FILE), 1)]
+    return _page("Best scorers", f"<h1>Best Scorers</h1>\n{_player_table(columns, rows)}")
+
+
+def _render_profile(entry):
+    from Collection.personalscraper import PROFILE_FIELDS
+    profile = next(row for row in read_rows(PROFILES_FILE) if row[:2] == entry["player"])
+    bio = [("Team", profile[1])] + list(zip(PROFILE_FIELDS, profile[2:]))
+    cols = "".join(f'<div class="vbw-player-bio-col"><div class="vbw-player-bio-head">{escape(head)}</div>'
+                   f'<div class="vbw-player-bio-text">{escape(value)}</div></div>' for head, value in bio)
+    return _page(profile[0], f'<h1 class="vbw-player-name">{escape(profile[0])}</h1>\n'
+                             f'<div class="vbw-player-bio">{cols}</div>')
+
+
+def _render_standings():
+    headers = ["Rank", "Team", "Total", "Won", "Lost", "3-0", "3-1", "3-2", "2-3", "1-3", "0-3", "Points",
+               "Sets Won", "Sets Lost", "Set Ratio", "Points Won", "Points Lost", "Point Ratio"]
+    rows = read_rows(os.path.join(ROOT_DIR, "ML", "team_stats.csv"))
+
+    def table(classes, columns):
+        head = "".join(f"<th>{escape(headers[i])}</th>" for i in columns)
+        body = "\n".join('<tr class="vbw-o-table__row">' + "".join(
+            f'<td class="vbw-o-table__cell"><img class="vbw-flag" src="/flags/{escape(team_key(row[1]))}.png" alt="">'
+            f'{escape(row[i])}</td>' if i == 1 else _cell("", row[i]) for i in columns) + "</tr>" for row in rows)
+        return f'<table class="{classes}"><thead><tr>{head}</tr></thead><tbody>\n{body}\n</tbody></table>'
+
+    tabs = ('<ul class="vbw-tabs"><li><a class="basic-mode" href="#basic">Basic</a></li>'
+            '<li><a class="advanced-mode" href="#advanced">Advanced</a></li></ul>')
+    return _page("Standings", f"<h1>Standings</h1>\n{tabs}\n"
+                              f"{table('vbw-o-table vbw-ranking-table basic', [0, 1, 2, 3, 4, 11])}\n"
+                              f"{table('vbw-o-table vbw-ranking-table advanced', range(len(headers)))}")
+
+
+def _render_schedule(entry):
+    # Date rows for the men's matches of the week starting at the URL's fromDate
+    from ML.matchdata import MATCH_LINKS_FILE, format_match_date
+    start = datetime.strptime(parse_qs(urlparse(entry["url"]).fragment)["fromDate"][0], "%Y-%m-%d").date()
+    days = {}
+    for date, match_url in read_rows(MATCH_LINKS_FILE):
+        day = datetime.strptime(format_match_date(date), "%Y-%m-%d").date()
+        if start <= day < start + timedelta(days=7):
+            days.setdefault(date, []).append(match_url)
+    rows = []
+    for date, urls in days.items():
+        items = "".join(
+            f'<div class="vbw-gs2-match-item"><div class="vbw-gs2-match-data-card">'
+            f'<p class="vbw-gs2-match-gender">Men</p>'
+            f'<p class="vbw-gs2-match-teams">{escape(parse_qs(urlparse(url).query)["match"][0].replace("-", " "))}</p>'
+            f'<a href="{escape(urlparse(url).path + "?" + urlparse(url).query)}">Match centre</a></div></div>'
+            for url in urls)
+        rows.append(f'<div class="vbw-gs2-date-row" data-date="{escape(date)}">'
+                    f'<h3>{escape(date[:15])}</h3>{items}</div>')
+    nav = ('<div class="weekly-nav-text-wrap">Week</div>'
+           '<a class="vbw-gs2-weekly-nav-prev vbw-gs2-comp-weekly-nav" href="#">Previous week</a>')
+    return _page("Schedule", f'{nav}\n<div class="vbw-gs2-matches-container">\n' + "\n".join(rows) + "\n</div>")
+
+
+def _render_match(entry):
+    from ML.matchdata import MATCH_FILE, STAT_NAME_MAPPING, match_csv_header, match_key_from_link, \
+        match_key_from_row
+    header = match_csv_header()
+    link = {"date": entry["date"], "match_url": entry["url"]}
+    row = dict(zip(header, next(row for row in read_rows(MATCH_FILE)
+                                if match_key_from_row(row) == match_key_from_link(link))))
+    sets = [(row[f"Set{i} Home"], row[f"Set{i} Away"]) for i in range(1, 6) if row[f"Set{i} Home"] != ""]
+    won = {"Home": sum(int(a) > int(b) for a, b in sets), "Away": sum(int(b) > int(a) for a, b in sets)}
+
+    def team(side):
+        name = row[f"{side} Team"]
+        return (f'<div class="vbw-mu__team vbw-mu__team--{side.lower()}">'
+                f'<div class="vbw-mu__team__name">{escape(name)}</div>'
+                f'<div class="vbw-mu__team__name vbw-mu__team__name--abbr">{TeamRegistry().code(name)}</div>'
+                f'</div>')
+
+    def score(side):
+        winner = " winner" if row["Winner"] == row[f"{side} Team"] else ""
+        return f'<div class="vbw-mu__score vbw-mu__score--{side.lower()}{winner}">{won[side]}</div>'
+
+    set_divs = "".join(f'<div class="vbw-mu__sets--result" data-set-no="{i}"><span class="vbw-mu__pointA">{a}</span>'
+                       f'<span class="vbw-mu__pointB">{b}</span></div>' for i, (a, b) in enumerate(sets, 1))
+    stat_rows = "\n".join(
+        f'<tr class="vbw-o-table__row {key}"><td class="vbw-o-table__cell -td-teamA"><span>{row[f"{name} Home"]}</span></td>'
+        f'<td class="vbw-o-table__cell -td-label">{escape(name)}</td>'
+        f'<td class="vbw-o-table__cell -td-teamB"><span>{row[f"{name} Away"]}</span></td></tr>'
+        for key, name in STAT_NAME_MAPPING.items())
+    body = (f'<div class="vbw-mu">{team("Home")}{score("Home")}{score("Away")}{team("Away")}</div>\n'
+            f'<div class="vbw-mu__sets">{set_divs}</div>\n'
+            f'<table class="vbw-o-table vbw-match-team-stats"><tbody>\n{stat_rows}\n</tbody></table>')
+    return _page(f"{row['Home Team']} vs {row['Away Team']}", body)
+
+
+def render(name, entry):
+    # The reconstructed page for one fixture
+    if name.startswith("stats_"):
+        return _render_stats(next(config for config in website_configs if f"stats_{config['name']}" == name))
+    if name == "profiles":
+        return _render_profiles()
+    if name == "profile":
+        return _render_profile(entry)
+    if name == "standings":
+        return _render_standings()
+    if name == "schedule":
+        return _render_schedule(entry)
+    return _render_match(entry)
+
+
+def reconstruct(names, fixture_dir=FIXTURE_DIR):
+    """
+    Write the offline pages for `names`, rendered from the committed rows, and
+    record them in the manifest with source "reconstructed". Returns the names
+    that have no URL to stand for.
+    """
+    os.makedirs(fixture_dir, exist_ok=True)
+    manifest_path = os.path.join(fixture_dir, "manifest.json")
+    manifest = load_manifest(manifest_path)
+    failed, pages = [], {}
+    for name in sorted(names, key=lambda n: n == "profile"):
+        entry = fixture_urls(pages).get(name)
+        if entry is None:
+            print(f"{name}: no URL to reconstruct (needs Dataset/match_links.csv)")
+            failed.append(name)
+            continue
+        pages[name] = render(name, entry)
+        _atomic_write(fixture_path(name, fixture_dir), pages[name])
+        manifest[name] = dict(entry, source="reconstructed")
+        print(f"{name}: reconstructed {entry['url']}")
+    if pages:
+        _atomic_write(manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False) + "\n")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capture real pages and check the parsers against the scraped data.")
+    parser.add_argument("command", choices=["capture", "reconstruct", "check"])
+    parser.add_argument("names", nargs="*", help=f"Fixtures (default: all): {', '.join(FIXTURE_NAMES)}")
+    parser.add_argument("--from-cache", action="store_true", help="Copy pages from the page cache instead of a browser")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Page cache directory (with --from-cache)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in FIXTURE_NAMES]
+    if unknown:
+        parser.error(f"unknown fixtures: {', '.join(unknown)}")
+    names = args.names or FIXTURE_NAMES
+
+    if args.command == "capture":
+        if "profile" in names and "profiles" not in names:
+            names = names + ["profiles"]  # the profile page is found through the players table
+        failed = capture(names, args.from_cache, args.cache_dir)
+        return 1 if failed else 0
+    if args.command == "reconstruct":
+        if "profile" in names and "profiles" not in names:
+            names = names + ["profiles"]
+        return 1 if reconstruct(names) else 0
+
+    available = captured()
+    manifest = load_manifest()
+    missing = [name for name in names if name not in available]
+    problems = []
+    for name in names:
+        if name in available:
+            found = compare(name)
+            problems.extend(found)
+            print(f"{name}: {'OK' if not found else 'MISMATCH'} ({manifest[name].get('source', 'captured')})")
+    for problem in problems:
+        print(problem)
+    if missing:
+        print(f"Not captured yet: {', '.join(missing)}. Run: python -m Collection.fixtures capture")
+    return 1 if problems or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
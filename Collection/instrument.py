@@ -0,0 +1,226 @@
+"""
+Per-page instrumentation for the scrapers.
+
+The scraping engine opens one record per page load attempt and the load
+functions report into it through the current thread:
+
+- navigation time (WebDriver "get" commands) and the total WebDriver command
+  count, from a counting wrapper around driver.execute;
+- time spent in explicit waits (timed_wait) and sleeps (pause), and how much of
+  the waiting ended in a timeout;
+- queueing time before the load, the outcome (ok, retry, failed or timeout)
+  and the backoff slept before a retry.
+
+Records are appended to a JSONL file as they complete and summarised at the end
+of a run (p50/p95 per page type, time lost to timeouts). An existing file can be
+summarised again with:
+
+    python -m Collection.instrument scrape_metrics.jsonl
+"""
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+import argparse
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+METRICS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scrape_metrics.jsonl")
+NAVIGATION_COMMANDS = {"get"}
+
+_local = threading.local()
+
+
+def current_record():
+    return getattr(_local, "record", None)
+
+
+def page_type(func):
+    # "load_match_page" -> "match"
+    name = getattr(func, "__name__", "page")
+    if name.startswith("load_"):
+        name = name[len("load_"):]
+    if name.endswith("_page"):
+        name = name[:-len("_page")]
+    return name
+
+
+def new_record(kind, url, attempt=0):
+    return {
+        "type": kind, "url": url, "attempt": attempt, "outcome": None, "error": None,
+        "queued_s": 0.0, "elapsed_s": 0.0, "navigation_s": 0.0, "wait_s": 0.0,
+        "wait_timeout_s": 0.0, "sleep_s": 0.0, "backoff_s": 0.0, "commands": 0,
+    }
+
+
+class recording:
+    """Makes record the current thread's record for the duration of a page load."""
+
+    def __init__(self, record):
+        self.record = record
+
+    def __enter__(self):
+        self.previous = current_record()
+        _local.record = self.record
+        self.start = time.monotonic()
+        return self.record
+
+    def __exit__(self, *exc):
+        self.record["elapsed_s"] += time.monotonic() - self.start
+        _local.record = self.previous
+
+
+def _add(key, value):
+    record = current_record()
+    if record is not None:
+        record[key] += value
+
+
+def instrument_driver(driver):
+    # Count every WebDriver command (one HTTP round trip each) and time navigations
+    if getattr(driver, "_instrumented", False):
+        return driver
+    execute = driver.execute
+
+    def counting_execute(command, params=None):
+        start = time.monotonic()
+        try:
+            return execute(command, params)
+        finally:
+            _add("commands", 1)
+            if command in NAVIGATION_COMMANDS:
+                _add("navigation_s", time.monotonic() - start)
+
+    driver.execute = counting_execute
+    driver._instrumented = True
+    return driver
+
+
+class TimedWait(WebDriverWait):
+    """WebDriverWait that books its time as wait time, and as timeout time when it gives up."""
+
+    def _timed(self, until, method, message):
+        start = time.monotonic()
+        try:
+            return until(method, message)
+        except TimeoutException:
+            _add("wait_timeout_s", time.monotonic() - start)
+            raise
+        finally:
+            _add("wait_s", time.monotonic() - start)
+
+    def until(self, method, message=""):
+        return self._timed(super().until, method, message)
+
+    def until_not(self, method, message=""):
+        return self._timed(super().until_not, method, message)
+
+
+def timed_wait(driver, timeout, **kwargs):
+    return TimedWait(driver, timeout, **kwargs)
+
+
+def pause(seconds):
+    # time.sleep that is booked as sleep time on the current page
+    _add("sleep_s", seconds)
+    time.sleep(seconds)
+
+
+def percentile(values, q):
+    # Nearest-rank percentile of a list of numbers (0 for an empty list)
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered) / 100) - 1))
+    return ordered[index]
+
+
+def time_lost_to_timeouts(records):
+    # Whole attempts that hit the page budget, plus explicit waits that timed out elsewhere
+    return sum(r["elapsed_s"] if r["outcome"] == "timeout" else r["wait_timeout_s"] for r in records)
+
+
+def summarize(records):
+    """Summary lines: per page type counts and p50/p95 timings, then the time lost to timeouts."""
+    by_type = {}
+    for record in records:
+        by_type.setdefault(record["type"], []).append(record)
+    lines = ["Page timings in seconds (p50/p95):"]
+    for kind in sorted(by_type):
+        group = by_type[kind]
+        loaded = [r for r in group if r["outcome"] == "ok"]
+        retries = sum(1 for r in group if r["outcome"] == "retry")
+        failures = sum(1 for r in group if r["outcome"] == "failed")
+        timeouts = sum(1 for r in group if r["outcome"] == "timeout")
+        timings = ", ".join(
+            f"{label} {percentile([r[key] for r in loaded], 50):.2f}/{percentile([r[key] for r in loaded], 95):.2f}"
+            for label, key in (("total", "elapsed_s"), ("nav", "navigation_s"), ("wait", "wait_s"),
+                               ("sleep", "sleep_s"), ("queued", "queued_s"))
+        )
+        commands = sum(r["commands"] for r in loaded) / len(loaded) if loaded else 0.0
+        lines.append(f"  {kind:<10} {len(loaded)} loaded, {retries} retries, {failures} failures, {timeouts} timeouts | "
+                     f"{timings} | {commands:.1f} commands/page")
+    lines.append(f"Time lost to timeouts: {time_lost_to_timeouts(records):.1f}s")
+    return lines
+
+
+class PageRecorder:
+    """Collects page records in memory and appends each one to a JSONL file (if path is set)."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def add(self, record):
+        record = dict(record, run=self.run_id, at=time.time())
+        for key, value in record.items():
+            if isinstance(value, float):
+                record[key] = round(value, 4)
+        with self._lock:
+            self.records.append(record)
+            if self.path:
+                with open(self.path, mode="a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def summary(self):
+        with self._lock:
+            records = list(self.records)
+        return "\n".join(summarize(records))
+
+
+def load_records(path, run=None):
+    # Records from a metrics file; run=None selects the last run in the file
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if run is None and records:
+        run = records[-1]["run"]
+    return [r for r in records if run == "all" or r["run"] == run]
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics", default=METRICS_FILE, help="Append per-page timing records (JSONL) to this file")
+    parser.add_argument("--no-metrics", action="store_true", help="Do not write per-page timing records")
+
+
+def recorder_from_args(args):
+    return PageRecorder(None if args.no_metrics else args.metrics)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise scraper page timings from a metrics JSONL file.")
+    parser.add_argument("path", nargs="?", default=METRICS_FILE, help="Metrics file written by the scrapers")
+    parser.add_argument("--run", default=None, help="Run id to summarise, or 'all' (default: the last run)")
+    args = parser.parse_args(argv)
+    records = load_records(args.path, args.run)
+    print(f"{len(records)} page records")
+    print("\n".join(summarize(records)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,180 @@
-import pandas as pd
-import glob
+"""
+Merge the per-player CSVs in Dataset/ into merged_stats.csv.
+
+Only the stat files named in config.py and player_profiles.csv take part; other
+CSVs in Dataset/ (match_links.csv) are ignored. Each stat file is read with an
+explicit schema from its `columns_to_keep` (counts as int32, per-match rates as
+float64), so nothing is re-inferred or widened to float by fillna. Instead of a
+chain of outer merges, the files are read one at a time: each extends a shared
+(Player Name, Team) key index and keeps its typed value arrays and their key
+slots, and the output columns are then filled in one scatter per column in
+sorted key order.
+
+Two players can share a name and team (both "Petkov, BUL" profiles).
+player_profiles.csv is the file that tells them apart, so every profile keeps
+its own row; the stat files list such a key once, and that row's values go to
+each of the key's profiles, as an outer merge on (Player Name, Team) would.
+The repeated profiles are reported in merged.attrs["repeated_profiles"]. A key
+repeated within a stat file cannot be matched to a profile, so that file's rows
+for the key are left out and reported in merged.attrs["duplicate_keys"]. The
+command line prints both.
+
+    python -m Collection.merge
+"""
+import argparse
 import os
+import numpy as np
+import pandas as pd
+from Collection.config import website_configs
+
+DATASET_DIR = "Dataset"
+OUTPUT_FILE = "merged_stats.csv"
+KEY_COLUMNS = ["Player Name", "Team"]
+KEY_SEPARATOR = "\x1f"  # sorts before any printable character, so keys sort like (name, team) tuples
+PROFILE_FILE = "player_profiles.csv"
+PROFILE_SCHEMA = {"Player Name": object, "Team": object, "Position": "string", "Age": "Int16", "Height": "string"}
+
+
+def stat_schema(config):
+    # Names as strings, "... Per Match" rates as floats, everything else an integer count
+    schema = {}
+    for col in config["columns_to_keep"]:
+        if col in KEY_COLUMNS:
+            schema[col] = object
+        elif col.endswith("Per Match"):
+            schema[col] = "float64"
+        else:
+            schema[col] = "int32"
+    return schema
+
+
+def read_with_schema(path, schema):
+    # Parse counts straight to int32 in the C reader; fall back to nullable ints if a file has blank cells
+    try:
+        return pd.read_csv(path, usecols=list(schema), dtype=schema)
+    except ValueError:
+        nullable = {col: "Int32" if dtype == "int32" else dtype for col, dtype in schema.items()}
+        return pd.read_csv(path, usecols=list(schema), dtype=nullable)
+
+
+def merge_sources(dataset_dir=DATASET_DIR, configs=website_configs):
+    # [(path, schema)] for player_profiles.csv and every configured stat file, in config order
+    sources = [(os.path.join(dataset_dir, PROFILE_FILE), PROFILE_SCHEMA)]
+    for config in configs:
+        sources.append((os.path.join(dataset_dir, f"{config['name']}_stats.csv"), stat_schema(config)))
+    return [(path, schema) for path, schema in sources if os.path.exists(path)]
+
+
+def player_keys(df):
+    # "Player Name<US>Team" strings: one hashable, sortable key per row
+    keys = df["Player Name"].fillna("") + KEY_SEPARATOR + df["Team"].fillna("")
+    return pd.Index(keys.astype(object), dtype=object)
+
+
+def _empty_column(dtype, length):
+    if dtype == "int32":
+        return np.zeros(length, dtype=np.int32)
+    if dtype == "float64":
+        return np.zeros(length, dtype=np.float64)
+    return pd.array([pd.NA] * length, dtype=dtype)
+
+
+def merge_stats(dataset_dir=DATASET_DIR, configs=website_configs):
+    """
+    One row per player, sorted by (Player Name, Team): Player Name, Team, the
+    profile columns, then each stat file's columns in config order. Stats missing
+    for a player are 0; missing profile fields stay empty. A key repeated in
+    player_profiles.csv gets one row per profile, each with the key's stat
+    values (listed in attrs["repeated_profiles"] as [(Player Name, Team,
+    rows)]). Keys repeated within a stat file contribute no values from that
+    file; they are listed in attrs["duplicate_keys"] as {file name: [(Player
+    Name, Team, rows)]}.
+    """
+    index = pd.Index([], dtype=object)
+    names, teams, parts = [], [], []
+    duplicate_keys, repeated_profiles, shared = {}, [], []
+    for path, schema in merge_sources(dataset_dir, configs):
+        # One read per file: extend the key index with unseen keys, keep only the typed value arrays
+        df = read_with_schema(path, schema)
+        keys = player_keys(df)
+        duplicated = keys.duplicated(keep=False)
+        if duplicated.any() and os.path.basename(path) == PROFILE_FILE:
+            # Profiles tell same-named players apart: the 2nd, 3rd... profile of a key gets its own
+            # key slot ("key<US>1", sorted right after the first) that shares the first slot's stats
+            counts = keys[duplicated].value_counts(sort=False)
+            repeated_profiles = [tuple(key.split(KEY_SEPARATOR)) + (int(count),)
+                                 for key, count in sorted(counts.items())]
+            occurrence = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+            base = keys
+            keys = pd.Index([key if n == 0 else f"{key}{KEY_SEPARATOR}{n}" for key, n in zip(keys, occurrence)],
+                            dtype=object)
+            shared.append((keys[occurrence > 0], base[occurrence > 0]))
+            duplicated = np.zeros(len(keys), dtype=bool)
+        elif duplicated.any():
+            counts = keys[duplicated].value_counts(sort=False)
+            duplicate_keys[os.path.basename(path)] = [
+                tuple(key.split(KEY_SEPARATOR)) + (int(count),) for key, count in sorted(counts.items())]
+        first = ~keys.duplicated()
+        new = first & (index.get_indexer(keys) == -1)
+        index = index.append(keys[new])
+        names.append(df["Player Name"].to_numpy(dtype=object)[new])
+        teams.append(df["Team"].to_numpy(dtype=object)[new])
+        # Only rows with a key unique in this file are scattered
+        keep = ~duplicated
+        rows = index.get_indexer(keys[keep])
+        values = {}
+        for col, dtype in schema.items():
+            if col in KEY_COLUMNS:
+                continue
+            if dtype == "int32":
+                values[col] = df[col].fillna(0).to_numpy(dtype=np.int32)[keep]
+            elif dtype == "float64":
+                values[col] = df[col].fillna(0.0).to_numpy()[keep]
+            else:
+                values[col] = df[col].array[keep]
+        parts.append((rows, schema, values))
+        del df
+
+    # Output row of every key slot, so all columns are written directly in sorted order
+    order = index.argsort()
+    rank = np.empty(len(index), dtype=np.intp)
+    rank[order] = np.arange(len(index))
+    columns = {
+        "Player Name": np.concatenate(names)[order],
+        "Team": np.concatenate(teams)[order],
+    }
+    for rows, schema, values in parts:
+        for col, column_values in values.items():
+            if col not in columns:
+                columns[col] = _empty_column(schema[col], len(index))
+            columns[col][rank[rows]] = column_values
+    for extra, first in shared:
+        extra, first = rank[index.get_indexer(extra)], rank[index.get_indexer(first)]
+        for col in columns:
+            if col not in PROFILE_SCHEMA:
+                columns[col][extra] = columns[col][first]
+    merged = pd.DataFrame(columns)
+    merged.attrs["duplicate_keys"] = duplicate_keys
+    merged.attrs["repeated_profiles"] = repeated_profiles
+    return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge the per-player stat CSVs into one file.")
+    parser.add_argument("--dataset-dir", default=DATASET_DIR, help="Directory with the scraped CSVs")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Merged output CSV")
+    args = parser.parse_args(argv)
+    merged_df = merge_stats(args.dataset_dir)
+    if merged_df.attrs["repeated_profiles"]:
+        listed = ", ".join(f"{name} ({team}) x{count}" for name, team, count in merged_df.attrs["repeated_profiles"])
+        print(f"Warning: {PROFILE_FILE} has players sharing a Player Name/Team key, kept as separate rows "
+              f"with the same stats: {listed}")
+    for file_name, duplicates in merged_df.attrs["duplicate_keys"].items():
+        listed = ", ".join(f"{name} ({team}) x{count}" for name, team, count in duplicates)
+        print(f"Warning: {file_name} has repeated Player Name/Team keys, left out of the merge: {listed}")
+    merged_df.to_csv(args.output, index=False)
+    print(f"Merged stats saved to {args.output}")
+
 
-dataset_dir = "Dataset"
-csv_files = glob.glob(os.path.join(dataset_dir, "*.csv"))
-
-# Read all CSVs into dataframes and keep track of their columns
-dfs = []
-column_groups = []
-for f in csv_files:
-    df = pd.read_csv(f)
-    dfs.append(df)
-    # Exclude Player Name and Team from stat columns
-    stat_cols = [col for col in df.columns if col not in ["Player Name", "Team"]]
-    column_groups.append(stat_cols)
-
-# Merge all dataframes on Player Name and Team
-merged_df = dfs[0]
-for df in dfs[1:]:
-    merged_df = pd.merge(merged_df, df, on=["Player Name", "Team"], how="outer")
-
-# Fill NaN with 0
-merged_df = merged_df.fillna(0)
-
-# Build final column order: Player Name, Team, then grouped stat columns
-final_columns = ["Player Name", "Team"] + [col for group in column_groups for col in group]
-merged_df = merged_df[final_columns]
-
-merged_df.to_csv("merged_stats.csv", index=False)
-print("Merged stats saved to merged_stats.csv")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
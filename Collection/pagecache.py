@@ -0,0 +1,140 @@
+"""
+On-disk page cache shared by all scrapers.
+
+Page bodies are stored content-addressed (objects/<sha256 of html>.html) and an
+index entry per URL (index/<sha256 of url>.json) records which body belongs to
+the URL and when it was fetched. Entries are served while younger than their
+TTL; a TTL of None means the page never expires. With replay=True the cache
+never touches the network and a missing page raises CacheMiss.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".pagecache")
+DEFAULT_TTL = 6 * 60 * 60  # seconds, for standings and leaderboards
+DEFAULT = object()
+
+
+class CacheMiss(Exception):
+    pass
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, replay=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.replay = replay
+        self._index_dir = os.path.join(cache_dir, "index")
+        self._objects_dir = os.path.join(cache_dir, "objects")
+        os.makedirs(self._index_dir, exist_ok=True)
+        os.makedirs(self._objects_dir, exist_ok=True)
+
+    def _index_path(self, url):
+        return os.path.join(self._index_dir, f"{_sha256(url)}.json")
+
+    def _entry(self, url):
+        try:
+            with open(self._index_path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_object(self, digest):
+        try:
+            with open(os.path.join(self._objects_dir, f"{digest}.html"), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get(self, url, ttl=DEFAULT, is_final=None):
+        """
+        Cached html for url, or None if missing or older than ttl.
+        A page for which is_final(html) is true never expires; replay mode ignores ttl.
+        """
+        entry = self._entry(url)
+        if entry is None:
+            return None
+        html = self._read_object(entry["content"])
+        if html is None or self.replay:
+            return html
+        ttl = self.ttl if ttl is DEFAULT else ttl
+        if ttl is None or time.time() - entry["fetched_at"] <= ttl:
+            return html
+        if is_final is not None and is_final(html):
+            return html
+        return None
+
+    def put(self, url, html):
+        digest = _sha256(html)
+        object_path = os.path.join(self._objects_dir, f"{digest}.html")
+        if not os.path.exists(object_path):
+            _atomic_write(object_path, html)
+        entry = {"url": url, "content": digest, "fetched_at": time.time()}
+        _atomic_write(self._index_path(url), json.dumps(entry))
+
+    def urls(self, prefix=""):
+        # All cached URLs starting with prefix
+        found = []
+        for name in os.listdir(self._index_dir):
+            try:
+                with open(os.path.join(self._index_dir, name), encoding="utf-8") as f:
+                    url = json.load(f)["url"]
+            except (OSError, ValueError, KeyError):
+                continue
+            if url.startswith(prefix):
+                found.append(url)
+        return sorted(found)
+
+    def fetch(self, driver, url, load, ttl=DEFAULT, is_final=None):
+        # Return the html for url, calling load(driver, url) only on a cache miss
+        html = self.get(url, ttl=ttl, is_final=is_final)
+        if html is not None:
+            return html
+        if self.replay:
+            raise CacheMiss(url)
+        html = load(driver, url)
+        self.put(url, html)
+        return html
+
+
+def _atomic_write(path, text):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def fetch_page(browser, url, load, cache=None, ttl=DEFAULT, is_final=None):
+    """
+    Scrapers call this so caching stays optional. browser is a WebDriver or a
+    DriverPool; a pool only hands out (and lazily starts) a driver on a cache miss.
+    """
+    if hasattr(browser, "run"):
+        pool = browser
+        browser = None
+
+        def load(_, url, load=load):
+            return pool.run(load, url)
+    if cache is None:
+        return load(browser, url)
+    return cache.fetch(browser, url, load, ttl=ttl, is_final=is_final)
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--replay", action="store_true", help="Rebuild outputs from cached pages only, without a browser")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch pages live and do not store them")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Page cache directory")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL, help="Seconds before cached standings/leaderboards expire")
+
+
+def cache_from_args(args):
+    if args.no_cache and not args.replay:
+        return None
+    return PageCache(cache_dir=args.cache_dir, ttl=args.cache_ttl, replay=args.replay)
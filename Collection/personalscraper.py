@@ -1,93 +1,130 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+import argparse
 import csv
-import time
+import json
 import os
+import threading
+import time
+from Collection.driverpool import DriverPool
+from Collection.engine import add_engine_arguments, engine_from_args, time_left
+from Collection.instrument import timed_wait
+from Collection.pagecache import add_cache_arguments, cache_from_args, fetch_page
+from Collection.tableparser import parse_player_bio, parse_player_links
+from Collection.webscraper import load_table_page
 
 # Config: specify which fields to extract from player profile
 PROFILE_FIELDS = ["Position", "Age", "Height"]
 
 url = "https://en.volleyballworld.com/volleyball/competitions/volleyball-nations-league/statistics/men/best-scorers/"
-chrome_options = Options()
-# chrome_options.add_argument("--headless")
-service = ChromeService()
-driver = webdriver.Chrome(service=service, options=chrome_options)
+PROFILE_STORE = os.path.join("Dataset", "player_profile_store.json")
 
-def scrape_player_profile(driver, profile_url, fields):
+def load_profile_page(driver, profile_url):
     driver.get(profile_url)
     # Wait until at least one bio col is present
-    wait = WebDriverWait(driver, 30)
+    wait = timed_wait(driver, time_left(30))
     wait.until(EC.presence_of_element_located((By.CLASS_NAME, "vbw-player-bio-col")))
-    bio_cols = driver.find_elements(By.CLASS_NAME, "vbw-player-bio-col")
-    data = {field: "" for field in fields}
-    for col in bio_cols:
-        try:
-            head = col.find_element(By.CLASS_NAME, "vbw-player-bio-head").text.strip()
-            value = col.find_element(By.CLASS_NAME, "vbw-player-bio-text").text.strip()
-            if head in data:
-                data[head] = value
-        except Exception:
+    return driver.page_source
+
+def scrape_player_profile(browser, profile_url, fields, cache=None, max_age=None):
+    # Profiles never expire in the page cache unless a staleness window (seconds) is given
+    html = fetch_page(browser, profile_url, load_profile_page, cache=cache, ttl=max_age)
+    return parse_player_bio(html, fields)
+
+class ProfileStore:
+    """
+    Persistent {profile_url: {"data": {field: value}, "fetched_at": epoch}} store,
+    so a run only fetches players that are new or older than the staleness window.
+    """
+
+    def __init__(self, path=PROFILE_STORE):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, profile_url, fields, max_age=None):
+        entry = self.entries.get(profile_url)
+        if entry is None or any(field not in entry["data"] for field in fields):
+            return None
+        if max_age is not None and time.time() - entry["fetched_at"] > max_age:
+            return None
+        return entry["data"]
+
+    def put(self, profile_url, data):
+        self.entries[profile_url] = {"data": data, "fetched_at": time.time()}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+def fetch_profiles(pool, player_infos, store, cache=None, max_age=None):
+    """
+    Fetch every profile not fresh in the store, concurrently through the pool or
+    scraping engine (which retries failed loads). Returns ({profile_url: data}, stats).
+    """
+    todo = []
+    results = {}
+    for info in player_infos:
+        link = info["Profile Link"]
+        if not link or link in results:
             continue
-    return data
-
-try:
-    driver.get(url)
-    wait = WebDriverWait(driver, 60)
-    table = wait.until(EC.presence_of_element_located(
-        (By.CSS_SELECTOR, "table.vbw-o-table.vbw-tournament-player-statistic-table.vbw-stats-scorers")
-    ))
-    time.sleep(2)
-
-    # Step 1: Collect all player info from main table
-    player_infos = []
-    for row_elem in table.find_elements(By.CSS_SELECTOR, "tbody tr"):
-        cells = row_elem.find_elements(By.TAG_NAME, "td")
-        # Find player name cell and extract link
-        player_cell = None
-        for cell in cells:
-            if "playername" in cell.get_attribute("class"):
-                player_cell = cell
-                break
-        if player_cell:
-            player_name = player_cell.text
-            link_elem = player_cell.find_element(By.TAG_NAME, "a")
-            profile_link = link_elem.get_attribute("href") if link_elem else ""
+        stored = store.get(link, PROFILE_FIELDS, max_age)
+        if stored is not None:
+            results[link] = stored
         else:
-            player_name = ""
-            profile_link = ""
-        # Find team cell
-        team = ""
-        for cell in cells:
-            if "federation" in cell.get_attribute("class"):
-                team = cell.text
-                break
-        player_infos.append({"Player Name": player_name, "Team": team, "Profile Link": profile_link})
-
-    # Step 2: For each player, visit their profile and scrape details
-    rows = []
-    total_players = len(player_infos)
-    for idx, info in enumerate(player_infos):
+            todo.append(info)
+    stats = {"stored": len(results), "fetched": 0, "failed": 0, "retries": 0}
+    engine_stats = getattr(pool, "stats", {})
+    retries_before = engine_stats.get("retries", 0)
+    lock = threading.Lock()
+    print(f"{stats['stored']} profiles up to date in {store.path}, {len(todo)} to fetch")
+
+    def fetch(info):
         try:
-            if info["Profile Link"]:
-                profile_data = scrape_player_profile(driver, info["Profile Link"], PROFILE_FIELDS)
-            else:
-                profile_data = {field: "" for field in PROFILE_FIELDS}
+            data = scrape_player_profile(pool, info["Profile Link"], PROFILE_FIELDS, cache=cache, max_age=max_age)
         except Exception as e:
-            print(f"Error scraping {info['Player Name']} ({info['Profile Link']}): {e}")
-            profile_data = {field: "" for field in PROFILE_FIELDS}
-        row = [info["Player Name"], info["Team"]] + [profile_data[field] for field in PROFILE_FIELDS]
-        rows.append(row)
-        # Print log after each successful scrape
-        name = info["Player Name"]
-        age = profile_data.get("Age", "")
-        height = profile_data.get("Height", "")
-        position = profile_data.get("Position", "")
-        print(f"{name} - {age} - {height} - {position} ({idx+1}/{total_players})")
-        # No sleep needed, we wait for elements instead
+            with lock:
+                stats["failed"] += 1
+                done = stats["fetched"] + stats["failed"]
+            print(f"Error scraping {info['Player Name']} ({info['Profile Link']}): {e} ({done}/{len(todo)})")
+            return
+        with lock:
+            results[info["Profile Link"]] = data
+            store.put(info["Profile Link"], data)
+            stats["fetched"] += 1
+            done = stats["fetched"] + stats["failed"]
+        print(f"{info['Player Name']} - {data.get('Age', '')} - {data.get('Height', '')} - {data.get('Position', '')} ({done}/{len(todo)})")
+
+    pool.map(fetch, todo)
+    stats["retries"] = engine_stats.get("retries", 0) - retries_before
+    return results, stats
+
+def scrape_player_infos(browser, cache=None):
+    # Step 1: Collect all player info from main table (one page snapshot, parsed in-process)
+    html = fetch_page(browser, url, load_table_page, cache=cache)
+    return parse_player_links(html, url)
+
+def scrape_profiles(pool, cache=None, max_age=None, store_path=PROFILE_STORE):
+    player_infos = scrape_player_infos(pool, cache=cache)
+
+    # Step 2: Fetch profiles that are new or stale, concurrently, and keep the store up to date
+    store = ProfileStore(store_path)
+    try:
+        profiles, stats = fetch_profiles(pool, player_infos, store, cache=cache, max_age=max_age)
+    finally:
+        store.save()
+    print(f"Profiles: {stats['stored']} from store, {stats['fetched']} fetched, "
+          f"{stats['failed']} failed, {stats['retries']} retries")
+    empty = {field: "" for field in PROFILE_FIELDS}
+    rows = [
+        [info["Player Name"], info["Team"]] + [profiles.get(info["Profile Link"], empty)[field] for field in PROFILE_FIELDS]
+        for info in player_infos
+    ]
 
     # Save to CSV
     dataset_dir = "Dataset"
@@ -101,5 +138,20 @@ try:
 
     print(f"Player profile data saved to {os.path.join(dataset_dir, 'player_profiles.csv')}")
 
-finally:
-    driver.quit()
\ No newline at end of file
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape VNL player profiles (position, age, height).")
+    parser.add_argument("--workers", type=int, default=4, help="Number of browsers fetching profiles concurrently")
+    parser.add_argument("--max-age-days", type=float, default=None, help="Refetch stored profiles older than this many days")
+    add_cache_arguments(parser)
+    add_engine_arguments(parser)
+    args = parser.parse_args(argv)
+    cache = cache_from_args(args)
+    max_age = args.max_age_days * 24 * 60 * 60 if args.max_age_days is not None else None
+
+    # Browsers start lazily, so --replay never launches one
+    with DriverPool(size=args.workers) as pool, engine_from_args(args, pool) as engine:
+        scrape_profiles(engine, cache=cache, max_age=max_age)
+        print(engine.summary())
+
+if __name__ == "__main__":
+    main()
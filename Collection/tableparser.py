@@ -0,0 +1,284 @@
+"""
+In-process HTML parsing for the scrapers.
+
+Instead of one WebDriver round trip per element, the scrapers take a single
+`driver.page_source` snapshot and extract everything here with the standard
+library HTML parser.
+"""
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+STAT_TABLE_CLASSES = ("vbw-o-table", "vbw-tournament-player-statistic-table", "vbw-stats-scorers")
+RANKING_TABLE_CLASSES = ("vbw-o-table", "vbw-ranking-table", "advanced")
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+HIDDEN_TAGS = {"script", "style", "template", "noscript"}
+
+
+class Node:
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs or {})
+        self.parent = parent
+        self.children = []
+
+    @property
+    def classes(self):
+        return (self.attrs.get("class") or "").split()
+
+    def has_classes(self, *classes):
+        own = self.classes
+        return all(cls in own for cls in classes)
+
+    def iter(self, tag=None, classes=()):
+        # Depth-first walk over descendant elements matching tag and all classes
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                continue
+            if (tag is None or node.tag == tag) and node.has_classes(*classes):
+                yield node
+            stack.extend(reversed(node.children))
+
+    def find(self, tag=None, classes=()):
+        return next(self.iter(tag, classes), None)
+
+    def find_all(self, tag=None, classes=()):
+        return list(self.iter(tag, classes))
+
+    def hidden(self):
+        # Hidden by markup alone (tag, hidden attribute, inline display/visibility); stylesheet rules can't be seen here
+        if self.tag in HIDDEN_TAGS or "hidden" in self.attrs:
+            return True
+        style = "".join((self.attrs.get("style") or "").split()).lower()
+        return "display:none" in style or "visibility:hidden" in style
+
+    def text(self):
+        # Whitespace-normalized visible text, like WebElement.text for a single-line cell
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            elif not node.hidden():
+                stack.extend(reversed(node.children))
+        return " ".join(" ".join(parts).split())
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document")
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, attrs, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Node(tag, attrs, self.current))
+
+    def handle_endtag(self, tag):
+        # Close up to the nearest open element with this tag; ignore stray end tags
+        node = self.current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+def parse_html(html):
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def _as_tree(html_or_tree):
+    return html_or_tree if isinstance(html_or_tree, Node) else parse_html(html_or_tree)
+
+
+def _body_rows(table, classes=()):
+    tbody = table.find("tbody")
+    return (tbody or table).find_all("tr", classes)
+
+
+def parse_stat_table(html, header_map, columns_to_keep, table_classes=STAT_TABLE_CLASSES):
+    """
+    Extract a player statistic table into {(Player Name, Team): row_dict},
+    mapping cell classes through header_map exactly like scrape_table.
+    """
+    table = _as_tree(html).find("table", table_classes)
+    data = {}
+    if table is None:
+        return data
+    for row_elem in _body_rows(table):
+        row_dict = {col: "0" for col in columns_to_keep}  # Default all to 0
+        for cell in row_elem.find_all("td"):
+            text = cell.text()
+            for cls in cell.classes:
+                if cls in header_map:
+                    row_dict[header_map[cls]] = text if text != "" else "0"
+        key = (row_dict.get("Player Name", ""), row_dict.get("Team", ""))
+        if key[0] and key[1]:
+            data[key] = row_dict
+    return data
+
+
+def parse_player_links(html, base_url, table_classes=STAT_TABLE_CLASSES):
+    # Returns [{"Player Name", "Team", "Profile Link"}] from a player statistic table
+    table = _as_tree(html).find("table", table_classes)
+    player_infos = []
+    if table is None:
+        return player_infos
+    for row_elem in _body_rows(table):
+        cells = row_elem.find_all("td")
+        player_name = team = profile_link = ""
+        for cell in cells:
+            if "playername" in (cell.attrs.get("class") or ""):
+                player_name = cell.text()
+                link_elem = cell.find("a")
+                href = link_elem.attrs.get("href") if link_elem is not None else None
+                profile_link = urljoin(base_url, href) if href else ""
+                break
+        for cell in cells:
+            if "federation" in (cell.attrs.get("class") or ""):
+                team = cell.text()
+                break
+        player_infos.append({"Player Name": player_name, "Team": team, "Profile Link": profile_link})
+    return player_infos
+
+
+def parse_player_bio(html, fields):
+    # Returns {field: value} for the requested bio heads on a player profile page
+    data = {field: "" for field in fields}
+    for col in _as_tree(html).iter(classes=("vbw-player-bio-col",)):
+        head = col.find(classes=("vbw-player-bio-head",))
+        value = col.find(classes=("vbw-player-bio-text",))
+        if head is None or value is None:
+            continue
+        if head.text() in data:
+            data[head.text()] = value.text()
+    return data
+
+
+def parse_ranking_table(html, table_classes=RANKING_TABLE_CLASSES):
+    # Returns the text of every cell in each team row of the standings table
+    table = _as_tree(html).find("table", table_classes)
+    if table is None:
+        return []
+    return [[cell.text() for cell in row.find_all("td")] for row in _body_rows(table, ("vbw-o-table__row",))]
+
+
+def _find_any(node, *class_options):
+    # First descendant matching any of the alternative class sets (the site ships both BEM spellings)
+    for classes in class_options:
+        found = node.find(classes=classes)
+        if found is not None:
+            return found
+    return None
+
+
+def parse_match_links(html, base_url, gender="men"):
+    # Returns [{"date", "match_url"}] for all matches of one gender on a schedule week page
+    links = []
+    seen = set()
+    for date_row in _as_tree(html).iter(classes=("vbw-gs2-date-row",)):
+        date_str = date_row.attrs.get("data-date") or ""
+        for match in date_row.iter(classes=("vbw-gs2-match-item",)):
+            data_card = match.find(classes=("vbw-gs2-match-data-card",))
+            if data_card is None:
+                continue
+            gender_elem = data_card.find("p", ("vbw-gs2-match-gender",))
+            if gender_elem is None or gender_elem.text().lower() != gender:
+                continue
+            link_elem = data_card.find("a")
+            href = link_elem.attrs.get("href") if link_elem is not None else None
+            if not href or href == "#" or href.endswith("/#"):
+                continue
+            match_url = urljoin(base_url, href)
+            if match_url not in seen:
+                links.append({"date": date_str, "match_url": match_url})
+                seen.add(match_url)
+    return links
+
+
+def _team_name(block):
+    # Full name ("Italy", as in the CSVs); the abbreviation ("ITA") only when the page has no full name
+    for name in block.iter():
+        if ("vbw-mu__team__name" in name.classes and "vbw-mu__team__name--abbr" not in name.classes) or \
+                ("vbw-mu_team_name" in name.classes and "vbw-mu_team_name--abbr" not in name.classes):
+            if name.text():
+                return name.text()
+    abbr = _find_any(block, ("vbw-mu__team__name--abbr",), ("vbw-mu_team_name--abbr",))
+    return abbr.text() if abbr is not None else ""
+
+
+def _stat_values(row):
+    values = [None, None]
+    for i, side in enumerate(("-td-teamA", "-td-teamB")):
+        cell = row.find("td", ("vbw-o-table__cell", side))
+        span = cell.find("span") if cell is not None else None
+        if span is not None:
+            values[i] = span.text()
+    return values
+
+
+def parse_match_page(html, stat_keys):
+    """
+    Everything scraped from a match page, found in a single walk over the document:
+    team names, winner/loser, set points (5 sets, "" when not played), and
+    {stat_key: [teamA, teamB]} for the team stat rows. Missing stats are None and
+    listed in "missing"; "has_sets" is False when the page shows no set results yet.
+    """
+    blocks, scores, set_divs, stat_rows = {}, {}, {}, {}
+    for node in _as_tree(html).iter():
+        classes = node.classes
+        for side in ("home", "away"):
+            if f"vbw-mu__team--{side}" in classes or f"vbw-mu_team--{side}" in classes:
+                blocks.setdefault(side, node)
+            if f"vbw-mu__score--{side}" in classes or f"vbw-mu_score--{side}" in classes:
+                scores.setdefault(side, node)
+        if "vbw-mu__sets--result" in classes or "vbw-mu_sets--result" in classes:
+            set_divs.setdefault(node.attrs.get("data-set-no"), node)
+        if node.tag == "tr" and "vbw-o-table__row" in classes:
+            for cls in classes:
+                if cls in stat_keys:
+                    stat_rows.setdefault(cls, node)
+
+    home = _team_name(blocks["home"]) if "home" in blocks else ""
+    away = _team_name(blocks["away"]) if "away" in blocks else ""
+    winner = loser = ""
+    if "home" in scores and "away" in scores:
+        if "winner" in (scores["home"].attrs.get("class") or ""):
+            winner, loser = home, away
+        elif "winner" in (scores["away"].attrs.get("class") or ""):
+            winner, loser = away, home
+
+    sets = []
+    for set_no in range(1, 6):
+        set_div = set_divs.get(str(set_no))
+        points = ["", ""]
+        if set_div is not None:
+            for i, point_cls in enumerate(("pointA", "pointB")):
+                point = _find_any(set_div, (f"vbw-mu__{point_cls}",), (f"vbw-mu_{point_cls}",))
+                if point is not None:
+                    points[i] = point.text()
+        sets.extend(points)
+
+    stats = {key: _stat_values(stat_rows[key]) if key in stat_rows else [None, None] for key in stat_keys}
+    missing = [key for key in stat_keys if None in stats[key]]
+    return {
+        "has_sets": bool(set_divs), "home": home, "away": away, "winner": winner, "loser": loser,
+        "sets": sets, "stats": stats, "missing": missing,
+    }
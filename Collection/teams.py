@@ -0,0 +1,147 @@
+"""
+Canonical team registry: federation code <-> team name <-> aliases.
+
+Player files (merged_stats.csv) use federation codes ("TUR"), standings and
+match files use team names ("Türkiye"), and match URLs use slugs
+("Turkiye-vs-Italy"). Every spelling is reduced to an accent-, case- and
+punctuation-free key and looked up in one hash index, so a team resolves to
+its code in O(1) from any source. Spellings that do not resolve are collected
+in `unresolved` (with the file they came from) so callers can report them
+instead of silently producing empty features. pandas is only imported by the
+dataset helpers, so resolving a spelling stays cheap for the prediction CLI.
+
+    python -m Collection.teams       # check every team spelling in the datasets
+"""
+import argparse
+import os
+import unicodedata
+from urllib.parse import unquote_plus
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (code, name, other spellings); the name is what team_stats.csv and match_set_stats.csv use
+TEAMS = [
+    ('ARG', 'Argentina', []),
+    ('BEL', 'Belgium', []),
+    ('BRA', 'Brazil', ['Brasil']),
+    ('BUL', 'Bulgaria', []),
+    ('CAN', 'Canada', []),
+    ('CHN', 'China', ["China PR", "People's Republic of China"]),
+    ('CUB', 'Cuba', []),
+    ('CZE', 'Czechia', ['Czech Republic']),
+    ('DOM', 'Dominican Republic', []),
+    ('FRA', 'France', []),
+    ('GER', 'Germany', ['Deutschland']),
+    ('IRI', 'Iran', ['IR Iran', 'Islamic Republic of Iran', 'IRN']),
+    ('ITA', 'Italy', ['Italia']),
+    ('JPN', 'Japan', []),
+    ('KOR', 'Korea', ['South Korea', 'Republic of Korea']),
+    ('NED', 'Netherlands', ['Holland', 'The Netherlands']),
+    ('POL', 'Poland', []),
+    ('SLO', 'Slovenia', []),
+    ('SRB', 'Serbia', []),
+    ('THA', 'Thailand', []),
+    ('TUR', 'Türkiye', ['Turkey']),
+    ('UKR', 'Ukraine', []),
+    ('USA', 'USA', ['United States', 'United States of America', 'US']),
+]
+
+# (file, columns) the registry checks; match_links.csv is read from its match URL slugs
+SOURCES = [
+    (os.path.join(ROOT_DIR, "merged_stats.csv"), ['Team']),
+    (os.path.join(ROOT_DIR, "ML", "merged_stats.csv"), ['Team']),
+    (os.path.join(ROOT_DIR, "ML", "team_stats.csv"), ['Team']),
+    (os.path.join(ROOT_DIR, "ML", "match_set_stats.csv"), ['Home Team', 'Away Team', 'Winner', 'Loser']),
+]
+MATCH_LINKS_FILE = os.path.join(ROOT_DIR, "Dataset", "match_links.csv")
+
+
+def team_key(text):
+    # "Türkiye" -> "turkiye": ASCII-folded, lower-case, letters and digits only
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+class TeamRegistry:
+    """Hash index from every known team spelling to its federation code."""
+
+    def __init__(self, teams=TEAMS):
+        self.names = {}
+        self.spellings = {}
+        self.unresolved = {}
+        for code, name, aliases in teams:
+            self.add(code, name, aliases)
+
+    def add(self, code, name, aliases=()):
+        self.names[code] = name
+        for spelling in (code, name, *aliases):
+            self.spellings[team_key(spelling)] = code
+
+    def code(self, team, source=None):
+        # Federation code of any spelling, or None (recorded in `unresolved`)
+        code = self.spellings.get(team_key(team))
+        if code is None and team is not None and team == team:  # NaN != NaN
+            self.unresolved.setdefault(str(team), set()).add(source or 'lookup')
+        return code
+
+    def name(self, team, source=None):
+        code = self.code(team, source)
+        return None if code is None else self.names[code]
+
+    def codes(self, values, source=None):
+        # Vectorized code(): one lookup per distinct spelling, None where unresolved
+        import pandas as pd
+        values = pd.Series(values, dtype=object)
+        mapping = {value: self.code(value, source) for value in values.dropna().unique()}
+        return pd.Series([mapping.get(value) for value in values], index=values.index, dtype=object)
+
+    def fingerprint(self):
+        # Stable text of the index, for caches keyed by how teams resolve
+        return ";".join(f"{key}={code}" for key, code in sorted(self.spellings.items()))
+
+    def report(self):
+        # One line per unresolved spelling, with where it was seen
+        return [f"Unresolved team {name!r} (in {', '.join(sorted(sources))})"
+                for name, sources in sorted(self.unresolved.items())]
+
+
+def match_link_teams(path=MATCH_LINKS_FILE):
+    # Team spellings from the "?match=Home-vs-Away" slugs of match_links.csv
+    import pandas as pd
+    if not os.path.exists(path):
+        return []
+    slugs = pd.read_csv(path)['match_url'].str.extract(r'[?&]match=([^&]+)')[0].dropna()
+    teams = slugs.map(unquote_plus).str.split('-vs-', regex=False).explode().str.replace('-', ' ', regex=False)
+    return teams.unique().tolist()
+
+
+def build_team_registry(sources=SOURCES, match_links=MATCH_LINKS_FILE, teams=TEAMS):
+    """
+    The registry seeded from TEAMS, with every spelling found in the datasets
+    checked once; spellings that are not in TEAMS end up in `unresolved`.
+    """
+    import pandas as pd
+    registry = TeamRegistry(teams)
+    for path, columns in sources:
+        if not os.path.exists(path):
+            continue
+        header = pd.read_csv(path, nrows=0).columns
+        df = pd.read_csv(path, usecols=[col for col in columns if col in header], dtype=object)
+        for col in df.columns:
+            registry.codes(df[col], os.path.relpath(path, ROOT_DIR))
+    for team in match_link_teams(match_links):
+        registry.code(team, os.path.relpath(match_links, ROOT_DIR))
+    return registry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that every team spelling in the datasets resolves.")
+    parser.parse_args(argv)
+    registry = build_team_registry()
+    for line in registry.report():
+        print(line)
+    print(f"{len(registry.names)} teams, {len(registry.spellings)} spellings, {len(registry.unresolved)} unresolved")
+
+
+if __name__ == "__main__":
+    main()
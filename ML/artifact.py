@@ -0,0 +1,272 @@
+"""
+Versioned, sklearn-free artifact of the two fitted linear models.
+
+Both models in ml.py are LogisticRegression, so all a prediction needs is each
+model's coefficients, intercepts, input column order, classes and link
+(sigmoid for the binary winner model, softmax for the multinomial set-score
+model). `python -m ML.ml train` writes them to ML/models.npz: the numeric
+arrays plus a JSON manifest (format version, columns, classes, link, shapes,
+the sklearn version that fitted them), loaded with allow_pickle=False. The
+same content can be written as plain JSON for consumers without NumPy.
+
+LinearModel scores from that artifact with NumPy only and exposes
+predict_proba / classes_ like the sklearn estimator, so it can stand in for the
+pickled model wherever ML code calls predict_proba. It is the one scorer of the
+prediction commands (ML/predict.py, ML/matchups.py, ML/simulate.py), and
+set_score_inputs is the one builder of the set-score model's input layout.
+load_current_models re-exports the artifact from the pickles when it is
+missing or older than them. The export refuses to write a model whose NumPy
+probabilities differ from sklearn's by more than 1e-9.
+
+    python -m ML.artifact export            # from the saved pickles
+    python -m ML.artifact export --json ML/models.json
+    python -m ML.artifact verify            # NumPy vs sklearn on every matchup
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_ARTIFACT_FILE = os.path.join(DATA_DIR, "models.npz")
+ARTIFACT_FORMAT = "vnl-linear-models"
+ARTIFACT_VERSION = 1
+TOLERANCE = 1e-9
+MODEL_NAMES = ('win', 'set_score')
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _softmax(z):
+    z = np.exp(z - z.max(axis=1, keepdims=True))
+    return z / z.sum(axis=1, keepdims=True)
+
+
+class LinearModel:
+    """A fitted linear classifier: columns, classes, coefficients and link."""
+
+    LINKS = ('logistic', 'softmax', 'ovr')
+
+    def __init__(self, columns, classes, coef, intercept, link):
+        if link not in self.LINKS:
+            raise ValueError(f"Unknown link {link!r}")
+        self.columns = list(columns)
+        self.classes_ = np.array(classes)
+        self.coef_ = np.asarray(coef, dtype=float).reshape(-1, len(self.columns))
+        self.intercept_ = np.asarray(intercept, dtype=float).reshape(-1)
+        self.link = link
+
+    def _matrix(self, X):
+        # DataFrames are aligned to the model's columns by name (missing columns 0), arrays are taken as-is
+        if hasattr(X, 'reindex'):
+            X = X.reindex(columns=self.columns, fill_value=0)
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[1] != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} columns, got shape {X.shape}")
+        return X
+
+    def decision_function(self, X):
+        z = self._matrix(X) @ self.coef_.T + self.intercept_
+        return z[:, 0] if self.link == 'logistic' else z
+
+    def predict_proba(self, X):
+        z = self.decision_function(X)
+        if self.link == 'logistic':
+            p = _sigmoid(z)
+            return np.column_stack([1.0 - p, p])
+        if self.link == 'softmax':
+            return _softmax(z)
+        p = _sigmoid(z)  # one-vs-rest: per-class sigmoids, normalised
+        return p / p.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def manifest(self):
+        return {'columns': self.columns, 'classes': self.classes_.tolist(), 'link': self.link,
+                'coef_shape': list(self.coef_.shape), 'intercept_shape': list(self.intercept_.shape)}
+
+
+def align(X, columns, target_columns):
+    # The 2-D array X (named `columns`) with its columns in `target_columns` order, 0 where X has none
+    X = np.asarray(X, dtype=float)
+    index = {col: i for i, col in enumerate(columns)}
+    out = np.zeros((X.shape[0], len(target_columns)))
+    for j, col in enumerate(target_columns):
+        if col in index:
+            out[:, j] = X[:, index[col]]
+    return out
+
+
+def set_score_inputs(X, columns, set_columns, winner_names, win_prob):
+    """
+    The set-score model's input, as an array in `set_columns` order, for the
+    winner-model rows X (array named `columns`): X's columns, the winner as
+    one-hot over the winner_<name> columns, win_prob and feature_diff (sum of
+    |X| per row), as ml.train builds them. Other columns are 0.
+    """
+    X = np.asarray(X, dtype=float)
+    S = align(X, columns, set_columns)
+    names = np.array(set_columns, dtype=object)
+    winner_cols = np.flatnonzero([str(col).startswith('winner_') for col in set_columns])
+    if len(winner_cols):
+        winners = np.array([f'winner_{name}' for name in winner_names], dtype=object)
+        S[:, winner_cols] = names[winner_cols][None, :] == winners[:, None]
+    S[:, names == 'win_prob'] = np.asarray(win_prob, dtype=float).reshape(-1, 1)
+    S[:, names == 'feature_diff'] = np.abs(X).sum(axis=1, keepdims=True)
+    return S
+
+
+def max_difference(model, linear, X):
+    # Largest absolute difference between the two models' predict_proba on X
+    return float(np.abs(np.asarray(model.predict_proba(X)) - linear.predict_proba(X)).max())
+
+
+def _probe(columns, rows=256, seed=0):
+    # Random inputs on the scale of the features, for checking a model without its training data
+    import pandas as pd
+    return pd.DataFrame(np.random.default_rng(seed).normal(scale=3.0, size=(rows, len(columns))), columns=columns)
+
+
+def from_sklearn(model, columns, X=None):
+    """
+    LinearModel of a fitted LogisticRegression. The link is the one whose
+    probabilities match the estimator's on a probe (and on X, if given) to
+    TOLERANCE; anything else raises ValueError instead of exporting a model
+    that would score differently.
+    """
+    classes = [c.item() if hasattr(c, 'item') else c for c in model.classes_]
+    links = ['logistic'] if len(classes) == 2 else ['softmax', 'ovr']
+    checks = [_probe(columns)] + ([] if X is None else [X])
+    for link in links:
+        linear = LinearModel(columns, classes, model.coef_, model.intercept_, link)
+        errors = [max_difference(model, linear, data) for data in checks]
+        if max(errors) <= TOLERANCE:
+            return linear
+    raise ValueError(f"{type(model).__name__} with classes {classes} is not reproduced by a "
+                     f"{'/'.join(links)} link within {TOLERANCE:g}")
+
+
+def export_models(win_model, win_columns, set_model, set_columns, path=MODEL_ARTIFACT_FILE,
+                  win_X=None, set_X=None):
+    """
+    Write both fitted models to `path` (.npz, or .json for a plain JSON file)
+    and return the manifest. win_X / set_X, if given, are checked too.
+    """
+    import sklearn
+    models = {'win': from_sklearn(win_model, list(win_columns), win_X),
+              'set_score': from_sklearn(set_model, list(set_columns), set_X)}
+    manifest = {'format': ARTIFACT_FORMAT, 'version': ARTIFACT_VERSION, 'sklearn_version': sklearn.__version__,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'models': {name: linear.manifest() for name, linear in models.items()}}
+    if path.endswith('.json'):
+        document = dict(manifest, arrays={f'{name}_{part}': getattr(linear, f'{part}_').tolist()
+                                          for name, linear in models.items() for part in ('coef', 'intercept')})
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False)  # float repr round-trips exactly
+        os.replace(f"{path}.tmp", path)
+    else:
+        arrays = {f'{name}_{part}': getattr(linear, f'{part}_')
+                  for name, linear in models.items() for part in ('coef', 'intercept')}
+        np.savez(f"{path}.tmp.npz", manifest=np.array(json.dumps(manifest, ensure_ascii=False)), **arrays)
+        os.replace(f"{path}.tmp.npz", path)
+    return manifest
+
+
+def load_models(path=MODEL_ARTIFACT_FILE):
+    """(manifest, {'win': LinearModel, 'set_score': LinearModel}) from an exported artifact."""
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        arrays = {key: np.array(value, dtype=float) for key, value in manifest.pop('arrays').items()}
+    else:
+        with np.load(path, allow_pickle=False) as data:
+            manifest = json.loads(str(data['manifest']))
+            arrays = {key: data[key] for key in data.files if key != 'manifest'}
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+    if manifest.get('version', 0) > ARTIFACT_VERSION:
+        raise ValueError(f"{path} has artifact version {manifest['version']}; "
+                         f"this code reads up to {ARTIFACT_VERSION}")
+    models = {}
+    for name in MODEL_NAMES:
+        entry = manifest['models'][name]
+        models[name] = LinearModel(entry['columns'], entry['classes'], arrays[f'{name}_coef'],
+                                   arrays[f'{name}_intercept'], entry['link'])
+    return manifest, models
+
+
+def load_current_models(path=MODEL_ARTIFACT_FILE):
+    """
+    load_models(path), exporting the artifact from the saved pickles first when
+    it is missing or older than them, so every scorer uses the models that
+    `python -m ML.ml train` saved last. Raises FileNotFoundError when the
+    models have not been trained.
+    """
+    from ML.ml import MODEL_PATH, SET_SCORE_MODEL_PATH
+    pickles = [p for p in (MODEL_PATH, SET_SCORE_MODEL_PATH) if os.path.exists(p)]
+    if os.path.exists(path) and all(os.path.getmtime(p) <= os.path.getmtime(path) for p in pickles):
+        return load_models(path)
+    if len(pickles) < 2:
+        raise FileNotFoundError("Model files not found. Train the models first: python -m ML.ml train")
+    import joblib
+    win_data = joblib.load(MODEL_PATH)
+    set_data = joblib.load(SET_SCORE_MODEL_PATH)
+    export_models(win_data['model'], win_data['columns'], set_data['model'], set_data['columns'], path)
+    return load_models(path)
+
+
+def verify(path, store, win_data, set_data):
+    # Max |NumPy - sklearn| over every ordered matchup for both models' probabilities
+    from ML.matchups import ordered_pairs, score_pairs
+    _, models = load_models(path)
+    codes = np.array(store.season.index, dtype=object)
+    a, b = ordered_pairs(len(codes))
+    expected = score_pairs(store, win_data['model'], win_data['columns'], set_data['model'], set_data['columns'],
+                           codes[a], codes[b])
+    actual = score_pairs(store, models['win'], models['win'].columns, models['set_score'],
+                         models['set_score'].columns, codes[a], codes[b])
+    if expected[4] != actual[4]:
+        raise ValueError(f"Set-score classes differ: {expected[4]} vs {actual[4]}")
+    return len(a), float(np.abs(expected[0] - actual[0]).max()), float(np.abs(expected[3] - actual[3]).max())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or check the sklearn-free model artifact.")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--json", dest="path", nargs="?", const=os.path.join(DATA_DIR, "models.json"),
+                        default=MODEL_ARTIFACT_FILE, help="Write/read a plain JSON artifact instead of .npz")
+    args = parser.parse_args(argv)
+
+    import joblib
+    from ML.ml import MODEL_PATH, SET_SCORE_MODEL_PATH, load_team_features
+    if not (os.path.exists(MODEL_PATH) and os.path.exists(SET_SCORE_MODEL_PATH)):
+        print("Model files not found. Train the models first: python -m ML.ml train")
+        return 1
+    win_data = joblib.load(MODEL_PATH)
+    set_data = joblib.load(SET_SCORE_MODEL_PATH)
+    if args.command == "export":
+        manifest = export_models(win_data['model'], win_data['columns'], set_data['model'], set_data['columns'],
+                                 args.path)
+        print(f"Model artifact v{manifest['version']} saved to {args.path} ({os.path.getsize(args.path)} bytes)")
+        return 0
+
+    if not os.path.exists(args.path):
+        print(f"{args.path} not found. Export it first: python -m ML.artifact export")
+        return 1
+    start = time.perf_counter()
+    load_models(args.path)
+    load_ms = (time.perf_counter() - start) * 1000
+    pairs, win_error, set_error = verify(args.path, load_team_features(), win_data, set_data)
+    print(f"Loaded {args.path} in {load_ms:.1f} ms")
+    print(f"{pairs} matchups: max |P(A wins) difference| {win_error:.2e}, "
+          f"max |set-score probability difference| {set_error:.2e} (tolerance {TOLERANCE:g})")
+    return 0 if max(win_error, set_error) <= TOLERANCE else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Load test for ML/server.py.
+
+Starts the prediction server on a free port (or targets --url), then has
+--concurrency workers, each on its own keep-alive connection, send --requests
+GET /predict calls in total over random pairs of the known teams. Reports
+latency percentiles, requests per second and the server's cache/batch counters.
+
+    python -m ML.bench_server --concurrency 16 --requests 5000
+    python -m ML.bench_server --cache-size 0     # every request goes through the batcher
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote, urlparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_json(conn, path):
+    conn.request('GET', path)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def wait_until_up(host, port, timeout=120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            status, _ = get_json(conn, '/health')
+            conn.close()
+            if status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on {host}:{port} did not come up within {timeout:.0f}s")
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return float('nan')
+    k = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values) / 100) - 1))
+    return sorted_values[k]
+
+
+def run_load(host, port, pairs, concurrency, total):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local = []
+        for i in counter:
+            team_a, team_b = pairs[i % len(pairs)]
+            start = time.perf_counter()
+            try:
+                status, body = get_json(conn, f"/predict?a={quote(team_a)}&b={quote(team_b)}")
+            except (OSError, http.client.HTTPException) as exc:
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                status, body = None, {'error': str(exc)}
+            local.append(time.perf_counter() - start)
+            if status != 200:
+                with lock:
+                    errors.append(body.get('error'))
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the prediction server.")
+    parser.add_argument("--url", help="Server to test (default: start ML.server on a free port)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-size", type=int, default=4096, help="Passed to the server it starts")
+    parser.add_argument("--max-batch", type=int, default=64, help="Passed to the server it starts")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Passed to the server it starts")
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = '127.0.0.1', free_port()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'ML.server', '--port', str(port), '--cache-size', str(args.cache_size),
+             '--max-batch', str(args.max_batch), '--max-wait-ms', str(args.max_wait_ms)],
+            cwd=ROOT_DIR, stdout=subprocess.DEVNULL)
+    try:
+        wait_until_up(host, port)
+        from Collection.teams import build_team_registry
+        from ML.ml import TEAM_FILE
+        import pandas as pd
+        registry = build_team_registry()
+        teams = [registry.name(team) for team in pd.read_csv(TEAM_FILE, usecols=['Team'])['Team']]
+        teams = [team for team in teams if team]
+        pairs = [(a, b) for a in teams for b in teams if a != b]
+        random.Random(args.seed).shuffle(pairs)
+
+        elapsed, latencies, errors = run_load(host, port, pairs, args.concurrency, args.requests)
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        _, health = get_json(conn, '/health')
+        conn.close()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    ms = [latency * 1000 for latency in latencies]
+    print(f"{len(ms)} requests, {args.concurrency} connections, {len(pairs)} distinct pairs, {len(errors)} errors")
+    print(f"Throughput: {len(ms) / elapsed:.0f} requests/s over {elapsed:.2f}s")
+    print(f"Latency: p50 {percentile(ms, 50):.2f} ms, p90 {percentile(ms, 90):.2f} ms, "
+          f"p99 {percentile(ms, 99):.2f} ms, max {ms[-1]:.2f} ms")
+    print(f"Server: cache hits {health['cache_hits']}, misses {health['cache_misses']}, "
+          f"{health['batches']} batches, mean batch size {health['mean_batch_size']:.1f}")
+    if errors:
+        print(f"First error: {errors[0]}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
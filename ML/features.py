@@ -0,0 +1,90 @@
+"""
+Columnar match feature builder shared by training and prediction in ml.py.
+
+Every match becomes a pair of row positions into the per-team feature arrays
+of the feature store (one hash lookup per team spelling, not per row), so the
+A_/B_/diff_ feature matrix, the home-win labels and the set-score labels are
+built with whole-column array operations. The cost is linear in the number of
+matches; a single CLI matchup goes through the same code with one row.
+"""
+import numpy as np
+import pandas as pd
+
+SET_COUNT = 5
+
+
+def team_arrays(store):
+    """
+    (codes, impact, season, impact_columns, season_columns): the store's teams
+    as an Index of codes plus float matrices aligned to it, with one extra
+    all-NaN row at the end for teams without data.
+    """
+    codes = store.impact.index.union(store.season.index)
+    impact = store.impact.reindex(codes).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    season = store.season.reindex(codes).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    impact = np.vstack([impact, np.full((1, impact.shape[1]), np.nan)])
+    season = np.vstack([season, np.full((1, season.shape[1]), np.nan)])
+    return codes, impact, season, list(store.impact.columns), list(store.season.columns)
+
+
+def team_rows(store, codes, teams):
+    # Row of every team (code, name or alias) in the team arrays; unknown teams get the trailing NaN row
+    rows = codes.get_indexer(store.registry.codes(teams))
+    rows[rows < 0] = len(codes)
+    return rows
+
+
+def matchup_features(store, teams_a, teams_b):
+    """
+    One row per (A, B) pair in ml.py's feature order: A_ and B_ Impact aggregates,
+    A_ and B_ season stats, then the A - B differences. Missing values stay NaN.
+    """
+    codes, impact, season, impact_cols, season_cols = team_arrays(store)
+    a = team_rows(store, codes, teams_a)
+    b = team_rows(store, codes, teams_b)
+    blocks = [impact[a], impact[b], season[a], season[b], impact[a] - impact[b], season[a] - season[b]]
+    columns = ([f"A_{c}" for c in impact_cols] + [f"B_{c}" for c in impact_cols]
+               + [f"A_{c}" for c in season_cols] + [f"B_{c}" for c in season_cols]
+               + [f"diff_{c}" for c in impact_cols] + [f"diff_{c}" for c in season_cols])
+    return pd.DataFrame(np.hstack(blocks), columns=columns)
+
+
+def set_scores(match_df):
+    # Winner's set score ("3-1") per match: sets won by each side where both set scores are present
+    home_sets = np.zeros(len(match_df), dtype=np.int64)
+    away_sets = np.zeros(len(match_df), dtype=np.int64)
+    for i in range(1, SET_COUNT + 1):
+        if f'Set{i} Home' not in match_df or f'Set{i} Away' not in match_df:
+            continue
+        h = pd.to_numeric(match_df[f'Set{i} Home'], errors='coerce').to_numpy(dtype=float)
+        a = pd.to_numeric(match_df[f'Set{i} Away'], errors='coerce').to_numpy(dtype=float)
+        home_sets += h > a
+        away_sets += a > h
+    high = np.maximum(home_sets, away_sets).astype(str).astype(object)
+    low = np.minimum(home_sets, away_sets).astype(str).astype(object)
+    return high + '-' + low
+
+
+def missing_teams(store, match_df):
+    # Per match, why it has no features ('' if it has them), with one store lookup per distinct team
+    teams = pd.concat([match_df['Home Team'], match_df['Away Team']]).dropna().unique()
+    reasons = {team: store.missing(team) or '' for team in teams}
+    home = match_df['Home Team'].map(reasons).fillna('unknown team').to_numpy(dtype=object)
+    away = match_df['Away Team'].map(reasons).fillna('unknown team').to_numpy(dtype=object)
+    return np.where((home != '') & (away != ''), home + '; ' + away, home + away)
+
+
+def training_data(store, match_df):
+    """
+    (X, y, groups, set_score_labels, winners, skipped) for the matches whose
+    teams both have player and season rows: X with NaN filled as 0, y = 1 for a
+    home win, groups = home team, and `skipped` the other matches with the reason.
+    """
+    reasons = missing_teams(store, match_df)
+    keep = reasons == ''
+    skipped = match_df.loc[~keep, ['Home Team', 'Away Team']].assign(Reason=reasons[~keep])
+    matches = match_df[keep]
+    X = matchup_features(store, matches['Home Team'], matches['Away Team']).fillna(0)
+    y = (matches['Winner'] == matches['Home Team']).to_numpy(dtype=np.int64)
+    groups = matches['Home Team'].to_numpy(dtype=object)
+    return X, y, groups, set_scores(matches), matches['Winner'].tolist(), skipped
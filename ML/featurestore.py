@@ -0,0 +1,150 @@
+"""
+Per-team feature store for ml.py.
+
+Instead of filtering the whole player table (and scanning team_stats.csv with
+str.contains) for every match row and every prediction, all team features are
+built once: one groupby over the players gives each team's Impact mean,
+median, std, max, min and top-8 mean, and team_stats.csv is indexed by team.
+Both tables are keyed by federation code (Collection/teams.py), so a team can
+be looked up by code, name or alias. They are cached in ML/team_features.pkl
+together with a SHA-256 of the source CSVs and the team registry; the cache is
+rebuilt whenever either changes. Feature lookups are then a hash lookup of one
+precomputed row.
+
+    python -m ML.featurestore [--rebuild]
+"""
+import argparse
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from Collection.teams import TeamRegistry
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+PLAYER_FILE = os.path.join(DATA_DIR, "merged_stats.csv")
+TEAM_FILE = os.path.join(DATA_DIR, "team_stats.csv")
+STORE_FILE = os.path.join(DATA_DIR, "team_features.pkl")
+STORE_VERSION = 2  # bump when the stored features change shape
+
+IMPACT_STATS = ['mean', 'median', 'std', 'max', 'min', 'top8mean']
+
+
+def source_hash(paths, top_n=8, registry=None):
+    # SHA-256 over the bytes of every source file (plus the store layout and team index), read in 1 MB chunks
+    digest = hashlib.sha256(f"v{STORE_VERSION}:top{top_n}".encode())
+    if registry is not None:
+        digest.update(registry.fingerprint().encode())
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def impact_features(player_df, top_n=8, registry=None):
+    """
+    One row per team code with impact_mean ... impact_top8mean, from a single
+    groupby. The top-N mean averages the players ranked within the first N of
+    their team by Impact (highest first, NaN last). Players whose team does not
+    resolve are left out (and recorded in registry.unresolved).
+    """
+    registry = TeamRegistry() if registry is None else registry
+    players = pd.DataFrame({'Team': registry.codes(player_df['Team'], 'merged_stats.csv'),
+                            'Impact': player_df['Impact'].astype(float)})
+    players = players[players['Team'].notna()]
+    ranked = players.sort_values('Impact', ascending=False, kind='stable', na_position='last')
+    rank = ranked.groupby('Team', sort=False).cumcount().reindex(players.index)
+    players['top'] = players['Impact'].where(rank < top_n)
+    features = players.groupby('Team', sort=False).agg(
+        impact_mean=('Impact', 'mean'),
+        impact_median=('Impact', 'median'),
+        impact_std=('Impact', 'std'),
+        impact_max=('Impact', 'max'),
+        impact_min=('Impact', 'min'),
+        impact_top8mean=('top', 'mean'),
+    )
+    return features
+
+
+def season_features(team_df, registry=None):
+    # team_stats.csv indexed by team code, columns prefixed season_ (first row wins on repeats, unresolved rows dropped)
+    registry = TeamRegistry() if registry is None else registry
+    season = team_df.drop(columns=['Team']).add_prefix('season_')
+    season.index = pd.Index(registry.codes(team_df['Team'], 'team_stats.csv'), dtype=object)
+    return season[season.index.notna() & ~season.index.duplicated()]
+
+
+class TeamFeatureStore:
+    """Precomputed team features with constant-time lookup by team code, name or alias."""
+
+    def __init__(self, impact, season, registry=None, source_hash=None):
+        self.impact = impact
+        self.season = season
+        self.registry = TeamRegistry() if registry is None else registry
+        self.source_hash = source_hash
+        self._impact_rows = impact.to_dict('index')
+        self._season_rows = season.to_dict('index')
+        self._missing_impact = {f"impact_{stat}": np.nan for stat in IMPACT_STATS}
+        self._missing_season = {col: np.nan for col in season.columns}
+
+    def impact_features(self, team_name):
+        return dict(self._impact_rows.get(self.registry.code(team_name), self._missing_impact))
+
+    def season_features(self, team_name):
+        return dict(self._season_rows.get(self.registry.code(team_name), self._missing_season))
+
+    def missing(self, team_name):
+        # Why a team would get empty features: None if it has both player and season rows
+        code = self.registry.code(team_name)
+        if code is None:
+            return f"unknown team {team_name!r}"
+        gaps = [what for what, rows in (('players', self._impact_rows), ('season stats', self._season_rows))
+                if code not in rows]
+        return f"no {' or '.join(gaps)} for {team_name!r} ({code})" if gaps else None
+
+
+def build_feature_store(player_file=PLAYER_FILE, team_file=TEAM_FILE, top_n=8, registry=None):
+    registry = TeamRegistry() if registry is None else registry
+    player_df = pd.read_csv(player_file, usecols=['Team', 'Impact'])
+    team_df = pd.read_csv(team_file)
+    return TeamFeatureStore(impact_features(player_df, top_n, registry), season_features(team_df, registry),
+                            registry, source_hash([player_file, team_file], top_n, registry))
+
+
+def load_feature_store(player_file=PLAYER_FILE, team_file=TEAM_FILE, path=STORE_FILE, top_n=8, rebuild=False,
+                       registry=None):
+    """
+    The cached store when its source hash matches the current CSVs and team
+    registry, otherwise a freshly built one (saved back to `path` with a temp
+    file and rename).
+    """
+    registry = TeamRegistry() if registry is None else registry
+    current = source_hash([player_file, team_file], top_n, registry)
+    if not rebuild and os.path.exists(path):
+        try:
+            cached = pd.read_pickle(path)
+        except Exception:
+            cached = None
+        if cached is not None and cached.get('source_hash') == current:
+            return TeamFeatureStore(cached['impact'], cached['season'], registry, current)
+    store = build_feature_store(player_file, team_file, top_n, registry)
+    tmp_path = f"{path}.tmp"
+    pd.to_pickle({'source_hash': store.source_hash, 'impact': store.impact, 'season': store.season}, tmp_path)
+    os.replace(tmp_path, path)
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the cached per-team feature store.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if the source CSVs are unchanged")
+    args = parser.parse_args(argv)
+    store = load_feature_store(rebuild=args.rebuild)
+    for line in store.registry.report():
+        print(line)
+    print(f"{len(store.impact)} player teams, {len(store.season)} season rows, source hash {store.source_hash[:12]}")
+    print(f"Feature store saved to {STORE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,31 @@
 #!/usr/bin/env python3
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+import argparse
 import csv
-import time
+import json
 import os
-from datetime import datetime
+import sys
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+from Collection.driverpool import DriverPool
+from Collection.engine import PageTimeout, add_engine_arguments, engine_from_args, time_left
+from Collection.instrument import timed_wait
+from Collection.pagecache import CacheMiss, add_cache_arguments, cache_from_args, fetch_page
+from Collection.tableparser import parse_match_links, parse_match_page
 
 # Config
-SCHEDULE_URL = "https://en.volleyballworld.com/volleyball/competitions/volleyball-nations-league/schedule/#fromDate=2025-08-02&gender=men&undefined=men"
-START_WEEK_LABEL = "1 AUGUST"
-END_WEEK_LABEL = "30 MAY"
-
-chrome_options = Options()
-# Commenting out headless mode for debugging
-# chrome_options.add_argument("--headless")
-
-# Add debugging output to ensure the browser opens
-print("Initializing Selenium...")
-service = ChromeService()
-driver = webdriver.Chrome(service=service, options=chrome_options)
-print("Selenium initialized successfully.")
+SCHEDULE_BASE_URL = "https://en.volleyballworld.com/volleyball/competitions/volleyball-nations-league/schedule/"
+SEASON_START = "2025-05-30"
+SEASON_END = "2025-08-02"
+GENDER = "men"
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MATCH_FILE = os.path.join(ROOT_DIR, "ML", "match_set_stats.csv")
+MATCH_LINKS_FILE = os.path.join(ROOT_DIR, "Dataset", "match_links.csv")
+CHECKPOINT_FILE = os.path.join(ROOT_DIR, "ML", "match_set_stats.checkpoint.jsonl")
 
 # Mapping table for converting table row names to human-readable names
 STAT_NAME_MAPPING = {
@@ -38,72 +40,62 @@ STAT_NAME_MAPPING = {
     # Add more mappings here as needed
 }
 
-def get_week_label(driver):
-    # Returns the current week label (e.g., "2 AUGUST")
+def week_url(from_date, gender=GENDER):
+    return f"{SCHEDULE_BASE_URL}#fromDate={from_date.isoformat()}&gender={gender}&undefined={gender}"
+
+def week_urls(season_start=SEASON_START, season_end=SEASON_END, gender=GENDER):
+    # One schedule URL per week covering the season, latest week first
+    day = datetime.strptime(season_start, "%Y-%m-%d").date()
+    end = datetime.strptime(season_end, "%Y-%m-%d").date()
+    urls = []
+    while day <= end:
+        urls.append(week_url(day, gender))
+        day += timedelta(days=7)
+    return urls[::-1]
+
+def load_week_page(driver, url):
+    # Week pages differ only by URL fragment; leave the page first so the schedule app reloads
+    if driver.current_url.split("#")[0] == url.split("#")[0]:
+        driver.get("about:blank")
+    driver.get(url)
+    timed_wait(driver, time_left(20)).until(EC.presence_of_element_located((By.CSS_SELECTOR, ".vbw-gs2-matches-container")))
+    timeout = time_left(5)
     try:
-        week_label_elem = driver.find_element(By.CSS_SELECTOR, ".weekly-nav-text-wrap")
-        return week_label_elem.text.strip().upper()
-    except Exception:
-        return ""
+        timed_wait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, ".vbw-gs2-date-row")))
+    except TimeoutException:
+        if timeout < 5:
+            raise PageTimeout(f"page time budget spent waiting for {url}")
+        # otherwise: week without matches
+    return driver.page_source
 
-def scrape_match_links(driver):
-    # Returns a list of (date, match_url) for all matches on the current week page, only for 'Men' (case-insensitive)
+def scrape_match_links(browser, url, cache=None, gender=GENDER):
+    # Returns a list of (date, match_url) for all matches of the given week URL, only for one gender (case-insensitive)
+    html = fetch_page(browser, url, load_week_page, cache=cache)
+    links = parse_match_links(html, url, gender=gender)
+    print(f"Found {len(links)} matches for week {url.split('#')[1]}")
+    return links
+
+def dedupe_links(link_lists):
     links = []
     seen = set()
-    wait = WebDriverWait(driver, 20)
-    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".vbw-gs2-matches-container")))
-    date_rows = driver.find_elements(By.CSS_SELECTOR, ".vbw-gs2-date-row")
-    for date_row in date_rows:
-        try:
-            date_str = date_row.get_attribute("data-date") or ""
-            match_items = date_row.find_elements(By.CSS_SELECTOR, ".vbw-gs2-match-item")
-            for match in match_items:
-                try:
-                    data_card = match.find_element(By.CSS_SELECTOR, ".vbw-gs2-match-data-card")
-                    # Check gender (look for p tag with class containing 'vbw-gs2-match-gender')
-                    gender = ""
-                    try:
-                        gender_elem = data_card.find_element(By.CSS_SELECTOR, "p.vbw-gs2-match-gender")
-                        gender = gender_elem.text.strip()
-                    except Exception as e:
-                        print(f"No gender found for match card, skipping. Error: {e}")
-                        continue
-                    if gender.strip().lower() != "men":
-                        # print(f"Skipping non-Men match: gender found was '{gender}'")
-                        continue
-                    link_elem = data_card.find_element(By.TAG_NAME, "a")
-                    match_url = link_elem.get_attribute("href")
-                    if match_url and not match_url.endswith("/#"):
-                        # If the link is relative, prepend the base URL
-                        if match_url.startswith("/"):
-                            match_url = "https://en.volleyballworld.com" + match_url
-                        if match_url not in seen:
-                            print(f"Found match link: {match_url}")
-                            links.append({"date": date_str, "match_url": match_url})
-                            seen.add(match_url)
-                except Exception as e:
-                    print(f"Error processing match item: {e}")
-                    continue
-        except Exception:
-            continue
+    for week_links in link_lists:
+        for link in week_links:
+            if link["match_url"] not in seen:
+                links.append(link)
+                seen.add(link["match_url"])
     return links
 
-def click_prev_week(driver):
-    # Only check for the bottom nav previous week button with the exact class
-    try:
-        wait = WebDriverWait(driver, 10)
-        # Look for the bottom nav previous button with the exact class
-        prev_btn = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".vbw-gs2-weekly-nav-prev.vbw-gs2-comp-weekly-nav")))
-        if prev_btn.is_displayed() and 'disabled' not in prev_btn.get_attribute('class'):
-            driver.execute_script("arguments[0].click();", prev_btn)
-            time.sleep(2)
-            return True
-        else:
-            print("Previous week button is not visible or is disabled. Stopping.")
-            return False
-    except Exception as e:
-        print("Could not click previous week button (bottom only):", e)
-        return False
+def discover_match_links(pool, season_start=SEASON_START, season_end=SEASON_END, gender=GENDER, cache=None):
+    # Fetch every week of the season in parallel across the driver pool, deduplicated globally
+    urls = week_urls(season_start, season_end, gender)
+    print(f"Fetching {len(urls)} schedule weeks from {season_start} to {season_end}")
+    link_lists = pool.map(lambda url: scrape_match_links(pool, url, cache=cache, gender=gender), urls)
+    return dedupe_links(link_lists)
+
+def replay_match_links(cache, gender=GENDER):
+    # Match links from every cached schedule week, latest week first like the live crawl
+    week_pages = sorted(cache.urls(SCHEDULE_BASE_URL), reverse=True)
+    return dedupe_links(parse_match_links(cache.get(url), url, gender=gender) for url in week_pages)
 
 def parse_week_label(week_label):
     # Example week_label: '26 Jul - 1 Aug' or '31 May - 6 Jun'
@@ -131,180 +123,276 @@ def parse_week_label(week_label):
         pass
     return None, None
 
-def scrape_match_sets(driver, match_url):
-    # Visit the match page and extract set scores (up to 5 sets), home/away team names, and winner/loser
+# Browser-side readiness check: set results and the team stats table are both rendered
+MATCH_PAGE_READY_JS = (
+    "return document.querySelector('.vbw-mu__sets--result, .vbw-mu_sets--result') !== null"
+    " && document.querySelector('tr.vbw-o-table__row') !== null;"
+)
+MATCH_PAGE_TIMEOUT = 10
+
+def load_match_page(driver, match_url):
+    # One bounded readiness wait for the whole page, then a single snapshot
     driver.get(match_url)
-    wait = WebDriverWait(driver, 20)
+    timeout = time_left(MATCH_PAGE_TIMEOUT)
     try:
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".vbw-mu__sets--result, .vbw-mu_sets--result")))
-    except Exception:
-        print(f"No set data found for {match_url}")
-        return ["", "", "", "", "", "", "", "", "", "", "", "", "", ""]
-
-    # Get home and away team abbreviations and full names
-    def get_team_info(team_block):
-        abbr = name = ""
-        try:
-            abbr = team_block.find_element(By.CSS_SELECTOR, ".vbw-mu__team__name--abbr, .vbw-mu_team_name--abbr").text.strip()
-        except Exception:
-            pass
-        try:
-            name = team_block.find_element(By.CSS_SELECTOR, ".vbw-mu__team__name:not(.vbw-mu__team__name--abbr), .vbw-mu_team_name:not(.vbw-mu_team_name--abbr)").text.strip()
-        except Exception:
-            pass
-        return abbr if abbr else name
+        timed_wait(driver, timeout, poll_frequency=0.25).until(lambda d: d.execute_script(MATCH_PAGE_READY_JS))
+    except TimeoutException:
+        # A wait cut short by the page budget is the engine's timeout (retry or fail the URL), not an unplayed match
+        if timeout < MATCH_PAGE_TIMEOUT:
+            raise PageTimeout(f"page time budget spent waiting for {match_url}")
+        # otherwise: unplayed match; missing values are reported as nulls
+    return driver.page_source
 
-    try:
-        home_team_block = driver.find_element(By.CSS_SELECTOR, ".vbw-mu__team--home, .vbw-mu_team--home")
-        home = get_team_info(home_team_block)
-    except Exception as e:
-        print(f"Could not find home team: {e}")
-        home = ""
-    try:
-        away_team_block = driver.find_element(By.CSS_SELECTOR, ".vbw-mu__team--away, .vbw-mu_team--away")
-        away = get_team_info(away_team_block)
-    except Exception as e:
-        print(f"Could not find away team: {e}")
-        away = ""
+def match_finished(html):
+    # Finished matches have a winner and never change, so their cached pages never expire
+    return parse_match_page(html, list(STAT_NAME_MAPPING.keys()))["winner"] != ""
 
-    print(f"Home: {home}, Away: {away}, URL: {match_url}")
+def scrape_match_sets(browser, match_url, cache=None):
+    """
+    Visit the match page and extract home/away team names, winner/loser, set scores
+    (up to 5 sets) and the per-match team stats in one pass over one snapshot.
+    Stats missing from the page come back as None.
+    """
+    html = fetch_page(browser, match_url, load_match_page, cache=cache, is_final=match_finished)
+    page = parse_match_page(html, list(STAT_NAME_MAPPING.keys()))
+    if not page["has_sets"]:
+        print(f"No set data found for {match_url}")
+    print(f"Home: {page['home']}, Away: {page['away']}, URL: {match_url}")
+    if page["missing"]:
+        print(f"Missing stats for {match_url}: {', '.join(page['missing'])}")
+    return match_data(page)
+
+def match_data(page):
+    # [home, away, winner, loser, 10 set points, home/away value per stat] from parse_match_page
+    team_stats = [value for stat_key in STAT_NAME_MAPPING for value in page["stats"][stat_key]]
+    return [page["home"], page["away"], page["winner"], page["loser"]] + page["sets"] + team_stats
 
-    # Determine winner and loser
-    winner = loser = ""
+def format_match_date(date_str):
+    # Convert date to number format (YYYY-MM-DD)
     try:
-        home_score_div = driver.find_element(By.CSS_SELECTOR, ".vbw-mu__score--home, .vbw-mu_score--home")
-        away_score_div = driver.find_element(By.CSS_SELECTOR, ".vbw-mu__score--away, .vbw-mu_score--away")
-        if 'winner' in home_score_div.get_attribute('class'):
-            winner = home
-            loser = away
-        elif 'winner' in away_score_div.get_attribute('class'):
-            winner = away
-            loser = home
+        # Try to parse the date string and format as YYYY-MM-DD
+        date_obj = datetime.strptime(date_str.split(" ")[1] + " " + date_str.split(" ")[2] + " " + date_str.split(" ")[3], "%b %d %Y")
+        return date_obj.strftime("%Y-%m-%d")
     except Exception:
-        pass
+        return date_str
 
-    set_data = []
-    for set_no in range(1, 6):
-        try:
-            set_div = driver.find_element(By.CSS_SELECTOR, f'.vbw-mu__sets--result[data-set-no="{set_no}"], .vbw-mu_sets--result[data-set-no="{set_no}"]')
-            points_home = ""
-            points_away = ""
-            # Home points
-            try:
-                points_home = set_div.find_element(By.CSS_SELECTOR, ".vbw-mu__pointA, .vbw-mu_pointA").text.strip()
-            except Exception:
-                pass
-            # Away points
+def build_match_row(match, match_data):
+    home, away, winner, loser = match_data[0], match_data[1], match_data[2], match_data[3]
+    set_scores = match_data[4:14]
+    team_stats = match_data[14:]
+    # Interleave set scores as Set1 Home, Set1 Away, Set2 Home, Set2 Away, ...
+    interleaved = []
+    for i in range(0, 10, 2):
+        interleaved.append(set_scores[i])
+        interleaved.append(set_scores[i+1])
+    return [format_match_date(match["date"]), home, away, winner, loser] + team_stats + interleaved
+
+def match_csv_header():
+    # Dynamically generate headers based on the mapping table
+    stat_headers = []
+    for stat_key, stat_name in STAT_NAME_MAPPING.items():
+        stat_headers.extend([f"{stat_name} Home", f"{stat_name} Away"])
+    return [
+        "Date", "Home Team", "Away Team", "Winner", "Loser"
+    ] + stat_headers + [
+        f"Set{i} {team}" for i in range(1, 6) for team in ("Home", "Away")
+    ]
+
+def _slug(text):
+    # Lowercase ASCII letters/digits only, so "Türkiye" and "Turkiye" compare equal
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+def match_key_from_link(match):
+    # (date, slug of "Home-vs-Away") from the match URL's ?match= parameter
+    slug = parse_qs(urlparse(match["match_url"]).query).get("match", [""])[0]
+    return format_match_date(match["date"]), _slug(slug)
+
+def match_key_from_row(row):
+    return row[0], _slug(f"{row[1]}vs{row[2]}")
+
+def row_finished(row):
+    # A row is final once the match has a winner
+    return len(row) > 3 and row[3] != ""
+
+def load_match_links(path=MATCH_LINKS_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [{"date": r["date"], "match_url": r["match_url"]} for r in csv.DictReader(f)]
+
+def save_match_links(links, path=MATCH_LINKS_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["date", "match_url"])
+        writer.writeheader()
+        writer.writerows(links)
+    os.replace(tmp_path, path)
+
+def merge_match_links(discovered, known):
+    # Newly discovered links first (schedule order), then previously known ones not seen this run
+    merged = []
+    seen = set()
+    for link in discovered + known:
+        if link["match_url"] not in seen:
+            merged.append(link)
+            seen.add(link["match_url"])
+    return merged
+
+def load_match_rows(path=MATCH_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [row for row in reader]
+
+def load_checkpoint(path=CHECKPOINT_FILE):
+    # {match_url: row} for matches completed by an earlier (possibly crashed) run
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
             try:
-                points_away = set_div.find_element(By.CSS_SELECTOR, ".vbw-mu__pointB, .vbw-mu_pointB").text.strip()
-            except Exception:
-                pass
-            set_data.extend([points_home, points_away])
-        except Exception:
-            set_data.extend(["", ""])
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            done[entry["match_url"]] = entry["row"]
+    return done
 
-    team_stats = scrape_team_stats(driver)
+def append_checkpoint(checkpoint_file, match_url, row):
+    checkpoint_file.write(json.dumps({"match_url": match_url, "row": row}) + "\n")
+    checkpoint_file.flush()
+    os.fsync(checkpoint_file.fileno())
 
-    return [home, away, winner, loser] + set_data + team_stats
+def write_match_rows(rows, path=MATCH_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(match_csv_header())
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+    print(f"Match set stats saved to {path}")
 
-def scrape_stat(driver, stat_key):
-    try:
-        # Wait for the stat row to load
-        stat_row = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, f"tr.vbw-o-table__row.{stat_key}"))
-        )
-        # print(f"{stat_key.capitalize()} row found.")
-
-        team_a_stat = stat_row.find_element(
-            By.CSS_SELECTOR, "td.vbw-o-table__cell.-td-teamA span"
-        )
-        team_b_stat = stat_row.find_element(
-            By.CSS_SELECTOR, "td.vbw-o-table__cell.-td-teamB span"
-        )
-
-        team_a_stat = team_a_stat.text.strip()
-        team_b_stat = team_b_stat.text.strip()
-
-        # print(f"Team A {stat_key.capitalize()}: {team_a_stat}, Team B {stat_key.capitalize()}: {team_b_stat}")
-        return [team_a_stat, team_b_stat]
-    except Exception as e:
-        print(f"Error grabbing {stat_key} stat: {e}")
-        return [None, None]
-
-def scrape_team_stats(driver):
-    team_stats = []
-    for stat_key in STAT_NAME_MAPPING.keys():
-        team_stats.extend(scrape_stat(driver, stat_key))
-    return team_stats
-
-def main():
-    all_rows = []
+def plan_matches(match_links, existing_rows, checkpoint, incremental):
+    """
+    Split match_links into rows that can be reused and links that still need scraping.
+    Reused rows come from the checkpoint (always) and, in incremental mode, from finished
+    rows already in match_set_stats.csv.
+    """
+    reused = {}
+    for match in match_links:
+        row = checkpoint.get(match["match_url"])
+        if row is not None and row_finished(row):
+            reused[match["match_url"]] = row
+    if incremental:
+        existing = {match_key_from_row(row): row for row in existing_rows if row_finished(row)}
+        for match in match_links:
+            row = existing.get(match_key_from_link(match))
+            if match["match_url"] not in reused and row is not None:
+                reused[match["match_url"]] = row
+    todo = [match for match in match_links if match["match_url"] not in reused]
+    return reused, todo
+
+def incremental_season_start(existing_rows, season_start=SEASON_START):
+    # Only weeks from one week before the latest finished match can hold new results
+    dates = [row[0] for row in existing_rows if row_finished(row)]
     try:
-        driver.get(SCHEDULE_URL)
-        wait = WebDriverWait(driver, 30)
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".weekly-nav-text-wrap")))
-        time.sleep(2)
-        week_label = get_week_label(driver)
-        print(f"Starting at week: {week_label}")
-        match_links = []
-        while True:
-            current_url = driver.current_url
-            if current_url == "https://en.volleyballworld.com/volleyball/competitions/volleyball-nations-league/schedule/#fromDate=2025-05-30&gender=men&undefined=men":
-                print(f"Reached end week URL: {current_url}. Stopping.")
-                break
-            links = scrape_match_links(driver)
-            print(f"Found {len(links)} matches for week {week_label}")
-            match_links.extend(links)
-            clicked = click_prev_week(driver)
-            if not clicked:
-                print("No more previous week button. Stopping loop.")
-                break
-            week_label = get_week_label(driver)
-            print(f"Switched to week: {week_label}")
-        # For each match, scrape set data
-        for idx, match in enumerate(match_links):  # Process all games
-            # Convert date to number format (YYYY-MM-DD)
-            date_str = match["date"]
+        latest = max(datetime.strptime(date, "%Y-%m-%d").date() for date in dates)
+    except ValueError:
+        return season_start
+    return max(season_start, (latest - timedelta(days=7)).isoformat())
+
+def scrape_matches(pool, cache=None, incremental=False, season_start=SEASON_START, season_end=SEASON_END, gender=GENDER):
+    """
+    Scrape every match row and rewrite match_set_stats.csv. A match whose page
+    fails keeps its previous row (if any), and the checkpoint is kept for the
+    next run. Returns the URLs of the matches that failed.
+    """
+    replay = cache is not None and cache.replay
+    # Previous rows are only reused as-is in incremental mode, but always stand in for failed matches
+    existing_rows = load_match_rows()
+    known_links = load_match_links()
+    checkpoint = load_checkpoint()
+    if checkpoint:
+        print(f"Resuming: {len(checkpoint)} matches found in checkpoint {CHECKPOINT_FILE}")
+
+    if replay:
+        match_links = replay_match_links(cache, gender=gender)
+    else:
+        if incremental:
+            season_start = incremental_season_start(existing_rows, season_start)
+        match_links = discover_match_links(pool, season_start, season_end, gender, cache=cache)
+    if incremental:
+        match_links = merge_match_links(match_links, known_links)
+    if not replay:
+        save_match_links(merge_match_links(match_links, known_links))
+
+    reused, todo = plan_matches(match_links, existing_rows, checkpoint, incremental)
+    print(f"{len(todo)} matches to scrape, {len(reused)} already up to date")
+    # Scrape match pages concurrently, checkpointing every completed row
+    lock = threading.Lock()
+    failed = []
+    with open(CHECKPOINT_FILE, mode="a", encoding="utf-8") as checkpoint_file:
+        def scrape(match):
             try:
-                # Try to parse the date string and format as YYYY-MM-DD
-                date_obj = datetime.strptime(date_str.split(" ")[1] + " " + date_str.split(" ")[2] + " " + date_str.split(" ")[3], "%b %d %Y")
-                date = date_obj.strftime("%Y-%m-%d")
-            except Exception:
-                date = date_str
-            match_data = scrape_match_sets(driver, match["match_url"])
-            home, away, winner, loser = match_data[0], match_data[1], match_data[2], match_data[3]
-            set_scores = match_data[4:14]
-            team_stats = match_data[14:]
-            # Interleave set scores as Set1 Home, Set1 Away, Set2 Home, Set2 Away, ...
-            interleaved = []
-            for i in range(0, 10, 2):
-                interleaved.append(set_scores[i])
-                interleaved.append(set_scores[i+1])
-            row = [date, home, away, winner, loser] + team_stats + interleaved
+                match_data = scrape_match_sets(pool, match["match_url"], cache=cache)
+            except CacheMiss:
+                print(f"Match page not cached, skipping: {match['match_url']}")
+                return
+            except Exception as e:
+                print(f"Error scraping match {match['match_url']}: {e}")
+                with lock:
+                    failed.append(match["match_url"])
+                return
+            row = build_match_row(match, match_data)
+            with lock:
+                reused[match["match_url"]] = row
+                append_checkpoint(checkpoint_file, match["match_url"], row)
+                done = len(reused)
+            print(f"Scraped sets for match {done}/{len(match_links)}: {match['match_url']}")
+
+        pool.map(scrape, todo)
+
+    # Save to CSV: rows in schedule order (previous row for matches not scraped), plus old rows
+    # whose link is no longer discovered
+    previous = {match_key_from_row(row): row for row in existing_rows}
+    all_rows = []
+    for match in match_links:
+        row = reused.get(match["match_url"], previous.get(match_key_from_link(match)))
+        if row is not None:
             all_rows.append(row)
-            print(f"Scraped sets for match {idx+1}/{len(match_links)}: {match['match_url']}")
-        # Save to CSV
-        dataset_dir = "ML"
-        if not os.path.exists(dataset_dir):
-            os.makedirs(dataset_dir)
-        out_path = os.path.join(dataset_dir, "match_set_stats.csv")
-        with open(out_path, mode="w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            # Dynamically generate headers based on the mapping table
-            stat_headers = []
-            for stat_key, stat_name in STAT_NAME_MAPPING.items():
-                stat_headers.extend([f"{stat_name} Home", f"{stat_name} Away"])
-
-            header = [
-                "Date", "Home Team", "Away Team", "Winner", "Loser"
-            ] + stat_headers + [
-                f"Set{i} {team}" for i in range(1, 6) for team in ("Home", "Away")
-            ]
-            writer.writerow(header)
-            writer.writerows(all_rows)
-        print(f"Match set stats saved to {out_path}")
-    finally:
-        driver.quit()
+    covered = {match_key_from_row(row) for row in all_rows}
+    all_rows.extend(row for row in existing_rows if match_key_from_row(row) not in covered)
+    write_match_rows(all_rows)
+    if failed:
+        print(f"{len(failed)} matches failed and kept their previous rows; "
+              f"checkpoint kept for the next run: {CHECKPOINT_FILE}")
+    else:
+        os.remove(CHECKPOINT_FILE)
+    return failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape VNL match set scores and per-match team stats.")
+    parser.add_argument("--incremental", action="store_true", help="Only scrape matches that are new or unfinished in match_set_stats.csv")
+    parser.add_argument("--season-start", default=SEASON_START, help="First schedule week to scan (YYYY-MM-DD)")
+    parser.add_argument("--season-end", default=SEASON_END, help="Last schedule week to scan (YYYY-MM-DD)")
+    parser.add_argument("--gender", default=GENDER, help="Competition gender on the schedule (men/women)")
+    parser.add_argument("--workers", type=int, default=4, help="Number of browsers fetching schedule weeks in parallel")
+    add_cache_arguments(parser)
+    add_engine_arguments(parser)
+    args = parser.parse_args(argv)
+    cache = cache_from_args(args)
+
+    # Browsers start lazily, so --replay never launches one
+    with DriverPool(size=args.workers) as pool, engine_from_args(args, pool) as engine:
+        failed = scrape_matches(engine, cache=cache, incremental=args.incremental, season_start=args.season_start,
+                                season_end=args.season_end, gender=args.gender)
+        print(engine.summary())
+    return 1 if failed else 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+All-pairs matchup matrix: every ordered pair of teams scored in one batch.
+
+The A_/B_/diff_ features of all n * (n - 1) ordered pairs are gathered from the
+feature store in one array operation, the winner model is called once on that
+matrix, and the set-score model once on the matching set-score inputs (the
+predicted winner as one-hot, its win probability and the feature size, from
+artifact.set_score_inputs as for a single pair). The command scores with the
+NumPy LinearModels of ML/models.npz. Two files are written:
+
+- matchup_matrix.csv: one row per ordered pair with P(A wins), the predicted
+  winner and its probability, the full set-score distribution and the most
+  likely score;
+- matchup_matrix.bin: the same numbers for programs that do not run Python. A
+  little-endian uint32 header length, a UTF-8 JSON header (teams, codes,
+  set-score classes, array shapes and byte offsets), then float32 arrays:
+  win_probability[n][n] (row team beats column team, NaN on the diagonal) and
+  set_score_probability[n][n][classes] (conditioned on the predicted winner).
+
+    python -m ML.matchups
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_FILE = os.path.join(DATA_DIR, "matchup_matrix.csv")
+BINARY_FILE = os.path.join(DATA_DIR, "matchup_matrix.bin")
+BINARY_VERSION = 1
+
+
+def ordered_pairs(n):
+    # Row and column index of every ordered pair (i, j), i != j, in row-major order
+    a, b = np.divmod(np.arange(n * n), n)
+    keep = a != b
+    return a[keep], b[keep]
+
+
+def score_pairs(store, win_model, win_columns, set_model, set_columns, teams_a, teams_b):
+    """
+    Score the pairs (teams_a[i], teams_b[i]) with one predict_proba per model
+    (LinearModels or the fitted sklearn estimators). Returns (prob_a, a_wins,
+    confidence, set_proba, classes): P(A wins), whether A is the predicted
+    winner, the predicted winner's probability, and the set-score distribution
+    conditioned on the predicted winner.
+    """
+    from ML.artifact import set_score_inputs
+    from ML.features import matchup_features
+    registry = store.registry
+    X = matchup_features(store, teams_a, teams_b).fillna(0).reindex(columns=win_columns, fill_value=0)
+    prob_a = win_model.predict_proba(X)[:, 1]
+    a_wins = prob_a >= 1.0 - prob_a
+    confidence = np.where(a_wins, prob_a, 1.0 - prob_a)
+    winners = np.where(a_wins, np.asarray(teams_a, dtype=object), np.asarray(teams_b, dtype=object))
+    winner_names = [registry.name(team) for team in winners]
+    S = set_score_inputs(X.to_numpy(dtype=float), win_columns, set_columns, winner_names, confidence)
+    set_proba = set_model.predict_proba(pd.DataFrame(S, columns=set_columns))
+    return prob_a, a_wins, confidence, set_proba, [str(c) for c in set_model.classes_]
+
+
+def matchup_matrix(store, win_model, win_columns, set_model, set_columns, teams=None):
+    """
+    Score every ordered pair of `teams` (codes, names or aliases; default every
+    team in team_stats.csv). Returns (names, codes, pairs, win_matrix, set_matrix,
+    classes): the teams, the long-form pair table and the (n x n) /
+    (n x n x classes) arrays.
+    """
+    registry = store.registry
+    codes = list(store.season.index) if teams is None else [registry.code(team) for team in teams]
+    unknown = [team for team, code in zip(teams or codes, codes) if code is None]
+    if unknown:
+        raise ValueError(f"Unknown teams: {', '.join(map(str, unknown))}")
+    names = np.array([registry.names[code] for code in codes], dtype=object)
+    n = len(codes)
+    a, b = ordered_pairs(n)
+    A = np.array(codes, dtype=object)[a]
+    B = np.array(codes, dtype=object)[b]
+
+    # One feature matrix, one predict_proba per model
+    prob_a, a_wins, confidence, set_proba, classes = score_pairs(
+        store, win_model, win_columns, set_model, set_columns, A, B)
+    winner_idx = np.where(a_wins, a, b)
+
+    pairs = pd.DataFrame({
+        'Team A': names[a], 'Team B': names[b],
+        'Code A': A, 'Code B': B,
+        'P(A wins)': prob_a,
+        'Predicted Winner': names[winner_idx],
+        'Winner Probability': confidence,
+    })
+    for k, cls in enumerate(classes):
+        pairs[f'P({cls})'] = set_proba[:, k]
+    pairs['Most Likely Score'] = np.array(classes, dtype=object)[set_proba.argmax(axis=1)]
+    pairs['Score Probability'] = set_proba.max(axis=1)
+
+    win_matrix = np.full((n, n), np.nan)
+    win_matrix[a, b] = prob_a
+    set_matrix = np.full((n, n, len(classes)), np.nan)
+    set_matrix[a, b] = set_proba
+    return names.tolist(), codes, pairs, win_matrix, set_matrix, classes
+
+
+def write_binary(path, names, codes, win_matrix, set_matrix, classes):
+    # uint32 header length, JSON header, then the float32 arrays back to back
+    arrays = [('win_probability', win_matrix.astype('<f4')), ('set_score_probability', set_matrix.astype('<f4'))]
+    offset = 0
+    layout = []
+    for name, array in arrays:
+        layout.append({'name': name, 'dtype': 'float32', 'shape': list(array.shape), 'offset': offset})
+        offset += array.nbytes
+    header = json.dumps({
+        'version': BINARY_VERSION, 'teams': names, 'codes': codes, 'set_score_classes': classes,
+        'arrays': layout, 'note': 'offsets are from the end of the header; little-endian',
+    }, ensure_ascii=False).encode('utf-8')
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for _, array in arrays:
+            f.write(array.tobytes(order='C'))
+    os.replace(tmp_path, path)
+
+
+def read_binary(path):
+    # (header, {name: array}) of a matchup_matrix.bin file
+    with open(path, 'rb') as f:
+        (length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length).decode('utf-8'))
+        data = f.read()
+    arrays = {}
+    for entry in header['arrays']:
+        count = int(np.prod(entry['shape']))
+        arrays[entry['name']] = np.frombuffer(data, dtype='<f4', count=count,
+                                              offset=entry['offset']).reshape(entry['shape'])
+    return header, arrays
+
+
+def main(argv=None):
+    from ML.artifact import load_current_models
+    from ML.ml import load_team_features
+    parser = argparse.ArgumentParser(description="Score every ordered pair of teams in one batch.")
+    parser.add_argument("--teams", nargs="+", help="Teams to include (default: every team in team_stats.csv)")
+    parser.add_argument("--csv", default=CSV_FILE, help="Long-form pair table")
+    parser.add_argument("--binary", default=BINARY_FILE, help="Compact float32 matrix file")
+    args = parser.parse_args(argv)
+
+    try:
+        _, models = load_current_models()
+    except FileNotFoundError as e:
+        print(e)
+        return 1
+    win, set_score = models['win'], models['set_score']
+    names, codes, pairs, win_matrix, set_matrix, classes = matchup_matrix(
+        load_team_features(), win, win.columns, set_score, set_score.columns, args.teams)
+    tmp_path = f"{args.csv}.tmp"
+    pairs.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, args.csv)
+    write_binary(args.binary, names, codes, win_matrix, set_matrix, classes)
+    print(f"{len(pairs)} ordered pairs of {len(names)} teams saved to {args.csv} and {args.binary}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
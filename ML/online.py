@@ -0,0 +1,323 @@
+"""
+Online updates of the winner and set-score models as new matches arrive.
+
+Instead of refitting on all of match_set_stats.csv after every match day,
+`update` builds features only for the rows it has not seen before (keyed by
+date and teams, one feature pass for all of them) and takes one online step
+per match day with two SGDClassifier(loss='log_loss') models:
+
+- features are scaled with running StandardScaler statistics
+  (StandardScaler.partial_fit), updated with the new rows first;
+- each step runs --epochs passes of constant-step SGD, warm-started from the
+  current coefficients, over the new rows plus a replay sample of at most
+  REPLAY_SIZE earlier rows (a reservoir sample, so every consumed match is
+  equally likely to be in it); passes over the new rows alone, at any step
+  size, drift 0.07-0.13 in P(home win) from the refit on this data;
+- the winner model learns P(home win) from ml.py's A_/B_/diff_ features; the
+  set-score model learns the set score from those features, the winner
+  (one-hot over every registry team), the winner model's P(home win) and
+  feature_diff, as train() builds them;
+- scalers, models, the replay sample and the keys of consumed matches are
+  saved to ML/online_state.pkl after every update (tmp file + os.replace).
+
+The cost of an update depends on the number of new rows and REPLAY_SIZE, not
+on the history. Every --check-every updates (or with `check`), both models are
+compared with a full refit of the same objective on every consumed match
+(LogisticRegression, C = 1 / (alpha * n), one-vs-rest for the set score, on
+the same scaled features), and the check reports whether P(home win) stays
+within --tolerance of it on average. With --anchor, a model that drifted
+further is re-anchored to the refit's coefficients.
+
+    python -m ML.online update           # consume new rows of match_set_stats.csv
+    python -m ML.online check            # compare with a full refit now
+    python -m ML.online predict Italy Brazil
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(DATA_DIR, "online_state.pkl")
+STATE_VERSION = 2
+ALPHA = 0.01
+ETA0 = 0.01
+EPOCHS = 20
+REPLAY_SIZE = 256
+SET_SCORE_CLASSES = ['3-0', '3-1', '3-2']
+REPLAY_KEYS = ('X', 'y', 'set_scores', 'winners')
+
+
+def match_keys(match_df):
+    # "date|home|away" per match, the identity used to skip rows already consumed
+    return (match_df['Date'].astype(str) + '|' + match_df['Home Team'].astype(str) + '|'
+            + match_df['Away Team'].astype(str)).tolist()
+
+
+def set_columns(win_columns, registry):
+    # Set-score model inputs: the winner model's columns, winner one-hot over every team, win_prob, feature_diff
+    return (list(win_columns) + [f"winner_{registry.names[code]}" for code in sorted(registry.names)]
+            + ['win_prob', 'feature_diff'])
+
+
+def new_state(store, alpha=ALPHA, epochs=EPOCHS, replay_size=REPLAY_SIZE, seed=0):
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.preprocessing import StandardScaler
+    from ML.features import matchup_features
+    win_columns = list(matchup_features(store, [], []).columns)
+
+    def sgd():
+        # fit() runs all epochs in one call, starting from the current coefficients
+        return SGDClassifier(loss='log_loss', alpha=alpha, learning_rate='constant', eta0=ETA0, max_iter=epochs,
+                             tol=None, warm_start=True, random_state=seed)
+
+    return {
+        'version': STATE_VERSION, 'alpha': alpha, 'epochs': epochs, 'replay_size': replay_size,
+        'win_columns': win_columns, 'set_columns': set_columns(win_columns, store.registry),
+        'win_scaler': StandardScaler(), 'set_scaler': StandardScaler(),
+        'win_model': sgd(), 'set_model': sgd(),
+        'replay': {'X': np.empty((0, len(win_columns))), 'y': np.empty(0, dtype=np.int64),
+                   'set_scores': np.empty(0, dtype=object), 'winners': np.empty(0, dtype=object)},
+        'offered': 0, 'rng': np.random.default_rng(seed),
+        'seen': set(), 'updates': 0, 'checks': [],
+    }
+
+
+def load_state(path=STATE_FILE):
+    import joblib
+    if not os.path.exists(path):
+        return None
+    state = joblib.load(path)
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"{path} has state version {state.get('version')}, expected {STATE_VERSION}; "
+                         f"start over with: python -m ML.online update --reset")
+    return state
+
+
+def save_state(state, path=STATE_FILE):
+    import joblib
+    joblib.dump(state, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+
+def set_inputs(state, X, winner_names, win_prob):
+    # X: win-model features (ndarray in win_columns order)
+    from ML.artifact import set_score_inputs
+    return set_score_inputs(X, state['win_columns'], state['set_columns'], winner_names, win_prob)
+
+
+def is_fitted(state):
+    return hasattr(state['win_model'], 'coef_')
+
+
+def new_rows(state, store, match_df):
+    """
+    Training rows of the matches in `match_df` that have features:
+    ({'X', 'y', 'set_scores', 'winners'} arrays, the matches' dates).
+    """
+    from ML.features import training_data
+    X, y, _, set_score_labels, winners, skipped = training_data(store, match_df)
+    rows = {
+        'X': X.reindex(columns=state['win_columns'], fill_value=0).to_numpy(dtype=float),
+        'y': np.asarray(y, dtype=np.int64),
+        'set_scores': np.asarray(set_score_labels, dtype=object),
+        'winners': np.array([store.registry.name(team) for team in winners], dtype=object),
+    }
+    return rows, match_df.drop(index=skipped.index)['Date'].astype(str).to_numpy()
+
+
+def fit_epochs(model, Z, y, classes, epochs):
+    # One warm-started fit() for all epochs; partial_fit while the model has not seen every class yet
+    if hasattr(model, 'coef_') and np.isin(classes, y).all():
+        model.fit(Z, y)
+    else:
+        for _ in range(epochs):
+            model.partial_fit(Z, y, classes=classes)
+
+
+def add_to_replay(state, rows):
+    # Reservoir sample (Algorithm R): every row offered so far stays in the replay with equal probability
+    replay, size = state['replay'], state['replay_size']
+    fill = max(0, min(len(rows['y']), size - len(replay['y'])))
+    for key in REPLAY_KEYS:
+        replay[key] = np.concatenate([replay[key], rows[key][:fill]])
+    state['offered'] += fill
+    for i in range(fill, len(rows['y'])):
+        state['offered'] += 1
+        slot = int(state['rng'].integers(state['offered']))
+        if slot < size:
+            for key in REPLAY_KEYS:
+                replay[key][slot] = rows[key][i]
+
+
+def learn(state, rows):
+    """
+    One online step on `rows` (new_rows of new played matches): update the
+    scalers with them, then run `epochs` passes over them plus the replay
+    sample for both models, and add them to the replay. Returns the number of
+    rows trained on (at most the new rows plus replay_size).
+    """
+    if not len(rows['y']):
+        return 0
+    batch = {key: np.concatenate([state['replay'][key], rows[key]]) for key in REPLAY_KEYS}
+    state['win_scaler'].partial_fit(rows['X'])
+    Z = state['win_scaler'].transform(batch['X'])
+    fit_epochs(state['win_model'], Z, batch['y'], [0, 1], state['epochs'])
+    # As in train(): actual winner one-hot, and the winner model's P(home win)
+    S = set_inputs(state, batch['X'], batch['winners'], state['win_model'].predict_proba(Z)[:, 1])
+    state['set_scaler'].partial_fit(S[-len(rows['y']):])
+    fit_epochs(state['set_model'], state['set_scaler'].transform(S), batch['set_scores'], SET_SCORE_CLASSES,
+               state['epochs'])
+    add_to_replay(state, rows)
+    return len(batch['y'])
+
+
+def refit_check(state, store, match_df, tolerance, anchor=False):
+    """
+    Compare the online models with a full refit of the same objective on every
+    consumed match in `match_df`, and whether the mean |P(home win)| difference
+    is within `tolerance`. If it is not and `anchor` is set, copy the refit's
+    coefficients into the SGD models. Returns the comparison as a dict (also
+    appended to state['checks']).
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.multiclass import OneVsRestClassifier
+    from ML.features import training_data
+    seen = match_df[[key in state['seen'] for key in match_keys(match_df)]]
+    X, y, _, set_score_labels, winners, _ = training_data(store, seen)
+    X = X.reindex(columns=state['win_columns'], fill_value=0)
+    n = len(y)
+    C = 1.0 / (state['alpha'] * n)
+    Z = state['win_scaler'].transform(X.to_numpy(dtype=float))
+    start = time.perf_counter()
+    win_ref = LogisticRegression(C=C, max_iter=5000).fit(Z, y)
+    online_p = state['win_model'].predict_proba(Z)[:, 1]
+    refit_p = win_ref.predict_proba(Z)[:, 1]
+
+    winner_names = [store.registry.name(team) for team in winners]
+    S = state['set_scaler'].transform(set_inputs(state, X.to_numpy(dtype=float), winner_names, online_p))
+    set_ref = OneVsRestClassifier(LogisticRegression(C=C, max_iter=5000)).fit(S, set_score_labels)
+    refit_time = time.perf_counter() - start
+    online_sets = state['set_model'].predict_proba(S)
+    refit_sets = set_ref.predict_proba(S)
+
+    result = {
+        'updates': state['updates'], 'matches': n, 'refit_seconds': refit_time,
+        'win_mean_abs_diff': float(np.abs(online_p - refit_p).mean()),
+        'win_agreement': float(((online_p >= 0.5) == (refit_p >= 0.5)).mean()),
+        'win_accuracy_online': float(((online_p >= 0.5) == y).mean()),
+        'win_accuracy_refit': float(((refit_p >= 0.5) == y).mean()),
+        'set_mean_total_variation': float(0.5 * np.abs(online_sets - refit_sets).sum(axis=1).mean()),
+        'set_agreement': float((online_sets.argmax(axis=1) == refit_sets.argmax(axis=1)).mean()),
+        'tolerance': tolerance, 'anchored': False,
+    }
+    result['within_tolerance'] = result['win_mean_abs_diff'] <= tolerance
+    if anchor and not result['within_tolerance']:
+        state['win_model'].coef_ = win_ref.coef_.copy()
+        state['win_model'].intercept_ = win_ref.intercept_.copy()
+        order = [list(set_ref.classes_).index(cls) for cls in state['set_model'].classes_]
+        state['set_model'].coef_ = np.vstack([set_ref.estimators_[k].coef_ for k in order])
+        state['set_model'].intercept_ = np.concatenate([set_ref.estimators_[k].intercept_ for k in order])
+        result['anchored'] = True
+    state['checks'].append(result)
+    return result
+
+
+def predict(state, store, teamA, teamB):
+    # {'winner', 'confidence', 'set_score', 'set_score_probability'} from the online models, as predict_match
+    from ML.features import matchup_features
+    X = matchup_features(store, [teamA], [teamB]).fillna(0).reindex(columns=state['win_columns'], fill_value=0)
+    probA = float(state['win_model'].predict_proba(state['win_scaler'].transform(X.to_numpy(dtype=float)))[0, 1])
+    winner, conf = (teamA, probA) if probA >= 1.0 - probA else (teamB, 1.0 - probA)
+    S = state['set_scaler'].transform(set_inputs(state, X.to_numpy(dtype=float), [store.registry.name(winner)], [conf]))
+    proba = state['set_model'].predict_proba(S)[0]
+    top = int(proba.argmax())
+    return {'winner': winner, 'confidence': conf, 'set_score': str(state['set_model'].classes_[top]),
+            'set_score_probability': float(proba[top])}
+
+
+def print_check(result):
+    print(f"Full refit on {result['matches']} matches ({result['refit_seconds'] * 1000:.0f} ms): "
+          f"mean |P(home win) diff| {result['win_mean_abs_diff']:.3f}, "
+          f"winner agreement {result['win_agreement']:.1%}, "
+          f"accuracy online {result['win_accuracy_online']:.1%} vs refit {result['win_accuracy_refit']:.1%}; "
+          f"set-score total variation {result['set_mean_total_variation']:.3f}, "
+          f"agreement {result['set_agreement']:.1%}; "
+          + ("within" if result['within_tolerance'] else "beyond") + f" tolerance {result['tolerance']:.3f}"
+          + ("; re-anchored to the refit" if result['anchored'] else ""))
+
+
+def main(argv=None):
+    import pandas as pd
+    from ML.ml import MATCH_FILE, load_team_features
+    parser = argparse.ArgumentParser(description="Online (partial_fit) updates of the match models.")
+    parser.add_argument("command", choices=["update", "check", "predict"])
+    parser.add_argument("teams", nargs="*", help="Team A and Team B for predict")
+    parser.add_argument("--matches", default=MATCH_FILE, help="Match rows to consume (new rows only)")
+    parser.add_argument("--state", default=STATE_FILE)
+    parser.add_argument("--reset", action="store_true", help="Start from an empty model")
+    parser.add_argument("--check-every", type=int, default=10, help="Updates between full-refit checks (0: never)")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Mean |P(home win)| difference from the refit that a check accepts")
+    parser.add_argument("--anchor", action="store_true",
+                        help="Re-anchor a model that drifted beyond --tolerance to the refit's coefficients")
+    args = parser.parse_args(argv)
+
+    store = load_team_features()
+    state = None if args.reset else load_state(args.state)
+
+    if args.command == "predict":
+        if len(args.teams) != 2:
+            parser.error("predict needs two teams")
+        if state is None or not is_fitted(state):
+            print("No online model yet. Run: python -m ML.online update")
+            return 1
+        problems = [p for p in (store.missing(team) for team in args.teams) if p]
+        if problems:
+            print(f"Cannot predict: {'; '.join(problems)}")
+            return 1
+        result = predict(state, store, *args.teams)
+        print(f"Prediction (online model, {len(state['seen'])} matches): {result['winner']} wins, "
+              f"confidence {result['confidence']:.2f}, set score {result['set_score']} "
+              f"(probability {result['set_score_probability']:.2f})")
+        return 0
+
+    state = state or new_state(store)
+    match_df = pd.read_csv(args.matches)
+    if args.command == "check":
+        if not is_fitted(state):
+            print("No online model yet. Run: python -m ML.online update")
+            return 1
+        result = refit_check(state, store, match_df, args.tolerance, args.anchor)
+        print_check(result)
+        save_state(state, args.state)
+        return 0 if result['within_tolerance'] or result['anchored'] else 1
+
+    # update: played rows not consumed yet, one match day per online step
+    played = match_df[match_df['Winner'].notna()]
+    new = played[[key not in state['seen'] for key in match_keys(played)]]
+    if new.empty:
+        print(f"No new matches ({len(state['seen'])} already consumed)")
+        return 0
+    start = time.perf_counter()
+    rows, dates = new_rows(state, store, new)
+    feature_time = time.perf_counter() - start
+    timings = []
+    for date, day in new.groupby(new['Date'].astype(str), sort=True):
+        start = time.perf_counter()
+        learn(state, {key: values[dates == date] for key, values in rows.items()})
+        state['seen'].update(match_keys(day))
+        state['updates'] += 1
+        timings.append(time.perf_counter() - start)
+        if args.check_every and state['updates'] % args.check_every == 0:
+            print_check(refit_check(state, store, match_df, args.tolerance, args.anchor))
+    save_state(state, args.state)
+    print(f"Consumed {len(new)} new matches ({len(dates)} with features, {feature_time * 1000:.0f} ms of features) "
+          f"in {len(timings)} updates: {np.median(timings) * 1000:.1f} ms median, {max(timings) * 1000:.1f} ms max "
+          f"per update; {len(state['seen'])} matches total, {len(state['replay']['y'])} in the replay")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
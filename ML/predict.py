@@ -0,0 +1,150 @@
+"""
+Fast-start match prediction from saved artifacts.
+
+`python -m ML.ml train` writes ML/predictor.npz next to the model pickles: every
+team's feature row (Impact aggregates and season stats, NaN where missing), the
+registry's spelling -> team index and the names of the matchup vector's
+columns. The models themselves come from ML/models.npz and are scored with
+artifact.LinearModel, the same scorer as ML/matchups.py and ML/simulate.py. A
+prediction only imports numpy, loads both files and evaluates the two linear
+models, so it never trains, never reads the CSVs and never imports pandas or
+sklearn.
+
+On a fresh clone (predictor.npz and models.npz are not committed) both files
+are rebuilt once from the committed model pickles and CSVs, which needs pandas
+and sklearn for that first run only.
+
+    python -m ML.predict Italy Brazil
+    python ML/predict.py Italy Brazil
+"""
+import os
+import sys
+import numpy as np
+
+if not __package__:
+    # Run by path (python ML/predict.py): make the repo root importable, as with python -m
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Collection.teams import team_key
+from ML.artifact import MODEL_ARTIFACT_FILE, align, load_current_models, set_score_inputs
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+PREDICTOR_FILE = os.path.join(DATA_DIR, "predictor.npz")
+
+
+def export_predictor(store, path=PREDICTOR_FILE):
+    """
+    Save the team feature table of `store` (a TeamFeatureStore). The team rows
+    are stored so that concat(A, B, A - B) per feature block gives the columns
+    of ml.py's matchup features, whose names are saved with them.
+    """
+    from ML.features import matchup_features, team_arrays
+    codes, impact, season, impact_cols, season_cols = team_arrays(store)
+    spellings = sorted(store.registry.spellings.items())
+    code_rows = {code: i for i, code in enumerate(codes)}
+    np.savez(
+        f"{path}.tmp.npz",
+        codes=np.array(list(codes), dtype=str),
+        names=np.array([store.registry.names.get(code, code) for code in codes], dtype=str),
+        spelling_keys=np.array([key for key, _ in spellings], dtype=str),
+        spelling_rows=np.array([code_rows.get(code, -1) for _, code in spellings], dtype=np.int64),
+        impact=impact[:-1], season=season[:-1],
+        complete=np.array([code in store.impact.index and code in store.season.index for code in codes]),
+        columns=np.array(list(matchup_features(store, [], []).columns), dtype=str),
+    )
+    os.replace(f"{path}.tmp.npz", path)
+
+
+def ensure_predictor(path=PREDICTOR_FILE):
+    """
+    Rebuild the team table at `path` from the CSVs when it is missing or older
+    than the model pickles. Returns True when it was rebuilt; raises
+    FileNotFoundError when there are no trained models to match it to.
+    """
+    from ML.ml import MODEL_PATH, SET_SCORE_MODEL_PATH
+    pickles = [p for p in (MODEL_PATH, SET_SCORE_MODEL_PATH) if os.path.exists(p)]
+    if len(pickles) < 2:
+        raise FileNotFoundError("Model files not found. Train the models first: python -m ML.ml train")
+    if os.path.exists(path) and all(os.path.getmtime(p) <= os.path.getmtime(path) for p in pickles):
+        return False
+    from ML.ml import load_team_features
+    export_predictor(load_team_features(), path)
+    return True
+
+
+def load_predictor(path=PREDICTOR_FILE, models_path=MODEL_ARTIFACT_FILE):
+    # The team table plus both LinearModels (predictor['models'])
+    with np.load(path, allow_pickle=False) as data:
+        predictor = {key: data[key] for key in data.files}
+    predictor['rows'] = dict(zip(predictor['spelling_keys'].tolist(), predictor['spelling_rows'].tolist()))
+    _, predictor['models'] = load_current_models(models_path)
+    return predictor
+
+
+def team_row(predictor, team):
+    # Row of a team (code, name or alias) in the prediction table, or None
+    row = predictor['rows'].get(team_key(team), -1)
+    return None if row < 0 else row
+
+
+def matchup_vector(predictor, row_a, row_b):
+    # The matchup features of A vs B (in predictor['columns'] order), NaN filled with 0 as in training
+    impact, season = predictor['impact'], predictor['season']
+    a_imp, b_imp, a_season, b_season = impact[row_a], impact[row_b], season[row_a], season[row_b]
+    x = np.concatenate([a_imp, b_imp, a_season, b_season, a_imp - b_imp, a_season - b_season])
+    return np.nan_to_num(x, nan=0.0)
+
+
+def predict(predictor, teamA, teamB):
+    """
+    {'winner', 'loser', 'confidence', 'set_score', 'set_score_probability'} for
+    teamA vs teamB, or {'error': ...} when a team is not in the prediction table.
+    """
+    rows = [team_row(predictor, team) for team in (teamA, teamB)]
+    unknown = [team for team, row in zip((teamA, teamB), rows) if row is None]
+    if unknown:
+        return {'error': f"unknown team {', '.join(repr(t) for t in unknown)}"}
+    incomplete = [team for team, row in zip((teamA, teamB), rows) if not predictor['complete'][row]]
+    if incomplete:
+        return {'error': f"no player or season rows for {', '.join(repr(t) for t in incomplete)}"}
+    win, set_score = predictor['models']['win'], predictor['models']['set_score']
+    X = align(matchup_vector(predictor, rows[0], rows[1])[None, :], predictor['columns'].tolist(), win.columns)
+    probA = float(win.predict_proba(X)[0, 1])
+    if probA >= 1.0 - probA:
+        winner, loser, winner_row, conf = teamA, teamB, rows[0], probA
+    else:
+        winner, loser, winner_row, conf = teamB, teamA, rows[1], 1.0 - probA
+    S = set_score_inputs(X, win.columns, set_score.columns, [predictor['names'][winner_row]], [conf])
+    proba = set_score.predict_proba(S)[0]
+    top = int(proba.argmax())
+    return {'winner': winner, 'loser': loser, 'confidence': conf,
+            'set_score': str(set_score.classes_[top]), 'set_score_probability': float(proba[top])}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print('Usage: python -m ML.predict "Team A" "Team B"')
+        return 2
+    try:
+        if ensure_predictor():
+            print(f"Prediction table rebuilt from the CSVs: {PREDICTOR_FILE}")
+        predictor = load_predictor()
+    except FileNotFoundError as e:
+        print(e)
+        return 1
+    result = predict(predictor, argv[0], argv[1])
+    if 'error' in result:
+        print(f"Cannot predict {argv[0]} vs {argv[1]}: {result['error']}")
+        print("Known teams: " + ", ".join(f"{name} ({code})" for code, name in
+                                          sorted(zip(predictor['codes'].tolist(), predictor['names'].tolist()))))
+        return 1
+    winner = result['winner']
+    print(f"\nPrediction: {winner} wins")
+    print(f"Confidence (probability {winner} wins): {result['confidence']:.2f}")
+    print(f"Predicted set score: {winner} wins {result['set_score']} "
+          f"(probability {result['set_score_probability']:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Parallel model selection for the match-winner model.
+
+Runs a grid (or random) search over several model families and
+hyperparameters with ml.py's features and GroupKFold by home team, and prints
+a leaderboard of accuracy, ROC-AUC, log-loss and fit time.
+
+- The feature matrix is written once to ML/selection_cache/ as .npy and every
+  worker memory-maps it (np.load(mmap_mode='r')) instead of receiving a pickled
+  copy per task.
+- Fold assignments are cached per data hash and splitter, so every candidate
+  (and every run) is scored on the same splits without re-splitting.
+- Each (candidate, fold) fit is keyed by a hash of the data, the fold, the
+  model family and its parameters. Its metrics (JSON) and fitted model
+  (joblib) are cached, so re-running or widening a search only fits what is new.
+
+Tasks (one per candidate and fold) run in a process pool, one fit per task.
+
+    python -m ML.selection                         # full grid, all families
+    python -m ML.selection --search random --n-iter 6 --families random_forest gradient_boosting
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(DATA_DIR, "selection_cache")
+LEADERBOARD_FILE = os.path.join(DATA_DIR, "model_leaderboard.csv")
+
+# family: (estimator class, fixed parameters, searched parameters)
+FAMILIES = {
+    'logistic_regression': ('sklearn.linear_model.LogisticRegression', {'max_iter': 1000},
+                            {'solver': ['liblinear', 'lbfgs'], 'C': [0.01, 0.1, 1.0, 10.0]}),
+    'random_forest': ('sklearn.ensemble.RandomForestClassifier', {'random_state': 42, 'n_jobs': 1},
+                      {'n_estimators': [200, 500], 'max_depth': [None, 5, 10], 'min_samples_leaf': [1, 5]}),
+    'gradient_boosting': ('sklearn.ensemble.GradientBoostingClassifier', {'random_state': 42},
+                          {'n_estimators': [100, 300], 'learning_rate': [0.05, 0.1], 'max_depth': [2, 3]}),
+    'hist_gradient_boosting': ('sklearn.ensemble.HistGradientBoostingClassifier', {'random_state': 42},
+                               {'learning_rate': [0.05, 0.1], 'max_depth': [None, 3], 'l2_regularization': [0.0, 1.0]}),
+}
+
+
+def digest(*parts):
+    # Short SHA-256 of JSON-able parts and arrays
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(str((part.dtype.str, part.shape)).encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+
+def share_data(X, y, groups, cache_dir=CACHE_DIR):
+    """
+    Write X and y to `cache_dir` as .npy (once per data hash) for workers to
+    memory-map. Returns (data_hash, paths).
+    """
+    X_array = np.ascontiguousarray(X.to_numpy(dtype=float))
+    y_array = np.asarray(y, dtype=np.int64)
+    data_hash = digest(X_array, y_array, list(X.columns), [str(g) for g in groups])
+    paths = {'X': os.path.join(cache_dir, f"X_{data_hash}.npy"), 'y': os.path.join(cache_dir, f"y_{data_hash}.npy")}
+    os.makedirs(cache_dir, exist_ok=True)
+    for key, array in (('X', X_array), ('y', y_array)):
+        if not os.path.exists(paths[key]):
+            np.save(f"{paths[key]}.tmp.npy", array)
+            os.replace(f"{paths[key]}.tmp.npy", paths[key])
+    return data_hash, paths
+
+
+def cached_folds(data_hash, X, y, groups, n_splits=5, cache_dir=CACHE_DIR):
+    """
+    Test-fold index of every row for GroupKFold(n_splits) by `groups`, computed
+    once per data hash and split count. Returns (fold_hash, test_fold).
+    """
+    fold_hash = digest(data_hash, 'GroupKFold', n_splits)
+    path = os.path.join(cache_dir, f"folds_{fold_hash}.npy")
+    if os.path.exists(path):
+        return fold_hash, np.load(path)
+    from sklearn.model_selection import GroupKFold
+    test_fold = np.full(len(y), -1, dtype=np.int64)
+    for k, (_, test) in enumerate(GroupKFold(n_splits=n_splits).split(X, y, groups)):
+        test_fold[test] = k
+    np.save(f"{path}.tmp.npy", test_fold)
+    os.replace(f"{path}.tmp.npy", path)
+    return fold_hash, test_fold
+
+
+def candidates(families, search='grid', n_iter=10, seed=0):
+    # (family, parameters) of every candidate: the full grid, or n_iter sampled per family
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+    result = []
+    for family in families:
+        _, fixed, space = FAMILIES[family]
+        if search == 'grid':
+            sampled = list(ParameterGrid(space))
+        else:
+            size = len(ParameterGrid(space))
+            sampled = list(ParameterSampler(space, n_iter=min(n_iter, size), random_state=seed))
+        result.extend((family, dict(fixed, **params)) for params in sampled)
+    return result
+
+
+def make_estimator(family, params):
+    module, _, name = FAMILIES[family][0].rpartition('.')
+    return getattr(importlib.import_module(module), name)(**params)
+
+
+def evaluate(task):
+    """
+    Fit one candidate on one fold and score it on the held-out rows. X is
+    memory-mapped from the shared .npy; the fitted model and metrics are cached
+    under the task key.
+    """
+    import joblib
+    from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+    key, family, params, fold, paths, test_fold_path, cache_dir = task
+    X = np.load(paths['X'], mmap_mode='r')
+    y = np.load(paths['y'], mmap_mode='r')
+    test = np.load(test_fold_path) == fold
+    model = make_estimator(family, params)
+    start = time.perf_counter()
+    model.fit(X[~test], y[~test])
+    fit_time = time.perf_counter() - start
+    proba = model.predict_proba(X[test])[:, list(model.classes_).index(1)] if 1 in model.classes_ else \
+        np.zeros(int(test.sum()))
+    y_test = np.asarray(y[test])
+    result = {
+        'key': key, 'family': family, 'params': params, 'fold': fold, 'fit_time': fit_time,
+        'accuracy': float(accuracy_score(y_test, (proba >= 0.5).astype(np.int64))),
+        'roc_auc': float(roc_auc_score(y_test, proba)) if len(np.unique(y_test)) == 2 else float('nan'),
+        'log_loss': float(log_loss(y_test, np.column_stack([1 - proba, proba]), labels=[0, 1])),
+    }
+    joblib.dump(model, os.path.join(cache_dir, 'models', f"{key}.joblib"))
+    path = os.path.join(cache_dir, 'results', f"{key}.json")
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(result, f)
+    os.replace(f"{path}.tmp", path)
+    return result
+
+
+def run_search(X, y, groups, families, search='grid', n_iter=10, n_splits=5, seed=0, workers=None,
+               cache_dir=CACHE_DIR):
+    """
+    Cross-validated metrics of every candidate, one dict per (candidate, fold),
+    fitting only the tasks that are not cached. Returns (results, fitted_count).
+    """
+    for sub in ('results', 'models'):
+        os.makedirs(os.path.join(cache_dir, sub), exist_ok=True)
+    data_hash, paths = share_data(X, y, groups, cache_dir)
+    fold_hash, _ = cached_folds(data_hash, X, y, groups, n_splits, cache_dir)
+    test_fold_path = os.path.join(cache_dir, f"folds_{fold_hash}.npy")
+    results, tasks = [], []
+    for family, params in candidates(families, search, n_iter, seed):
+        for fold in range(n_splits):
+            key = digest(data_hash, fold_hash, fold, family, params)
+            cached = os.path.join(cache_dir, 'results', f"{key}.json")
+            if os.path.exists(cached):
+                with open(cached) as f:
+                    results.append(json.load(f))
+            else:
+                tasks.append((key, family, params, fold, paths, test_fold_path, cache_dir))
+    if tasks:
+        if workers == 1:
+            results.extend(evaluate(task) for task in tasks)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results.extend(pool.map(evaluate, tasks, chunksize=max(1, len(tasks) // (4 * (os.cpu_count() or 1)))))
+    return results, len(tasks)
+
+
+def leaderboard(results):
+    # One row per candidate: mean (and std) of each metric over its folds, best ROC-AUC first
+    import pandas as pd
+    df = pd.DataFrame(results)
+    df['Params'] = df.apply(lambda row: json.dumps({k: v for k, v in row['params'].items()
+                                                     if k not in FAMILIES[row['family']][1]}, sort_keys=True), axis=1)
+    board = df.groupby(['family', 'Params'], sort=False).agg(
+        Accuracy=('accuracy', 'mean'), Accuracy_std=('accuracy', 'std'),
+        ROC_AUC=('roc_auc', 'mean'), ROC_AUC_std=('roc_auc', 'std'),
+        Log_Loss=('log_loss', 'mean'), Fit_Time=('fit_time', 'mean'), Folds=('fold', 'count'),
+    ).reset_index()
+    board = board.rename(columns={'family': 'Model', 'Accuracy_std': 'Accuracy SD', 'ROC_AUC': 'ROC-AUC',
+                                  'ROC_AUC_std': 'ROC-AUC SD', 'Log_Loss': 'Log-Loss', 'Fit_Time': 'Fit Time (s)'})
+    return board.sort_values(['ROC-AUC', 'Log-Loss'], ascending=[False, True]).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated model selection for the match-winner model.")
+    parser.add_argument("--families", nargs="+", choices=sorted(FAMILIES), default=list(FAMILIES))
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--n-iter", type=int, default=10, help="Candidates sampled per family for --search random")
+    parser.add_argument("--splits", type=int, default=5, help="GroupKFold splits")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: one per CPU)")
+    parser.add_argument("--top", type=int, default=15, help="Leaderboard rows to print")
+    parser.add_argument("--output", default=LEADERBOARD_FILE)
+    args = parser.parse_args(argv)
+
+    from ML.ml import build_training_data
+    X, y, groups, _, _ = build_training_data()
+    start = time.perf_counter()
+    results, fitted = run_search(X, y, groups, args.families, args.search, args.n_iter, args.splits, args.seed,
+                                 args.workers)
+    elapsed = time.perf_counter() - start
+    board = leaderboard(results)
+    tmp_path = f"{args.output}.tmp"
+    board.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, args.output)
+
+    print(f"{len(board)} candidates x {args.splits} folds on {len(y)} matches: {fitted} fits, "
+          f"{len(results) - fitted} from cache, {elapsed:.1f}s")
+    shown = ['Model', 'Params', 'Accuracy', 'ROC-AUC', 'Log-Loss', 'Fit Time (s)']
+    print(board[shown].head(args.top).to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    print(f"Leaderboard saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+"""
+Local HTTP/JSON prediction server.
+
+Keeps both models (logistic_regression_model.pkl, set_score_model.pkl) and the
+team feature store in memory as one immutable bundle, so a prediction costs
+neither Python startup nor CSV/pickle loads:
+
+- results are cached per (team A, team B) in an LRU keyed by the bundle
+  version, so cached answers never outlive the models they came from;
+- concurrent requests that miss the cache are merged by a micro-batcher (up to
+  --max-batch pairs or --max-wait-ms) into one predict_proba call per model;
+- a watcher re-stats the model files and source CSVs every --watch-interval
+  seconds (or on POST /reload) and, when they changed, loads a new bundle
+  off to the side and swaps it in with a single assignment. Requests already
+  in flight finish on the bundle they started with; a bundle that fails to load
+  (e.g. a model file still being written) is skipped and retried.
+
+    python -m ML.server --port 8765
+    curl 'http://127.0.0.1:8765/predict?a=Italy&b=Brazil'
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PORT = 8765
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache."""
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class MicroBatcher:
+    """
+    Collects submitted items on a queue and hands them to `score_batch` in
+    batches: a batch closes when it has `max_batch` items or `max_wait` seconds
+    after its first item arrived. Each submit returns a Future.
+    """
+
+    def __init__(self, score_batch, max_batch=64, max_wait=0.002):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self.queue.put((item, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = self.score_batch([item for item, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+def artifact_signature(paths):
+    # (path, mtime_ns, size) of every artifact; any change means the bundle is stale
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+class ModelBundle:
+    """Everything one prediction needs, loaded together and never mutated."""
+
+    def __init__(self, version, signature, store, win_model, win_columns, set_model, set_columns):
+        self.version = version
+        self.signature = signature
+        self.store = store
+        self.win_model = win_model
+        self.win_columns = win_columns
+        self.set_model = set_model
+        self.set_columns = set_columns
+        self.loaded_at = time.time()
+
+
+def load_bundle(version, model_path, set_model_path, player_file, team_file):
+    import joblib
+    from Collection.teams import build_team_registry
+    from ML.featurestore import load_feature_store
+    paths = [model_path, set_model_path, player_file, team_file]
+    signature = artifact_signature(paths)
+    win_data = joblib.load(model_path)
+    set_data = joblib.load(set_model_path)
+    store = load_feature_store(player_file, team_file, registry=build_team_registry())
+    bundle = ModelBundle(version, signature, store, win_data['model'], win_data['columns'],
+                         set_data['model'], set_data['columns'])
+    if artifact_signature(paths) != signature:
+        raise RuntimeError("artifacts changed while loading")
+    return bundle
+
+
+class PredictionService:
+    """Resident models + LRU cache + micro-batcher + hot reload."""
+
+    def __init__(self, model_path, set_model_path, player_file, team_file, cache_size=4096,
+                 max_batch=64, max_wait=0.002, watch_interval=2.0):
+        self.paths = (model_path, set_model_path, player_file, team_file)
+        self.cache = LRUCache(cache_size)
+        self.reload_lock = threading.Lock()
+        self.reloads = 0
+        self.reload_errors = 0
+        self.bundle = load_bundle(1, *self.paths)
+        self.batcher = MicroBatcher(self._score_batch, max_batch, max_wait)
+        self.watch_interval = watch_interval
+        if watch_interval > 0:
+            threading.Thread(target=self._watch, name="artifact-watcher", daemon=True).start()
+
+    def reload_if_changed(self, force=False):
+        """
+        Load a new bundle when the artifacts changed (or `force`), then swap it in.
+        Returns True if a new bundle is live. The old bundle keeps serving until
+        the swap and for requests that already hold it.
+        """
+        with self.reload_lock:
+            current = self.bundle
+            if not force and artifact_signature(self.paths) == current.signature:
+                return False
+            try:
+                bundle = load_bundle(current.version + 1, *self.paths)
+            except Exception as exc:
+                self.reload_errors += 1
+                print(f"Reload failed, still serving version {current.version}: {exc}")
+                return False
+            self.bundle = bundle  # the swap: one reference assignment
+            self.reloads += 1
+            self.cache.clear()  # keys carry the version too, so stale entries could never be served
+            print(f"Serving model version {bundle.version}")
+            return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            self.reload_if_changed()
+
+    def _score_batch(self, items):
+        # items: [(bundle, code_a, code_b)]; one predict_proba per model per bundle in the batch
+        from ML.matchups import score_pairs
+        results = [None] * len(items)
+        for bundle in {id(item[0]): item[0] for item in items}.values():
+            idx = [i for i, item in enumerate(items) if item[0] is bundle]
+            prob_a, a_wins, confidence, set_proba, classes = score_pairs(
+                bundle.store, bundle.win_model, bundle.win_columns, bundle.set_model, bundle.set_columns,
+                [items[i][1] for i in idx], [items[i][2] for i in idx])
+            names = bundle.store.registry.names
+            for k, i in enumerate(idx):
+                _, code_a, code_b = items[i]
+                top = int(set_proba[k].argmax())
+                results[i] = {
+                    'team_a': names[code_a], 'team_b': names[code_b],
+                    'p_a_wins': float(prob_a[k]),
+                    'winner': names[code_a] if a_wins[k] else names[code_b],
+                    'confidence': float(confidence[k]),
+                    'set_scores': {cls: float(p) for cls, p in zip(classes, set_proba[k])},
+                    'most_likely_score': classes[top],
+                    'model_version': bundle.version,
+                }
+        return results
+
+    def predict(self, team_a, team_b, timeout=10.0):
+        bundle = self.bundle
+        store = bundle.store
+        problems = [p for p in (store.missing(team_a), store.missing(team_b)) if p]
+        if problems:
+            raise KeyError('; '.join(problems))
+        code_a, code_b = store.registry.code(team_a), store.registry.code(team_b)
+        key = (bundle.version, code_a, code_b)
+        result = self.cache.get(key)
+        if result is not None:
+            return dict(result, cached=True)
+        result = self.batcher.submit((bundle, code_a, code_b)).result(timeout)
+        self.cache.put(key, result)
+        return dict(result, cached=False)
+
+    def health(self):
+        bundle = self.bundle
+        return {
+            'status': 'ok', 'model_version': bundle.version, 'loaded_at': bundle.loaded_at,
+            'reloads': self.reloads, 'reload_errors': self.reload_errors,
+            'cache_size': len(self.cache.items), 'cache_hits': self.cache.hits, 'cache_misses': self.cache.misses,
+            'batches': self.batcher.batches,
+            'mean_batch_size': self.batcher.items / self.batcher.batches if self.batcher.batches else 0.0,
+        }
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+
+        def _send(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _predict(self, team_a, team_b):
+            if not team_a or not team_b:
+                return self._send(400, {'error': "pass two teams as a and b"})
+            try:
+                self._send(200, service.predict(team_a, team_b))
+            except KeyError as exc:
+                self._send(404, {'error': str(exc.args[0])})
+            except Exception as exc:
+                self._send(500, {'error': str(exc)})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path == '/predict':
+                self._predict(query.get('a'), query.get('b'))
+            elif url.path == '/health':
+                self._send(200, service.health())
+            else:
+                self._send(404, {'error': f"unknown path {url.path}"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return self._send(400, {'error': "body is not JSON"})
+            if url.path == '/predict':
+                self._predict(body.get('a'), body.get('b'))
+            elif url.path == '/reload':
+                reloaded = service.reload_if_changed(force=bool(body.get('force')))
+                self._send(200, dict(service.health(), reloaded=reloaded))
+            else:
+                self._send(404, {'error': f"unknown path {url.path}"})
+
+        def log_message(self, format, *args):
+            pass  # one line per request would dominate the output under load
+
+    return Handler
+
+
+def main(argv=None):
+    from ML.ml import MODEL_PATH, PLAYER_FILE, SET_SCORE_MODEL_PATH, TEAM_FILE
+    parser = argparse.ArgumentParser(description="Serve match predictions over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-size", type=int, default=4096, help="LRU entries (0 disables the cache)")
+    parser.add_argument("--max-batch", type=int, default=64, help="Most pairs scored in one predict_proba call")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="How long a batch waits for more requests")
+    parser.add_argument("--watch-interval", type=float, default=2.0,
+                        help="Seconds between checks for changed model files (0 disables)")
+    args = parser.parse_args(argv)
+
+    if not (os.path.exists(MODEL_PATH) and os.path.exists(SET_SCORE_MODEL_PATH)):
+        print("Model files not found. Train the models first: python -m ML.ml train")
+        return 1
+    service = PredictionService(MODEL_PATH, SET_SCORE_MODEL_PATH, PLAYER_FILE, TEAM_FILE, args.cache_size,
+                                args.max_batch, args.max_wait_ms / 1000, args.watch_interval)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Serving predictions on http://{args.host}:{server.server_address[1]} (model version 1)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
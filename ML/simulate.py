@@ -0,0 +1,353 @@
+"""
+Monte Carlo tournament simulator on top of the winner and set-score models.
+
+The schedule is a match file in match_set_stats.csv's layout. Rows with a
+Winner are played and form the starting standings; rows without one, or dated
+on/after --from, are simulated. Before simulating, every (home, away) pair of
+the schedule is scored once with the NumPy LinearModels of ML/models.npz:
+P(home wins) from the winner model and, for each possible winner, the
+set-score distribution from the set-score model (winner one-hot plus its win
+probability, as predict_match does), giving six outcome probabilities per
+pair. A simulation is then pure NumPy on (simulations x matches) arrays:
+
+- sample an outcome per match (winner and 3-0 / 3-1 / 3-2);
+- sample each set's loser points from the played sets of the schedule, never
+  from the matches being simulated (the winner gets 25, or 15 in a fifth set,
+  or two more than the loser after deuce); if the schedule has no played sets
+  of a kind, match_set_stats.csv's sets dated before --from are used;
+- accumulate Won, Points (3 for a 3-0/3-1 win, 2/1 for a 3-2), Sets Won/Lost
+  and Points Won/Lost per team, as in team_stats.csv, and rank by Won, Points,
+  Set Ratio, Point Ratio (the order that reproduces team_stats.csv's Rank);
+- play the top --bracket teams through a seeded knockout (1v8, 4v5, 2v7, 3v6,
+  semifinals, bronze and final); knockout losers are placed by league rank.
+
+Simulations run in shards over a process pool. Each shard's generator comes
+from SeedSequence(--seed).spawn(), so the result does not depend on --workers.
+The output has each team's finishing-position distribution and its
+probability of qualifying for the bracket.
+
+    python -m ML.simulate --from 2025-07-16 --league-end 2025-07-20
+    python -m ML.simulate --schedule remaining.csv --sims 200000 --bracket 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+FORECAST_FILE = os.path.join(DATA_DIR, "tournament_forecast.csv")
+SET_COUNT = 5
+STAT_COLUMNS = ['Won', 'Lost', 'Points', 'Sets Won', 'Sets Lost', 'Points Won', 'Points Lost']
+
+
+def set_points(match_df):
+    # (home, away) points per set as float arrays (matches x SET_COUNT), NaN where a set was not played
+    home = np.full((len(match_df), SET_COUNT), np.nan)
+    away = np.full((len(match_df), SET_COUNT), np.nan)
+    for i in range(1, SET_COUNT + 1):
+        if f'Set{i} Home' in match_df and f'Set{i} Away' in match_df:
+            home[:, i - 1] = pd.to_numeric(match_df[f'Set{i} Home'], errors='coerce')
+            away[:, i - 1] = pd.to_numeric(match_df[f'Set{i} Away'], errors='coerce')
+    return home, away
+
+
+def loser_point_samples(match_df):
+    # Loser points of every played set: (sets 1-4, deciding fifth sets)
+    home, away = set_points(match_df)
+    loser = np.fmin(home, away)
+    regular, deciding = loser[:, :SET_COUNT - 1].ravel(), loser[:, SET_COUNT - 1]
+    return regular[~np.isnan(regular)].astype(np.int64), deciding[~np.isnan(deciding)].astype(np.int64)
+
+
+def played_standings(match_df, codes, registry):
+    """
+    Won, Lost, Points, Sets Won/Lost and Points Won/Lost per team (rows in
+    `codes` order) from played matches, counted as team_stats.csv counts them.
+    """
+    rows = pd.Index(codes)
+    stats = np.zeros((len(codes), len(STAT_COLUMNS)))
+    if len(match_df):
+        home_pts, away_pts = set_points(match_df)
+        home_sets = (home_pts > away_pts).sum(axis=1)
+        away_sets = (away_pts > home_pts).sum(axis=1)
+        home_won = home_sets > away_sets
+        loser_sets = np.minimum(home_sets, away_sets)
+        win_points = np.where(loser_sets == 2, 2, 3)
+        lose_points = np.where(loser_sets == 2, 1, 0)
+        sides = [
+            (match_df['Home Team'], home_won, home_sets, away_sets, home_pts, away_pts),
+            (match_df['Away Team'], ~home_won, away_sets, home_sets, away_pts, home_pts),
+        ]
+        for teams, won, sets_for, sets_against, pts_for, pts_against in sides:
+            index = rows.get_indexer(registry.codes(teams))
+            values = np.column_stack([won, ~won, np.where(won, win_points, lose_points), sets_for, sets_against,
+                                      np.nansum(pts_for, axis=1), np.nansum(pts_against, axis=1)])
+            np.add.at(stats, index, values)
+    return stats
+
+
+def outcome_table(store, win_model, win_columns, set_model, set_columns, codes):
+    """
+    (probabilities, loser_sets): probabilities[i, j] are the chances of the six
+    outcomes of codes[i] (home) vs codes[j] - home wins with each set-score
+    class, then away wins with each - and loser_sets the sets the loser takes
+    in each class.
+    """
+    from ML.artifact import set_score_inputs
+    from ML.features import matchup_features
+    from ML.matchups import ordered_pairs
+    names = np.array([store.registry.names[code] for code in codes], dtype=object)
+    n = len(codes)
+    a, b = ordered_pairs(n)
+    X = (matchup_features(store, np.array(codes, dtype=object)[a], np.array(codes, dtype=object)[b])
+         .fillna(0).reindex(columns=win_columns, fill_value=0))
+    prob_a = win_model.predict_proba(X)[:, 1]
+    X = X.to_numpy(dtype=float)
+    sets_if_a = set_model.predict_proba(
+        pd.DataFrame(set_score_inputs(X, win_columns, set_columns, names[a], prob_a), columns=set_columns))
+    sets_if_b = set_model.predict_proba(
+        pd.DataFrame(set_score_inputs(X, win_columns, set_columns, names[b], 1.0 - prob_a), columns=set_columns))
+    classes = [str(c) for c in set_model.classes_]
+    probabilities = np.zeros((n, n, 2 * len(classes)))
+    probabilities[a, b] = np.hstack([prob_a[:, None] * sets_if_a, (1.0 - prob_a)[:, None] * sets_if_b])
+    loser_sets = np.array([int(cls.split('-')[1]) for cls in classes] * 2)
+    return probabilities, loser_sets
+
+
+def rank_teams(stats, rng):
+    # Teams in league order per simulation: Won, Points, Set Ratio, Point Ratio, then a coin flip
+    won, _, points, sets_won, sets_lost, points_won, points_lost = np.moveaxis(stats, -1, 0)
+    set_ratio = np.divide(sets_won, sets_lost, out=np.where(sets_won > 0, np.inf, 0.0), where=sets_lost > 0)
+    point_ratio = np.divide(points_won, points_lost, out=np.where(points_won > 0, np.inf, 0.0),
+                            where=points_lost > 0)
+    return np.lexsort((rng.random(won.shape), -point_ratio, -set_ratio, -points, -won), axis=-1)
+
+
+def bracket_order(size):
+    # Seeds in bracket order, e.g. 8 -> [1, 8, 4, 5, 2, 7, 3, 6]
+    order = [1]
+    while len(order) < size:
+        order = [seed for top in order for seed in (top, 2 * len(order) + 1 - top)]
+    return np.array(order)
+
+
+def play_bracket(league_order, win, rng, size):
+    """
+    Finishing order per simulation (simulations x teams): the knockout of the
+    top `size` teams, then the rest in league order. Teams knocked out in the
+    same round are placed by league rank.
+    """
+    sims, n = league_order.shape
+    if size < 2:
+        return league_order
+    league_rank = np.empty_like(league_order)
+    np.put_along_axis(league_rank, league_order, np.arange(n)[None, :], axis=1)
+
+    def play(home, away):
+        home_wins = rng.random(home.shape) < win[home, away]
+        return np.where(home_wins, home, away), np.where(home_wins, away, home)
+
+    slots = league_order[:, bracket_order(size) - 1]
+    knocked_out = []
+    semifinal_losers = None
+    while slots.shape[1] > 2:
+        slots, losers = play(slots[:, 0::2], slots[:, 1::2])
+        if slots.shape[1] == 2:
+            semifinal_losers = losers
+        else:
+            by_rank = np.argsort(np.take_along_axis(league_rank, losers, axis=1), axis=1)
+            knocked_out.append(np.take_along_axis(losers, by_rank, axis=1))
+    champion, runner_up = play(slots[:, :1], slots[:, 1:])
+    placed = [champion, runner_up]
+    if semifinal_losers is not None:
+        placed += list(play(semifinal_losers[:, :1], semifinal_losers[:, 1:]))
+    return np.hstack(placed + knocked_out[::-1] + [league_order[:, size:]])
+
+
+def simulate_shard(tables, seed, sims):
+    """
+    Simulate `sims` tournaments with generator `seed`. Returns (finish_counts,
+    league_counts, stat_sums): teams x positions counts of the final and the
+    league position, and the summed team_stats columns.
+    """
+    rng = np.random.default_rng(seed)
+    home, away = tables['home'], tables['away']
+    n, m = len(tables['codes']), len(home)
+    stats = np.broadcast_to(tables['base'], (sims, n, len(STAT_COLUMNS))).copy()
+    if m:
+        # Outcome per match: index into home-win classes, then away-win classes
+        cumulative = tables['probabilities'][home, away].cumsum(axis=1)
+        outcome = np.minimum((rng.random((sims, m, 1)) > cumulative[None]).sum(axis=2), cumulative.shape[1] - 1)
+        home_won = outcome < cumulative.shape[1] // 2
+        loser_sets = tables['loser_sets'][outcome]
+        deciding = loser_sets == 2
+        regular_sets = np.where(deciding, 4, 3 + loser_sets)
+        winner_regular = np.where(deciding, 2, 3)
+
+        # Rally points: sampled loser points per set, winner 25 (15 in the fifth) or loser + 2
+        lost_regular = rng.choice(tables['regular_loser_points'], size=(sims, m, SET_COUNT - 1))
+        lost_deciding = rng.choice(tables['deciding_loser_points'], size=(sims, m))
+        slot = np.arange(SET_COUNT - 1)
+        played = slot < regular_sets[..., None]
+        to_winner = slot < winner_regular[..., None]
+        won_regular = np.maximum(25, lost_regular + 2)
+        winner_points = (np.where(played & to_winner, won_regular, 0).sum(axis=2)
+                         + np.where(played & ~to_winner, lost_regular, 0).sum(axis=2)
+                         + np.where(deciding, np.maximum(15, lost_deciding + 2), 0))
+        loser_points = (np.where(played & to_winner, lost_regular, 0).sum(axis=2)
+                        + np.where(played & ~to_winner, won_regular, 0).sum(axis=2)
+                        + np.where(deciding, lost_deciding, 0))
+
+        table_points = np.where(deciding, 2, 3), np.where(deciding, 1, 0)
+        sides = [
+            (home, home_won, np.where(home_won, 3, loser_sets), np.where(home_won, loser_sets, 3),
+             np.where(home_won, winner_points, loser_points), np.where(home_won, loser_points, winner_points)),
+            (away, ~home_won, np.where(home_won, loser_sets, 3), np.where(home_won, 3, loser_sets),
+             np.where(home_won, loser_points, winner_points), np.where(home_won, winner_points, loser_points)),
+        ]
+        index_base = np.arange(sims)[:, None] * n
+        for teams, won, sets_for, sets_against, pts_for, pts_against in sides:
+            index = (index_base + teams[None, :]).ravel()
+            values = [won, ~won, np.where(won, table_points[0], table_points[1]), sets_for, sets_against,
+                      pts_for, pts_against]
+            for k, value in enumerate(values):
+                stats[:, :, k] += np.bincount(index, weights=value.ravel(), minlength=sims * n).reshape(sims, n)
+
+    league_order = rank_teams(stats, rng)
+    finish = play_bracket(league_order, tables['win'], rng, tables['bracket'])
+    position = np.broadcast_to(np.arange(n), (sims, n))
+    finish_counts = np.bincount((finish * n + position).ravel(), minlength=n * n).reshape(n, n)
+    league_counts = np.bincount((league_order * n + position).ravel(), minlength=n * n).reshape(n, n)
+    return finish_counts, league_counts, stats.sum(axis=0)
+
+
+def _simulate_shard(args):
+    return simulate_shard(*args)
+
+
+def run_simulations(tables, sims, shard_size=10000, seed=0, workers=None):
+    """Sum of simulate_shard over shards of at most `shard_size`, in parallel, seeded per shard."""
+    sizes = [min(shard_size, sims - start) for start in range(0, sims, shard_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(tables, shard_seed, size) for shard_seed, size in zip(seeds, sizes)]
+    if workers == 1 or len(jobs) == 1:
+        results = [_simulate_shard(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_shard, jobs))
+    finish_counts, league_counts, stat_sums = (sum(parts) for parts in zip(*results))
+    return finish_counts, league_counts, stat_sums
+
+
+def forecast(codes, names, finish_counts, league_counts, stat_sums, sims, qualify):
+    # One row per team: qualification probability, expected team_stats columns, finishing distribution
+    n = len(codes)
+    result = pd.DataFrame({'Team': names, 'Code': codes})
+    result['P(Qualify)'] = league_counts[:, :qualify].sum(axis=1) / sims
+    result['Mean League Rank'] = (league_counts * np.arange(1, n + 1)).sum(axis=1) / sims
+    result['Mean Finish'] = (finish_counts * np.arange(1, n + 1)).sum(axis=1) / sims
+    for k, col in enumerate(STAT_COLUMNS):
+        result[f'Expected {col}'] = stat_sums[:, k] / sims
+    for position in range(n):
+        result[f'P({position + 1})'] = finish_counts[:, position] / sims
+    return result.sort_values(['Mean Finish', 'Team']).reset_index(drop=True)
+
+
+def main(argv=None):
+    from ML.artifact import load_current_models
+    from ML.ml import MATCH_FILE, load_team_features
+    parser = argparse.ArgumentParser(description="Monte Carlo forecast of league standings and the finals bracket.")
+    parser.add_argument("--schedule", default=MATCH_FILE,
+                        help="Matches (match_set_stats.csv layout); rows without a Winner are simulated")
+    parser.add_argument("--from", dest="start", help="Also simulate matches dated on or after this date")
+    parser.add_argument("--league-end", help="Ignore schedule rows after this date (e.g. the finals)")
+    parser.add_argument("--sims", type=int, default=100000)
+    parser.add_argument("--bracket", type=int, default=8, help="Teams in the knockout (power of two; 0 for none)")
+    parser.add_argument("--qualify", type=int, help="League places that qualify (default: --bracket)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: one per CPU)")
+    parser.add_argument("--shard-size", type=int, default=10000)
+    parser.add_argument("--output", default=FORECAST_FILE)
+    args = parser.parse_args(argv)
+
+    if args.bracket and args.bracket & (args.bracket - 1):
+        parser.error("--bracket must be a power of two")
+    try:
+        _, models = load_current_models()
+    except FileNotFoundError as e:
+        print(e)
+        return 1
+    store = load_team_features()
+    registry = store.registry
+    schedule = pd.read_csv(args.schedule)
+    if args.league_end:
+        schedule = schedule[schedule['Date'].astype(str) <= args.league_end]
+    unplayed = schedule['Winner'].isna().to_numpy() if 'Winner' in schedule else np.ones(len(schedule), bool)
+    if args.start:
+        unplayed = unplayed | (schedule['Date'].astype(str) >= args.start).to_numpy()
+
+    teams = pd.concat([schedule['Home Team'], schedule['Away Team']]).dropna().unique()
+    problems = [reason for reason in (store.missing(team) for team in teams) if reason]
+    if problems:
+        print("Cannot simulate: " + "; ".join(problems))
+        return 1
+    codes = sorted({registry.code(team) for team in teams})
+    if args.bracket > len(codes):
+        parser.error(f"--bracket {args.bracket} is larger than the {len(codes)} teams in the schedule")
+    names = [registry.names[code] for code in codes]
+    rows = pd.Index(codes)
+
+    win, set_score = models['win'], models['set_score']
+    probabilities, loser_sets = outcome_table(store, win, win.columns, set_score, set_score.columns, codes)
+    regular_loser_points, deciding_loser_points = loser_point_samples(schedule[~unplayed])
+    if not len(regular_loser_points) or not len(deciding_loser_points):
+        history = pd.read_csv(MATCH_FILE)
+        if args.start:
+            history = history[history['Date'].astype(str) < args.start]
+        regular_history, deciding_history = loser_point_samples(history)
+        print(f"The schedule has {len(regular_loser_points)} played sets 1-4 and {len(deciding_loser_points)} "
+              f"fifth sets; sampling set points from {MATCH_FILE} instead where empty")
+        if not len(regular_loser_points):
+            regular_loser_points = regular_history
+        if not len(deciding_loser_points):
+            deciding_loser_points = deciding_history
+        if not len(regular_loser_points) or not len(deciding_loser_points):
+            print("Cannot simulate: no played sets to sample set points from")
+            return 1
+    remaining = schedule[unplayed]
+    tables = {
+        'codes': codes,
+        'home': rows.get_indexer(registry.codes(remaining['Home Team'])),
+        'away': rows.get_indexer(registry.codes(remaining['Away Team'])),
+        'probabilities': probabilities,
+        'win': probabilities[:, :, :len(loser_sets) // 2].sum(axis=2),
+        'loser_sets': loser_sets,
+        'base': played_standings(schedule[~unplayed], codes, registry),
+        'regular_loser_points': regular_loser_points,
+        'deciding_loser_points': deciding_loser_points,
+        'bracket': args.bracket,
+    }
+
+    start = time.perf_counter()
+    finish_counts, league_counts, stat_sums = run_simulations(tables, args.sims, args.shard_size, args.seed,
+                                                              args.workers)
+    elapsed = time.perf_counter() - start
+    result = forecast(codes, names, finish_counts, league_counts, stat_sums, args.sims,
+                      args.qualify or args.bracket or len(codes))
+    tmp_path = f"{args.output}.tmp"
+    result.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, args.output)
+
+    print(f"{args.sims} simulations of {len(remaining)} remaining matches ({len(schedule) - len(remaining)} played) "
+          f"in {elapsed:.1f}s ({args.sims / elapsed:.0f}/s)")
+    shown = ['Team', 'P(Qualify)', 'Mean League Rank', 'Mean Finish', 'Expected Won', 'Expected Points', 'P(1)']
+    print(result[shown].to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    print(f"Saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
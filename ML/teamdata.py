@@ -1,24 +1,19 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+import argparse
 import csv
-import time
 import os
+from Collection.driverpool import DriverPool
+from Collection.engine import add_engine_arguments, engine_from_args, time_left
+from Collection.instrument import pause, timed_wait
+from Collection.pagecache import add_cache_arguments, cache_from_args, fetch_page
+from Collection.tableparser import parse_ranking_table
 
 url = "https://en.volleyballworld.com/volleyball/competitions/volleyball-nations-league/standings/men/#advanced"
-chrome_options = Options()
-# chrome_options.add_argument("--headless")
-chrome_options.add_argument("--no-sandbox")
-chrome_options.add_argument("--disable-dev-shm-usage")
-service = ChromeService()
-driver = webdriver.Chrome(service=service, options=chrome_options)
 
-try:
+def load_standings_page(driver, url):
     driver.get(url)
-    wait = WebDriverWait(driver, 60)
+    wait = timed_wait(driver, time_left(60))
     # Wait for the Advanced tab and click it if needed (robust for both direct and tab navigation)
     try:
         # Use the correct selector for the Advanced tab
@@ -30,31 +25,22 @@ try:
 
     # Wait for the advanced table to load
     try:
-        table = wait.until(EC.presence_of_element_located(
+        wait.until(EC.presence_of_element_located(
             (By.CSS_SELECTOR, "table.vbw-o-table.vbw-ranking-table.advanced")
         ))
     except Exception as e:
         print("Could not find the advanced team ranking table. Check selector and page load.")
-        driver.quit()
         raise e
-    time.sleep(2)
+    pause(time_left(2))
+    return driver.page_source
 
-    # Get headers
-    header_row = table.find_element(By.TAG_NAME, "thead")
-    headers = [th.text for th in header_row.find_elements(By.TAG_NAME, "th")]
-
-    # Get team rows
-    tbody = table.find_element(By.TAG_NAME, "tbody")
-    rows = tbody.find_elements(By.CSS_SELECTOR, "tr.vbw-o-table__row")
-
-    data = []
-    for idx, row in enumerate(rows):
-        cells = row.find_elements(By.TAG_NAME, "td")
-        row_data = [cell.text for cell in cells]
-        data.append(row_data)
+def scrape_team_standings(pool, cache=None):
+    # Get team rows from one page snapshot
+    data = parse_ranking_table(fetch_page(pool, url, load_standings_page, cache=cache))
+    for idx, row_data in enumerate(data):
         # Print log after each row
         if row_data:
-            print(f"{row_data[0]} ({idx+1}/{len(rows)})")
+            print(f"{row_data[0]} ({idx+1}/{len(data)})")
 
     # Save to CSV in ML directory with corrected headers
     headers = [
@@ -68,5 +54,18 @@ try:
         writer.writerows(data)
 
     print(f"Team stats saved to {out_path}")
-finally:
-    driver.quit()
\ No newline at end of file
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape VNL team standings (advanced table).")
+    add_cache_arguments(parser)
+    add_engine_arguments(parser)
+    args = parser.parse_args(argv)
+    cache = cache_from_args(args)
+
+    # Browsers start lazily, so --replay never launches one
+    with DriverPool(size=1) as pool, engine_from_args(args, pool) as engine:
+        scrape_team_standings(engine, cache=cache)
+        print(engine.summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: the former row-wise df.apply rating pass vs the vectorized one in playerrankings.py.
+
+Synthetic players are resampled from merged_stats.csv with their counts scaled
+by random factors. The row-wise version re-reads column maxima for every row,
+so it is only run up to --legacy-max players; both outputs are compared there.
+
+    python -m RatingSystem.bench_playerrankings --sizes 1000 10000 100000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from RatingSystem.playerrankings import position_map, positional_weights, rankings_table, rate_players
+
+
+def legacy_rate(df):
+    # The previous playerrankings.py pass, unchanged apart from taking df as an argument
+    df = df.copy()
+
+    def attacking(row):
+        K = row['Kills']
+        E = row['Attacking Errors']
+        A = row['Attacking Attempts']
+        KPM = row['Kills Per Match'] if 'Kills Per Match' in row else row['Attacks Per Match']
+        eff = (K - E) / A if A > 0 else 0
+        vol = KPM / df['Kills Per Match'].max() if 'Kills Per Match' in df else KPM / df['Attacks Per Match'].max()
+        raw = (max(eff, 0) ** 0.5) * (max(vol, 0) ** 1.2)
+        return [eff, vol, raw]
+
+    def blocking(row):
+        B = row['Blocks']
+        BE = row['Blocking Errors']
+        R = row['Rebounds']
+        BPM = row['Blocks Per Match']
+        denom = B + BE + R
+        eff = B / denom if denom > 0 else 0
+        vol = BPM / df['Blocks Per Match'].max()
+        raw = (max(eff, 0) ** 0.4) * (max(vol, 0) ** 1.3)
+        return [eff, vol, raw]
+
+    def serving(row):
+        A = row['Aces']
+        SA = row['Service Attempts']
+        APM = row['Aces Per Match'] if 'Aces Per Match' in row else row['Serves Per Match']
+        eff = A / SA if SA > 0 else 0
+        vol = APM / df['Aces Per Match'].max() if 'Aces Per Match' in df else APM / df['Serves Per Match'].max()
+        raw = (max(eff, 0) ** 0.6) * (max(vol, 0) ** 1.1)
+        return [eff, vol, raw]
+
+    def setting(row):
+        RS = row['Running Sets']
+        SS = row['Still Sets']
+        SE = row['Setting Errors']
+        SPM = row['Sets Per Match']
+        denom = RS + SS + SE
+        eff = RS / denom if denom > 0 else 0
+        vol = SPM / df['Sets Per Match'].max()
+        raw = (max(eff, 0) ** 0.5) * (max(vol, 0) ** 1.2)
+        return [eff, vol, raw]
+
+    def defense(row):
+        GS = row['Great Saves']
+        DE = row['Defensive Errors']
+        DR = row['Defensive Receptions']
+        DPM = row['Digs Per Match']
+        eff = (GS - DE) / DR if DR > 0 else 0
+        vol = DPM / df['Digs Per Match'].max()
+        raw = (max(eff, 0) ** 0.4) * (max(vol, 0) ** 1.3)
+        return [eff, vol, raw]
+
+    def receiving(row):
+        SR = row['Successful Receives']
+        RE = row['Receiving Errors']
+        SRc = row['Service Receptions']
+        RPM = row['Receives Per Match']
+        eff = (SR - RE) / SRc if SRc > 0 else 0
+        vol = RPM / df['Receives Per Match'].max()
+        raw = (max(eff, 0) ** 0.5) * (max(vol, 0) ** 1.2)
+        return [eff, vol, raw]
+
+    for cat, func in zip(
+        ['att', 'blk', 'serv', 'set', 'def', 'recv'],
+        [attacking, blocking, serving, setting, defense, receiving]
+    ):
+        df[[f'{cat}_eff', f'{cat}_vol', f'{cat}_raw']] = df.apply(lambda row: func(row), axis=1, result_type='expand')
+        max_raw = df[f'{cat}_raw'].max()
+        df[f'rating_{cat}'] = (100 * df[f'{cat}_raw'] / max_raw).round(2) if max_raw > 0 else 0
+
+    def get_raw_positional_rating(row):
+        pos = row['Position']
+        pos_full = position_map.get(pos, pos)
+        weights = positional_weights.get(pos_full, positional_weights['OUTSIDE HITTER'])
+        return sum([
+            weights['Attacking'] * row['rating_att'],
+            weights['Blocking'] * row['rating_blk'],
+            weights['Serving'] * row['rating_serv'],
+            weights['Setting'] * row['rating_set'],
+            weights['Defense'] * row['rating_def'],
+            weights['Receiving'] * row['rating_recv']
+        ])
+
+    df['raw_positional_rating'] = df.apply(get_raw_positional_rating, axis=1)
+    for pos_name in positional_weights.keys():
+        mask = df['Position'].str.strip().str.upper().map(position_map.get).fillna(df['Position'].str.strip().str.upper()) == pos_name
+        max_rating = df.loc[mask, 'raw_positional_rating'].max()
+        df.loc[mask, 'positional_rating'] = (100 * df.loc[mask, 'raw_positional_rating'] / max_rating).round(2) if max_rating > 0 else 0
+    return df
+
+
+def synthetic_players(base, n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    df['Player Name'] = [f"Player {i}" for i in range(n)]
+    numeric = [col for col in df.columns if col not in ('Player Name', 'Team', 'Position', 'Age', 'Height')
+               and pd.api.types.is_numeric_dtype(df[col])]
+    scale = rng.uniform(0.5, 1.5, size=(n, 1))
+    for col in numeric:
+        scaled = df[col].to_numpy() * scale[:, 0]
+        df[col] = scaled.round(2) if col.endswith('Per Match') else np.rint(scaled).astype(np.int64)
+    return df
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark row-wise vs vectorized player ratings.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 100000], help="Player counts")
+    parser.add_argument("--legacy-max", type=int, default=5000, help="Largest player count to run the row-wise pass on")
+    parser.add_argument("--input", default="merged_stats.csv", help="Players to resample from")
+    args = parser.parse_args(argv)
+
+    base = pd.read_csv(args.input)
+    for n in args.sizes:
+        df = synthetic_players(base, n)
+        vectorized, vectorized_s = timed(rate_players, df)
+        line = f"{n:>7} players: vectorized {vectorized_s:.3f}s"
+        if n <= args.legacy_max:
+            legacy, legacy_s = timed(legacy_rate, df)
+            same = rankings_table(legacy).equals(rankings_table(vectorized))
+            line += f", row-wise {legacy_s:.3f}s ({legacy_s / vectorized_s:.0f}x), identical output: {same}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
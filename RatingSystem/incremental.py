@@ -0,0 +1,307 @@
+"""
+Incremental player rating updates.
+
+Ratings depend on global normalizers: the max of each per-match volume column,
+the max raw score of each category and the max positional rating within each
+position group. The rating state (RatingSystem/rating_state.pkl) keeps the
+fully rated player table plus a sorted multiset of the values behind every
+normalizer, so an update with a few changed, new or removed player rows:
+
+- recomputes eff/vol/raw only for those rows, unless a volume max moved;
+- re-scales a category for everyone only when its max raw score moved;
+- re-normalizes a position group only when its max moved;
+
+and otherwise touches nothing else. The result is identical to a full
+playerrankings.py run over the updated table. Every rating that moved is
+appended to RatingSystem/rating_changelog.csv.
+
+    python -m RatingSystem.incremental --init       # full rating, saves the state
+    python -m RatingSystem.incremental              # update from merged_stats.csv
+    python -m RatingSystem.incremental --delta rows.csv
+"""
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+import argparse
+import csv
+import math
+import os
+import numpy as np
+import pandas as pd
+from Collection.config import website_configs
+from Collection.merge import KEY_SEPARATOR, player_keys
+from RatingSystem.playerrankings import (CATEGORIES, CATEGORY_FUNCS, VOLUME_COLUMNS, category_ratings, normalize,
+                                         normalize_positional, position_group, positional_weights,
+                                         rankings_table, raw_positional_ratings, write_csv_atomic)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAYER_FILE = os.path.join(ROOT_DIR, "merged_stats.csv")
+RANKINGS_FILE = os.path.join(ROOT_DIR, "RatingSystem", "player_rankings.csv")
+STATE_FILE = os.path.join(ROOT_DIR, "RatingSystem", "rating_state.pkl")
+CHANGELOG_FILE = os.path.join(ROOT_DIR, "RatingSystem", "rating_changelog.csv")
+
+# Columns a player's ratings are computed from
+INPUT_COLUMNS = ['Position'] + list(dict.fromkeys(
+    col for config in website_configs for col in config['columns_to_keep'] if col not in ('Player Name', 'Team')
+))
+RATING_COLUMNS = ['positional_rating'] + [f'rating_{cat}' for cat in CATEGORIES]
+
+
+class SortedValues:
+    """Sorted multiset of a normalizer's input values (NaN skipped, like Series.max)."""
+
+    def __init__(self, values=()):
+        self.values = sorted(v for v in values if not math.isnan(v))
+
+    def replace(self, old, new):
+        for value in old:
+            if not math.isnan(value):
+                index = bisect_left(self.values, value)
+                if index < len(self.values) and self.values[index] == value:
+                    del self.values[index]
+        for value in new:
+            if not math.isnan(value):
+                insort(self.values, value)
+
+    def max(self):
+        return self.values[-1] if self.values else np.nan
+
+
+def rating_keys(df):
+    # Player keys, with an occurrence suffix on repeats so rows that share a name and team
+    # (merged files written before merge.py reported them) still get one slot each
+    keys = pd.Series(player_keys(df), dtype=object)
+    occurrence = keys.groupby(keys, sort=False).cumcount()
+    repeats = occurrence > 0
+    if repeats.any():
+        keys[repeats] = keys[repeats] + KEY_SEPARATOR + occurrence[repeats].astype(str).str.zfill(4)
+    return pd.Index(keys, dtype=object)
+
+
+def _same(a, b):
+    return a == b or (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b))
+
+
+def _floats(series):
+    return series.astype(float).tolist()
+
+
+def full_state(players, weights=positional_weights):
+    """
+    Rate every player from scratch and build all normalizer multisets. The state
+    holds the rated table (one row per player, positional index), the player key
+    of every row and the multisets.
+    """
+    table = category_ratings(players.reset_index(drop=True).copy())
+    table['raw_positional_rating'] = raw_positional_ratings(table, weights)
+    trackers = {}
+    for cat in CATEGORIES:
+        trackers[f'vol:{cat}'] = SortedValues(_floats(VOLUME_COLUMNS[cat](table)))
+        trackers[f'raw:{cat}'] = SortedValues(_floats(table[f'{cat}_raw']))
+    groups = position_group(table['Position'])
+    for pos in weights:
+        trackers[f'pos:{pos}'] = SortedValues(_floats(table.loc[groups == pos, 'raw_positional_rating']))
+    state = {'table': table, 'keys': rating_keys(table), 'trackers': trackers, 'weights': weights}
+    table['positional_rating'] = normalize_positional(table['raw_positional_rating'], table['Position'],
+                                                      _group_max(state), weights)
+    return state
+
+
+def _group_max(state):
+    return {pos: state['trackers'][f'pos:{pos}'].max() for pos in state['weights']}
+
+
+def changed_rows(state, players):
+    # Rows of players that are new or whose rating inputs differ from the state
+    rows = state['keys'].get_indexer(rating_keys(players))
+    known = rows >= 0
+    columns = [col for col in INPUT_COLUMNS if col in players.columns]
+    new_values = players.loc[known, columns].reset_index(drop=True)
+    old_values = state['table'].iloc[rows[known]][columns].reset_index(drop=True)
+    same = ((new_values == old_values) | (new_values.isna() & old_values.isna())).all(axis=1).to_numpy()
+    changed = ~known
+    changed[np.flatnonzero(known)[~same]] = True
+    return players[changed]
+
+
+def removed_keys(state, players):
+    # Keys in the state with no row in `players` any more
+    return state['keys'][~state['keys'].isin(rating_keys(players))]
+
+
+def _set(table, rows, col, values):
+    table.iloc[rows, table.columns.get_loc(col)] = np.asarray(values)
+
+
+def apply_delta(state, delta, removed=()):
+    """
+    Update the state with changed or new player rows and drop the players with
+    the `removed` keys. Returns (changes, moved): a DataFrame of every rating
+    that changed (Old is empty for new players, New for removed ones) and the
+    list of normalizers whose max moved.
+    """
+    trackers, weights = state['trackers'], state['weights']
+    # Removed players leave the table first; their values still leave the multisets below,
+    # so a max they held moves exactly like one lowered by a changed row
+    drop = state['keys'].isin(removed)
+    gone = state['table'][drop]
+    table = state['table'] = state['table'][~drop].reset_index(drop=True)
+    state['keys'] = state['keys'][~drop]
+    gone_groups = position_group(gone['Position']).to_numpy(dtype=object)
+    gone_raw = gone['raw_positional_rating'].to_numpy(dtype=float)
+
+    delta = delta.reset_index(drop=True)
+    keys = rating_keys(delta)
+    rows = state['keys'].get_indexer(keys)
+    known = rows >= 0
+    n_old = len(table)
+    before = table[RATING_COLUMNS].to_numpy(dtype=float, copy=True)
+    old_positions = table['Position'].to_numpy(dtype=object, copy=True)
+    old_inputs = table.iloc[rows[known]]
+
+    # Existing players get their new input values, new players are appended
+    columns = [col for col in delta.columns if col in table.columns]
+    for col in columns:
+        _set(table, rows[known], col, delta.loc[known, col])
+    if not known.all():
+        table = state['table'] = pd.concat([table, delta.loc[~known, columns]], ignore_index=True)
+        state['keys'] = state['keys'].append(keys[~known])
+        rows[~known] = np.arange(n_old, len(table))
+    everyone = np.arange(len(table))
+
+    moved = []
+    rerated = np.zeros(len(table), dtype=bool)
+    rerated[rows] = True
+    for cat, func in CATEGORY_FUNCS.items():
+        vol_tracker = trackers[f'vol:{cat}']
+        vol_max = vol_tracker.max()
+        vol_tracker.replace(_floats(VOLUME_COLUMNS[cat](old_inputs)) + _floats(VOLUME_COLUMNS[cat](gone)),
+                            _floats(VOLUME_COLUMNS[cat](delta)))
+        if _same(vol_tracker.max(), vol_max):
+            cat_rows = rows
+        else:
+            moved.append(f'{cat} volume max')
+            cat_rows = everyone
+        old_raw = table[f'{cat}_raw'].to_numpy(dtype=float)[cat_rows]
+        eff, vol, raw = func(table.iloc[cat_rows], vol_max=vol_tracker.max())
+        _set(table, cat_rows, f'{cat}_eff', eff)
+        _set(table, cat_rows, f'{cat}_vol', vol)
+        _set(table, cat_rows, f'{cat}_raw', raw)
+
+        raw_tracker = trackers[f'raw:{cat}']
+        max_raw = raw_tracker.max()
+        if cat_rows is everyone:
+            raw_tracker = trackers[f'raw:{cat}'] = SortedValues(_floats(raw))
+        else:
+            raw_tracker.replace(old_raw.tolist() + _floats(gone[f'{cat}_raw']), _floats(raw))
+        if not _same(raw_tracker.max(), max_raw):
+            moved.append(f'{cat} raw max')
+            cat_rows = everyone
+        _set(table, cat_rows, f'rating_{cat}',
+             normalize(table[f'{cat}_raw'].iloc[cat_rows], raw_tracker.max()))
+        rerated[cat_rows] = True
+
+    # Positional ratings of every re-rated player, then re-normalize the groups whose max moved
+    group_max = _group_max(state)
+    changed = np.flatnonzero(rerated)
+    old_raw = table['raw_positional_rating'].to_numpy(dtype=float)[changed]
+    old_groups = position_group(pd.Series(old_positions[changed[changed < n_old]], dtype=object))
+    old_groups = np.concatenate([old_groups.to_numpy(dtype=object), np.full((changed >= n_old).sum(), None)])
+    raw = raw_positional_ratings(table.iloc[changed], weights).to_numpy()
+    _set(table, changed, 'raw_positional_rating', raw)
+    new_groups = position_group(table['Position'].iloc[changed]).to_numpy(dtype=object)
+    for pos in weights:
+        trackers[f'pos:{pos}'].replace(old_raw[old_groups == pos].tolist() + gone_raw[gone_groups == pos].tolist(),
+                                       raw[new_groups == pos].tolist())
+    new_group_max = _group_max(state)
+    moved_groups = [pos for pos in weights if not _same(group_max[pos], new_group_max[pos])]
+    moved.extend(f'{pos} positional max' for pos in moved_groups)
+    if moved_groups:
+        rerated |= position_group(table['Position']).isin(moved_groups).to_numpy()
+        changed = np.flatnonzero(rerated)
+    _set(table, changed, 'positional_rating', normalize_positional(
+        table['raw_positional_rating'].iloc[changed], table['Position'].iloc[changed], new_group_max, weights))
+
+    # Changelog: every rating of a re-rated player that differs from before (all ratings of new players)
+    after = table[RATING_COLUMNS].to_numpy(dtype=float)[changed]
+    previous = np.full_like(after, np.nan)
+    existed = changed < n_old
+    previous[existed] = before[changed[existed]]
+    differs = ~((previous == after) | (np.isnan(previous) & np.isnan(after)))
+    differs[~existed] = True
+    r, c = np.nonzero(differs)
+    players = table.iloc[changed[r]]
+    changes = pd.DataFrame({
+        'Player Name': players['Player Name'].to_numpy(), 'Team': players['Team'].to_numpy(),
+        'Position': players['Position'].to_numpy(), 'Rating': np.array(RATING_COLUMNS)[c],
+        'Old': previous[r, c], 'New': after[r, c],
+    })
+    if len(gone):
+        before_gone = gone[RATING_COLUMNS].to_numpy(dtype=float)
+        changes = pd.concat([changes, pd.DataFrame({
+            'Player Name': np.repeat(gone['Player Name'].to_numpy(), len(RATING_COLUMNS)),
+            'Team': np.repeat(gone['Team'].to_numpy(), len(RATING_COLUMNS)),
+            'Position': np.repeat(gone['Position'].to_numpy(), len(RATING_COLUMNS)),
+            'Rating': np.tile(RATING_COLUMNS, len(gone)), 'Old': before_gone.ravel(), 'New': np.nan,
+        })], ignore_index=True)
+    changes['Change'] = (changes['New'] - changes['Old']).round(2)
+    return changes, moved
+
+
+def append_changelog(changes, path=CHANGELOG_FILE):
+    if changes.empty:
+        return
+    changes = changes.copy()
+    changes.insert(0, 'Updated', datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'))
+    exists = os.path.exists(path)
+    changes.to_csv(path, mode='a', header=not exists, index=False, quoting=csv.QUOTE_MINIMAL)
+
+
+def save_state(state, path=STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    pd.to_pickle(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_state(path=STATE_FILE):
+    return pd.read_pickle(path) if os.path.exists(path) else None
+
+
+def write_rankings(state, order=None, path=RANKINGS_FILE):
+    # player_rankings.csv from the state, in the order of `order` keys when given
+    table = state['table'] if order is None else state['table'].iloc[state['keys'].get_indexer(order)]
+    write_csv_atomic(rankings_table(table), path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update player ratings from changed or new player rows.")
+    parser.add_argument("--init", action="store_true", help="Rate all players from scratch and save the state")
+    parser.add_argument("--players", default=PLAYER_FILE, help="Merged player stats to diff against the state")
+    parser.add_argument("--delta", help="CSV with only the changed or new player rows (merged_stats.csv columns)")
+    parser.add_argument("--state", default=STATE_FILE, help="Rating state file")
+    parser.add_argument("--changelog", default=CHANGELOG_FILE, help="CSV the rating movements are appended to")
+    parser.add_argument("--output", default=RANKINGS_FILE, help="Player rankings CSV")
+    args = parser.parse_args(argv)
+
+    state = None if args.init else load_state(args.state)
+    players = pd.read_csv(args.players)
+    if state is None or state.get('weights') != positional_weights:
+        state = full_state(players)
+        print(f"Rated {len(state['table'])} players from scratch")
+        order = None
+    else:
+        delta = pd.read_csv(args.delta) if args.delta else changed_rows(state, players)
+        # A --delta file lists only some players, so only a full players file can tell who left
+        removed = [] if args.delta else removed_keys(state, players)
+        changes, moved = apply_delta(state, delta, removed)
+        append_changelog(changes, args.changelog)
+        print(f"{len(delta)} changed or new players, {len(removed)} removed, "
+              f"{changes['Player Name'].nunique()} players with rating changes")
+        print(f"Normalizers moved: {', '.join(moved) if moved else 'none'}")
+        order = None if args.delta else rating_keys(players)
+    save_state(state, args.state)
+    write_rankings(state, order, args.output)
+    print(f"Player rankings saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,26 @@
+"""
+Rating-publish stage: rate every player in merged_stats.csv and write the
+ratings both to RatingSystem/player_rankings.csv and, as the Impact / ... Rating
+columns, back into merged_stats.csv.
+
+Everything happens in memory from a single read of merged_stats.csv: ratings
+are attached by row (rate_players keeps row order), not joined back on
+(Player Name, Team, Position), so players sharing a name never multiply. Any
+rating columns already in the file are replaced, so rerunning gives the same
+file. Both outputs are written to a temp file and renamed into place, so a
+crash never leaves a truncated merged_stats.csv.
+
+    python -m RatingSystem.mergeratings
+"""
+import argparse
 import pandas as pd
+from RatingSystem.playerrankings import rankings_table, rate_players, write_csv_atomic
 
-# Load both CSVs
-rankings = pd.read_csv('RatingSystem/player_rankings.csv')
-merged = pd.read_csv('merged_stats.csv')
+PLAYER_FILE = 'merged_stats.csv'
+RANKINGS_FILE = 'RatingSystem/player_rankings.csv'
 
-# Select only relevant columns from rankings and rename for output
-selected_cols = ['Player Name', 'Team', 'Position', 'positional_rating',
-                 'rating_att', 'rating_blk', 'rating_serv', 'rating_set', 'rating_def', 'rating_recv']
-rankings_selected = rankings[selected_cols].copy()
-rankings_selected.rename(columns={
+# player_rankings.csv column -> merged_stats.csv column
+RATING_NAMES = {
     'positional_rating': 'Impact',
     'rating_att': 'Attacking Rating',
     'rating_blk': 'Blocking Rating',
@@ -16,17 +28,35 @@ rankings_selected.rename(columns={
     'rating_set': 'Setting Rating',
     'rating_def': 'Defense Rating',
     'rating_recv': 'Receiving Rating'
-}, inplace=True)
+}
+BASE_COLUMNS = ['Player Name', 'Team', 'Position', 'Age', 'Height']
+
+
+def publish_ratings(players):
+    """
+    Returns (rankings, merged): the player_rankings.csv table and the player
+    table with fresh rating columns after the profile columns.
+    """
+    stats = players.drop(columns=[col for col in RATING_NAMES.values() if col in players.columns])
+    rankings = rankings_table(rate_players(stats))
+    ratings = rankings[list(RATING_NAMES)].rename(columns=RATING_NAMES).set_axis(stats.index)
+    base = [col for col in BASE_COLUMNS if col in stats.columns]
+    other = [col for col in stats.columns if col not in base]
+    merged = pd.concat([stats[base], ratings, stats[other]], axis=1)
+    return rankings, merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rate all players and publish the ratings.")
+    parser.add_argument("--players", default=PLAYER_FILE, help="Merged player stats, updated in place")
+    parser.add_argument("--rankings", default=RANKINGS_FILE, help="Player rankings CSV")
+    args = parser.parse_args(argv)
 
-# Merge on Player Name, Team, and Position to avoid mixing stats for identical names
-merged_out = pd.merge(merged, rankings_selected, on=['Player Name', 'Team', 'Position'], how='left')
+    rankings, merged = publish_ratings(pd.read_csv(args.players))
+    write_csv_atomic(rankings, args.rankings)
+    write_csv_atomic(merged, args.players)
+    print(f"Player rankings saved to {args.rankings}; ratings added to {args.players} after the profile columns.")
 
-# Desired column order
-base_cols = ['Player Name', 'Team', 'Position', 'Age', 'Height']
-new_stats = ['Impact', 'Attacking Rating', 'Blocking Rating', 'Serving Rating', 'Setting Rating', 'Defense Rating', 'Receiving Rating']
-other_cols = [col for col in merged_out.columns if col not in base_cols + new_stats]
-final_cols = base_cols + new_stats + other_cols
 
-# Save to merged_stats.csv (overwrite)
-merged_out[final_cols].to_csv('merged_stats.csv', index=False)
-print('Merged ratings added to merged_stats.csv with new stats at the start.')
+if __name__ == "__main__":
+    main()
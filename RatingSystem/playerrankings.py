@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import os
+import tempfile
 
 def clamp(x, minv=0, maxv=1):
     return max(minv, min(x, maxv))
@@ -51,124 +52,171 @@ positional_weights = {
     }
 }
 
-df = pd.read_csv('merged_stats.csv')
+position_map = {
+    'LIBERO': 'LIBERO',
+    'OUTSIDE HITTER': 'OUTSIDE HITTER',
+    'OPPOSITE HITTER': 'OPPOSITE SPIKER',
+    'SETTER': 'SETTER',
+    'MIDDLE BLOCKER': 'MIDDLE BLOCKER'
+}
+
+# Category prefix in the output columns -> key in positional_weights
+CATEGORIES = {
+    'att': 'Attacking',
+    'blk': 'Blocking',
+    'serv': 'Serving',
+    'set': 'Setting',
+    'def': 'Defense',
+    'recv': 'Receiving'
+}
 
-# Reference maxima (95th percentile)
-ref_max_attacks_per_match = pctl95(df['Attacks Per Match'])
-ref_max_blocks_per_match = pctl95(df['Blocks Per Match'])
-ref_max_serves_per_match = pctl95(df['Serves Per Match'])
-ref_max_sets_per_match = pctl95(df['Sets Per Match'])
-ref_max_digs_per_match = pctl95(df['Digs Per Match'])
-ref_max_receives_per_match = pctl95(df['Receives Per Match'])
+# Every formula below works on whole columns at once; results match the former per-row version exactly.
+
+def ratio(num, denom):
+    # num / denom where denom > 0, else 0
+    positive = denom > 0
+    return pd.Series(np.where(positive, num / denom.where(positive), 0.0), index=num.index)
+
+def raw_score(eff, vol, eff_exp, vol_exp):
+    return (np.maximum(eff, 0) ** eff_exp) * (np.maximum(vol, 0) ** vol_exp)
+
+def per_match(df, preferred, fallback):
+    return df[preferred] if preferred in df else df[fallback]
+
+# Per-match column each category's volume is scaled by (its max over all players)
+VOLUME_COLUMNS = {
+    'att': lambda df: per_match(df, 'Kills Per Match', 'Attacks Per Match'),
+    'blk': lambda df: df['Blocks Per Match'],
+    'serv': lambda df: per_match(df, 'Aces Per Match', 'Serves Per Match'),
+    'set': lambda df: df['Sets Per Match'],
+    'def': lambda df: df['Digs Per Match'],
+    'recv': lambda df: df['Receives Per Match']
+}
 
 # Attacking
-def attacking(row):
-    K = row['Kills']
-    E = row['Attacking Errors']
-    A = row['Attacking Attempts']
-    KPM = row['Kills Per Match'] if 'Kills Per Match' in row else row['Attacks Per Match']
-    eff = (K - E) / A if A > 0 else 0
-    vol = KPM / df['Kills Per Match'].max() if 'Kills Per Match' in df else KPM / df['Attacks Per Match'].max()
-    raw = (max(eff, 0) ** 0.5) * (max(vol, 0) ** 1.2)
-    return [eff, vol, raw]
+def attacking(df, vol_max=None):
+    K = df['Kills']
+    E = df['Attacking Errors']
+    A = df['Attacking Attempts']
+    KPM = per_match(df, 'Kills Per Match', 'Attacks Per Match')
+    eff = ratio(K - E, A)
+    vol = KPM / (KPM.max() if vol_max is None else vol_max)
+    return eff, vol, raw_score(eff, vol, 0.5, 1.2)
 
 # Blocking
-def blocking(row):
-    B = row['Blocks']
-    BE = row['Blocking Errors']
-    R = row['Rebounds']
-    BPM = row['Blocks Per Match']
-    denom = B + BE + R
+def blocking(df, vol_max=None):
+    B = df['Blocks']
+    BE = df['Blocking Errors']
+    R = df['Rebounds']
+    BPM = df['Blocks Per Match']
     # Weigh errors less: use only blocks over total attempts
-    eff = B / denom if denom > 0 else 0
-    vol = BPM / df['Blocks Per Match'].max()
-    raw = (max(eff, 0) ** 0.4) * (max(vol, 0) ** 1.3)
-    return [eff, vol, raw]
+    eff = ratio(B, B + BE + R)
+    vol = BPM / (BPM.max() if vol_max is None else vol_max)
+    return eff, vol, raw_score(eff, vol, 0.4, 1.3)
 
 # Serving
-def serving(row):
-    A = row['Aces']
-    SE = row['Service Errors']
-    SA = row['Service Attempts']
-    APM = row['Aces Per Match'] if 'Aces Per Match' in row else row['Serves Per Match']
+def serving(df, vol_max=None):
+    A = df['Aces']
+    SA = df['Service Attempts']
+    APM = per_match(df, 'Aces Per Match', 'Serves Per Match')
     # Weigh errors less: use only aces over attempts
-    eff = A / SA if SA > 0 else 0
-    vol = APM / df['Aces Per Match'].max() if 'Aces Per Match' in df else APM / df['Serves Per Match'].max()
-    raw = (max(eff, 0) ** 0.6) * (max(vol, 0) ** 1.1)
-    return [eff, vol, raw]
+    eff = ratio(A, SA)
+    vol = APM / (APM.max() if vol_max is None else vol_max)
+    return eff, vol, raw_score(eff, vol, 0.6, 1.1)
 
 # Setting
-def setting(row):
-    RS = row['Running Sets']
-    SS = row['Still Sets']
-    SE = row['Setting Errors']
-    SPM = row['Sets Per Match']
-    denom = RS + SS + SE
-    eff = RS / denom if denom > 0 else 0
-    vol = SPM / df['Sets Per Match'].max()
-    raw = (max(eff, 0) ** 0.5) * (max(vol, 0) ** 1.2)
-    return [eff, vol, raw]
+def setting(df, vol_max=None):
+    RS = df['Running Sets']
+    SS = df['Still Sets']
+    SE = df['Setting Errors']
+    SPM = df['Sets Per Match']
+    eff = ratio(RS, RS + SS + SE)
+    vol = SPM / (SPM.max() if vol_max is None else vol_max)
+    return eff, vol, raw_score(eff, vol, 0.5, 1.2)
 
 # Defense
-def defense(row):
-    GS = row['Great Saves']
-    DE = row['Defensive Errors']
-    DR = row['Defensive Receptions']
-    DPM = row['Digs Per Match']
-    eff = (GS - DE) / DR if DR > 0 else 0
-    vol = DPM / df['Digs Per Match'].max()
-    raw = (max(eff, 0) ** 0.4) * (max(vol, 0) ** 1.3)
-    return [eff, vol, raw]
+def defense(df, vol_max=None):
+    GS = df['Great Saves']
+    DE = df['Defensive Errors']
+    DR = df['Defensive Receptions']
+    DPM = df['Digs Per Match']
+    eff = ratio(GS - DE, DR)
+    vol = DPM / (DPM.max() if vol_max is None else vol_max)
+    return eff, vol, raw_score(eff, vol, 0.4, 1.3)
 
 # Receiving
-def receiving(row):
-    SR = row['Successful Receives']
-    RE = row['Receiving Errors']
-    SRc = row['Service Receptions']
-    RPM = row['Receives Per Match']
-    eff = (SR - RE) / SRc if SRc > 0 else 0
-    vol = RPM / df['Receives Per Match'].max()
-    raw = (max(eff, 0) ** 0.5) * (max(vol, 0) ** 1.2)
-    return [eff, vol, raw]
-
-# Apply formulas
-for cat, func in zip(
-    ['att', 'blk', 'serv', 'set', 'def', 'recv'],
-    [attacking, blocking, serving, setting, defense, receiving]
-):
-    df[[f'{cat}_eff', f'{cat}_vol', f'{cat}_raw']] = df.apply(lambda row: func(row), axis=1, result_type='expand')
-    max_raw = df[f'{cat}_raw'].max()
-    df[f'rating_{cat}'] = (100 * df[f'{cat}_raw'] / max_raw).round(2) if max_raw > 0 else 0
-
-# Calculate positional weighted rating for each player
-position_map = {
-    'LIBERO': 'LIBERO',
-    'OUTSIDE HITTER': 'OUTSIDE HITTER',
-    'OPPOSITE HITTER': 'OPPOSITE SPIKER',
-    'SETTER': 'SETTER',
-    'MIDDLE BLOCKER': 'MIDDLE BLOCKER'
+def receiving(df, vol_max=None):
+    SR = df['Successful Receives']
+    RE = df['Receiving Errors']
+    SRc = df['Service Receptions']
+    RPM = df['Receives Per Match']
+    eff = ratio(SR - RE, SRc)
+    vol = RPM / (RPM.max() if vol_max is None else vol_max)
+    return eff, vol, raw_score(eff, vol, 0.5, 1.2)
+
+CATEGORY_FUNCS = {
+    'att': attacking,
+    'blk': blocking,
+    'serv': serving,
+    'set': setting,
+    'def': defense,
+    'recv': receiving
 }
-def get_raw_positional_rating(row):
-    pos = row['Position']
-    pos_full = position_map.get(pos, pos)
-    weights = positional_weights.get(pos_full, positional_weights['OUTSIDE HITTER'])
-    rating = sum([
-        weights['Attacking'] * row['rating_att'],
-        weights['Blocking'] * row['rating_blk'],
-        weights['Serving'] * row['rating_serv'],
-        weights['Setting'] * row['rating_set'],
-        weights['Defense'] * row['rating_def'],
-        weights['Receiving'] * row['rating_recv']
-    ])
-    return rating
-
-df['raw_positional_rating'] = df.apply(get_raw_positional_rating, axis=1)
-
-# Normalize positional rating by position group
-for pos_name in positional_weights.keys():
-    mask = df['Position'].str.strip().str.upper().map(position_map.get).fillna(df['Position'].str.strip().str.upper()) == pos_name
-    max_rating = df.loc[mask, 'raw_positional_rating'].max()
-    df.loc[mask, 'positional_rating'] = (100 * df.loc[mask, 'raw_positional_rating'] / max_rating).round(2) if max_rating > 0 else 0
+
+def normalize(raw, max_raw=None):
+    # 0-100 scale relative to the best raw score
+    max_raw = raw.max() if max_raw is None else max_raw
+    return (100 * raw / max_raw).round(2) if max_raw > 0 else pd.Series(0.0, index=raw.index)
+
+def category_ratings(df):
+    # Adds {cat}_eff, {cat}_vol, {cat}_raw and rating_{cat} for every category
+    for cat, func in CATEGORY_FUNCS.items():
+        eff, vol, raw = func(df)
+        df[f'{cat}_eff'] = eff
+        df[f'{cat}_vol'] = vol
+        df[f'{cat}_raw'] = raw
+        df[f'rating_{cat}'] = normalize(raw)
+    return df
+
+def weight_matrix(positions, weights=positional_weights):
+    # One row of category weights per player, looked up by position (outside hitter weights by default)
+    pos_full = positions.map(position_map).fillna(positions)
+    default = weights['OUTSIDE HITTER']
+    return pd.DataFrame({
+        cat: pos_full.map({pos: w[name] for pos, w in weights.items()}).fillna(default[name])
+        for cat, name in CATEGORIES.items()
+    })
+
+def position_group(positions):
+    # Position names as used to normalize ratings within a position
+    cleaned = positions.str.strip().str.upper()
+    return cleaned.map(position_map).fillna(cleaned)
+
+def raw_positional_ratings(df, weights=positional_weights):
+    # Weighted sum of the category ratings, accumulated in category order
+    w = weight_matrix(df['Position'], weights)
+    raw = pd.Series(0.0, index=df.index)
+    for cat in CATEGORIES:
+        raw = raw + w[cat].to_numpy() * df[f'rating_{cat}']
+    return raw
+
+def normalize_positional(raw, positions, group_max, weights=positional_weights):
+    # 0-100 within each position group, given {group: max raw rating}; NaN outside the known groups
+    group = position_group(positions)
+    top = group.map(group_max).where(group.isin(list(weights))).astype(float)
+    rating = (100 * raw / top).round(2)
+    return rating.where(top > 0, 0.0).where(top.notna())
+
+def positional_ratings(df, weights=positional_weights):
+    # Weighted category ratings, normalized to 0-100 within each position group
+    raw = raw_positional_ratings(df, weights)
+    group_max = raw.groupby(position_group(df['Position'])).max().to_dict()
+    return raw, normalize_positional(raw, df['Position'], group_max, weights)
+
+def rate_players(df, weights=positional_weights):
+    df = category_ratings(df.copy())
+    df['raw_positional_rating'], df['positional_rating'] = positional_ratings(df, weights)
+    return df
 
 # Output with positional rating as first value after player, team, position
 out_cols = [
@@ -180,11 +228,35 @@ out_cols = [
     'rating_def', 'def_eff', 'def_vol', 'def_raw',
     'rating_recv', 'recv_eff', 'recv_vol', 'recv_raw'
 ]
-# Round all decimals to the hundredths for output columns
-for col in out_cols:
-    if df[col].dtype in [float, np.float64, np.float32]:
-        df[col] = df[col].round(2)
-
-os.makedirs('RatingSystem', exist_ok=True)
-df[out_cols].to_csv('RatingSystem/player_rankings.csv', index=False)
-print("Player rankings saved to RatingSystem/player_rankings.csv with normalized positional ratings.")
\ No newline at end of file
+
+def rankings_table(df):
+    # Round all decimals to the hundredths for output columns
+    out = df[out_cols].copy()
+    for col in out_cols:
+        if out[col].dtype in [float, np.float64, np.float32]:
+            out[col] = out[col].round(2)
+    return out
+
+def write_csv_atomic(df, path):
+    # Write to a temp file next to `path`, then rename over it: readers never see a half-written file
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)  # mkstemp creates the file owner-only
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def main():
+    df = rate_players(pd.read_csv('merged_stats.csv'))
+    write_csv_atomic(rankings_table(df), 'RatingSystem/player_rankings.csv')
+    print("Player rankings saved to RatingSystem/player_rankings.csv with normalized positional ratings.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Batch what-if evaluation of positional weight profiles.
+
+A profile is a (position x category) weight table like `positional_weights`.
+Given thousands of them, evaluate_weight_profiles computes every player's
+Impact under every profile at once from the per-category rating matrix (the
+category ratings do not depend on the weights), then measures how well each
+profile's Impact predicts matches: it rebuilds the team Impact features used by
+ML/ml.py for every profile and cross-validates the same L2 logistic regression
+(liblinear's objective, GroupKFold by home team) for all profiles together with
+batched Newton steps.
+
+    python -m RatingSystem.whatif --random 2000 --top 10
+"""
+import argparse
+import json
+import os
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from Collection.teams import TeamRegistry
+from RatingSystem.playerrankings import CATEGORIES, category_ratings, position_group, position_map, positional_weights
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAYER_FILE = os.path.join(ROOT_DIR, "merged_stats.csv")
+TEAM_FILE = os.path.join(ROOT_DIR, "ML", "team_stats.csv")
+MATCH_FILE = os.path.join(ROOT_DIR, "ML", "match_set_stats.csv")
+
+POSITIONS = list(positional_weights)
+CATEGORY_NAMES = list(CATEGORIES.values())
+IMPACT_FEATURES = ['mean', 'median', 'std', 'max', 'min', 'top8mean']
+
+
+def profile_array(profiles):
+    # (P, positions, categories) weights from an array or a list of positional_weights-style dicts
+    if isinstance(profiles, np.ndarray):
+        return profiles.astype(float).reshape(-1, len(POSITIONS), len(CATEGORY_NAMES))
+    return np.array([[[p[pos][cat] for cat in CATEGORY_NAMES] for pos in POSITIONS] for p in profiles], dtype=float)
+
+
+def profile_dict(weights):
+    # Inverse of profile_array for one profile
+    return {pos: {cat: round(float(weights[i, j]), 4) for j, cat in enumerate(CATEGORY_NAMES)}
+            for i, pos in enumerate(POSITIONS)}
+
+
+def random_profiles(n, base=positional_weights, concentration=20.0, seed=0):
+    # Profiles scattered around base: each position's weights drawn from a Dirichlet centred on it
+    rng = np.random.default_rng(seed)
+    centre = profile_array([base])[0] + 1e-3
+    centre = centre / centre.sum(axis=1, keepdims=True)
+    return np.stack([rng.dirichlet(concentration * row, size=n) for row in centre], axis=1)
+
+
+def player_inputs(players):
+    """
+    Per-category rating matrix (N x categories), the position whose weights apply
+    to each player (outside hitter by default, like weight_matrix) and the
+    position group each player is normalized in (-1 if none).
+    """
+    rated = category_ratings(players.copy())
+    ratings = rated[[f'rating_{cat}' for cat in CATEGORIES]].to_numpy(dtype=float)
+    pos_full = players['Position'].map(position_map).fillna(players['Position'])
+    weight_idx = pos_full.map({pos: i for i, pos in enumerate(POSITIONS)}).fillna(POSITIONS.index('OUTSIDE HITTER'))
+    group_idx = position_group(players['Position']).map({pos: i for i, pos in enumerate(POSITIONS)}).fillna(-1)
+    return ratings, weight_idx.to_numpy(dtype=int), group_idx.to_numpy(dtype=int)
+
+
+def impact_matrix(weights, ratings, weight_idx, group_idx):
+    """
+    Impact (P x N) of every player under every profile, normalized to 0-100 within
+    each position group. Categories are accumulated in the same order as
+    positional_ratings, so the current profile reproduces the Impact column exactly.
+    """
+    raw = np.zeros((len(weights), len(ratings)))
+    for c in range(ratings.shape[1]):
+        raw += weights[:, weight_idx, c] * ratings[:, c]
+    impact = np.full_like(raw, np.nan)
+    for g in range(len(POSITIONS)):
+        members = group_idx == g
+        if not members.any():
+            continue
+        group_max = np.nanmax(raw[:, members], axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scaled = np.round(100 * raw[:, members] / group_max, 2)
+        impact[:, members] = np.where(group_max > 0, scaled, 0.0)
+    return impact
+
+
+def team_impact_features(impact, teams, team_names, top_n=8):
+    # {feature: (P x teams)} Impact aggregates per team, as aggregate_team_players computes them
+    feats = {name: np.full((len(impact), len(team_names)), np.nan) for name in IMPACT_FEATURES}
+    for t, team in enumerate(team_names):
+        members = impact[:, teams == team]
+        if members.shape[1] == 0:
+            continue
+        with warnings.catch_warnings():
+            # All-NaN teams (no rated players) just give NaN features
+            warnings.simplefilter('ignore', RuntimeWarning)
+            feats['mean'][:, t] = np.nanmean(members, axis=1)
+            feats['median'][:, t] = np.nanmedian(members, axis=1)
+            feats['std'][:, t] = np.nanstd(members, axis=1, ddof=1)
+            feats['max'][:, t] = np.nanmax(members, axis=1)
+            feats['min'][:, t] = np.nanmin(members, axis=1)
+            top = -np.sort(np.where(np.isnan(members), np.inf, -members), axis=1)[:, :top_n]
+            feats['top8mean'][:, t] = np.nanmean(np.where(np.isinf(top), np.nan, top), axis=1)
+    return feats
+
+
+def season_matrix(team_df, team_names):
+    # Season stats (teams x columns) in team_names order, NaN for teams without a row
+    stats = team_df.drop_duplicates('Team').set_index('Team')
+    stats = stats.apply(pd.to_numeric, errors='coerce').reindex(team_names)
+    return stats.to_numpy(dtype=float), list(stats.columns)
+
+
+def match_feature_tensor(impact_feats, season, home, away):
+    """
+    (P x matches x features) in build_match_features' column order: A_ and B_ Impact
+    aggregates, A_ and B_ season stats, then the A - B differences. NaN becomes 0.
+    """
+    P = next(iter(impact_feats.values())).shape[0]
+    A_imp = np.stack([impact_feats[name][:, home] for name in IMPACT_FEATURES], axis=2)
+    B_imp = np.stack([impact_feats[name][:, away] for name in IMPACT_FEATURES], axis=2)
+    A_season = np.broadcast_to(season[home], (P,) + season[home].shape)
+    B_season = np.broadcast_to(season[away], (P,) + season[away].shape)
+    X = np.concatenate([A_imp, B_imp, A_season, B_season, A_imp - B_imp, A_season - B_season], axis=2)
+    return np.nan_to_num(X, nan=0.0)
+
+
+def _sigmoid(z):
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+def _objective(w, X, s, C):
+    z = np.einsum('pmf,pf->pm', X, w)
+    return 0.5 * np.sum(w * w, axis=1) + C * np.sum(np.logaddexp(0.0, -s * z), axis=1)
+
+
+def fit_logistic_batch(X, y, C=1.0, max_iter=50, tol=1e-6):
+    """
+    Fit one L2 logistic regression per profile: X is (P x samples x features), y is
+    shared 0/1 labels. Minimizes liblinear's objective (intercept as a constant
+    feature, penalized) with damped Newton steps. Returns weights (P x features+1),
+    intercept last.
+    """
+    P, M, _ = X.shape
+    Xa = np.concatenate([X, np.ones((P, M, 1))], axis=2)
+    F = Xa.shape[2]
+    s = 2.0 * y - 1.0
+    w = np.zeros((P, F))
+    eye = np.eye(F)
+    loss = _objective(w, Xa, s, C)
+    for _ in range(max_iter):
+        p = _sigmoid(np.einsum('pmf,pf->pm', Xa, w))
+        grad = w + C * np.einsum('pmf,pm->pf', Xa, p - y)
+        active = np.abs(grad).max(axis=1) > tol * np.maximum(1.0, np.abs(w).max(axis=1))
+        if not active.any():
+            break
+        d = p * (1.0 - p)
+        hess = eye + C * np.matmul(Xa.transpose(0, 2, 1), Xa * d[:, :, None])
+        step = np.linalg.solve(hess, grad[:, :, None])[:, :, 0]
+        step[~active] = 0.0
+        # Backtrack per profile until the objective decreases
+        alpha = np.ones(P)
+        for _ in range(30):
+            candidate = w - alpha[:, None] * step
+            new_loss = _objective(candidate, Xa, s, C)
+            worse = (new_loss > loss + 1e-12) & active
+            if not worse.any():
+                break
+            alpha[worse] *= 0.5
+        w, loss = candidate, new_loss
+    return w
+
+
+def predict_batch(w, X):
+    # 0/1 predictions (P x samples) from fit_logistic_batch weights
+    z = np.einsum('pmf,pf->pm', X, w[:, :-1]) + w[:, -1:]
+    return (z > 0).astype(int)
+
+
+def group_folds(groups, n_splits=5):
+    # The GroupKFold splits ml.py cross-validates with
+    from sklearn.model_selection import GroupKFold
+    return list(GroupKFold(n_splits=n_splits).split(np.zeros(len(groups)), groups=groups))
+
+
+def load_inputs(player_file=PLAYER_FILE, team_file=TEAM_FILE, match_file=MATCH_FILE):
+    return pd.read_csv(player_file), pd.read_csv(team_file), pd.read_csv(match_file)
+
+
+def evaluate_weight_profiles(profiles, players=None, team_df=None, match_df=None, folds=5, C=1.0, registry=None):
+    """
+    Evaluate many positional weight profiles at once. Returns a dict with
+    - "weights": (P x positions x categories) profiles as evaluated;
+    - "players": Player Name, Team, Position of the rated players;
+    - "impact": (P x players) Impact of every player under every profile;
+    - "accuracy": (P,) mean GroupKFold accuracy of the match-outcome model;
+    - "fold_accuracy": (P x folds) per-fold accuracy.
+    Teams are matched across the three tables by federation code through
+    `registry` (a TeamRegistry); spellings it cannot resolve are left as they
+    are and listed in registry.unresolved.
+    """
+    if players is None or team_df is None or match_df is None:
+        loaded = load_inputs()
+        players = loaded[0] if players is None else players
+        team_df = loaded[1] if team_df is None else team_df
+        match_df = loaded[2] if match_df is None else match_df
+    weights = profile_array(profiles)
+    ratings, weight_idx, group_idx = player_inputs(players)
+    impact = impact_matrix(weights, ratings, weight_idx, group_idx)
+
+    registry = TeamRegistry() if registry is None else registry
+
+    def team_codes(values, source):
+        codes = registry.codes(values, source)
+        return codes.where(codes.notna(), values)
+
+    home_names = match_df['Home Team'].to_numpy()  # folds group by home team as ml.py does
+    team_df = team_df.assign(Team=team_codes(team_df['Team'], 'team_stats'))
+    match_df = match_df.assign(**{col: team_codes(match_df[col], 'match_set_stats')
+                                  for col in ('Home Team', 'Away Team', 'Winner')})
+    team_names = list(team_df['Team'].drop_duplicates())
+    for name in pd.concat([match_df['Home Team'], match_df['Away Team']]).unique():
+        if name not in team_names:
+            team_names.append(name)
+    player_teams = team_codes(players['Team'], 'players').to_numpy()
+    impact_feats = team_impact_features(impact, player_teams, team_names)
+    season, _ = season_matrix(team_df, team_names)
+    team_pos = {name: i for i, name in enumerate(team_names)}
+    home = match_df['Home Team'].map(team_pos).to_numpy()
+    away = match_df['Away Team'].map(team_pos).to_numpy()
+    X = match_feature_tensor(impact_feats, season, home, away)
+    y = (match_df['Winner'] == match_df['Home Team']).to_numpy(dtype=float)
+
+    splits = group_folds(home_names, folds)
+    fold_accuracy = np.zeros((len(weights), len(splits)))
+    for k, (train, test) in enumerate(splits):
+        w = fit_logistic_batch(X[:, train], y[train], C=C)
+        fold_accuracy[:, k] = (predict_batch(w, X[:, test]) == y[test]).mean(axis=1)
+    return {
+        "weights": weights,
+        "players": players[['Player Name', 'Team', 'Position']].reset_index(drop=True),
+        "impact": impact,
+        "accuracy": fold_accuracy.mean(axis=1),
+        "fold_accuracy": fold_accuracy,
+    }
+
+
+def impact_ranking(results, profile):
+    # Players ranked by Impact under one evaluated profile
+    ranking = results["players"].copy()
+    ranking['Impact'] = results["impact"][profile]
+    return ranking.sort_values('Impact', ascending=False, na_position='last').reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate many positional weight profiles at once.")
+    parser.add_argument("--profiles", help="JSON file with a list of positional_weights-style profiles")
+    parser.add_argument("--random", type=int, default=1000, help="Number of random profiles around the current weights")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random profiles")
+    parser.add_argument("--folds", type=int, default=5, help="GroupKFold splits for the match model")
+    parser.add_argument("--top", type=int, default=5, help="Number of best profiles to show")
+    parser.add_argument("--output", help="Write the best profile as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.profiles:
+        with open(args.profiles, encoding="utf-8") as f:
+            candidates = profile_array(json.load(f))
+    else:
+        candidates = random_profiles(args.random, seed=args.seed)
+    # The current weights are always evaluated first, as the baseline
+    weights = np.concatenate([profile_array([positional_weights]), candidates])
+
+    registry = TeamRegistry()
+    start = time.perf_counter()
+    results = evaluate_weight_profiles(weights, folds=args.folds, registry=registry)
+    elapsed = time.perf_counter() - start
+    for line in registry.report():
+        print(line)
+    print(f"Evaluated {len(weights)} profiles in {elapsed:.2f}s")
+    print(f"Current weights: accuracy {results['accuracy'][0]:.3f}")
+
+    order = np.argsort(-results['accuracy'][1:], kind='stable')[:args.top] + 1
+    for rank, p in enumerate(order, start=1):
+        top_players = impact_ranking(results, p).head(3)
+        names = ", ".join(f"{r['Player Name']} ({r['Team']}) {r['Impact']:.1f}" for _, r in top_players.iterrows())
+        print(f"#{rank} profile {p}: accuracy {results['accuracy'][p]:.3f} | top Impact: {names}")
+    if args.output and len(order):
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(profile_dict(results['weights'][order[0]]), f, indent=2)
+        print(f"Best profile saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""Parsed rows of every saved real page equal the committed Dataset/ and ML/ rows."""
+import pytest
+from Collection.fixtures import FIXTURE_NAMES, captured, compare
+
+CAPTURED = captured()
+
+
+@pytest.mark.parametrize("name", FIXTURE_NAMES)
+def test_fixture_matches_scraped_rows(name):
+    if name not in CAPTURED:
+        pytest.skip(f"{name} not captured yet: python -m Collection.fixtures capture {name}")
+    assert compare(name) == []
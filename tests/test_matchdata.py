@@ -0,0 +1,41 @@
+import time
+import pytest
+from Collection import engine
+from Collection.engine import PageTimeout
+from ML import matchdata
+
+
+class NeverReadyDriver:
+    # A match page whose results never render
+    page_source = "<html>partial</html>"
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script):
+        return False
+
+
+@pytest.fixture
+def deadline():
+    def set_deadline(seconds):
+        engine._local.deadline = time.monotonic() + seconds
+    yield set_deadline
+    engine._local.deadline = None
+
+
+def test_unplayed_match_returns_the_page(monkeypatch):
+    monkeypatch.setattr(matchdata, "MATCH_PAGE_TIMEOUT", 0.3)
+    assert matchdata.load_match_page(NeverReadyDriver(), "https://example.com/m") == "<html>partial</html>"
+
+
+def test_wait_cut_short_by_the_page_budget_raises_page_timeout(deadline):
+    deadline(0.3)
+    with pytest.raises(PageTimeout):
+        matchdata.load_match_page(NeverReadyDriver(), "https://example.com/m")
+
+
+def test_spent_page_budget_raises_page_timeout(deadline):
+    deadline(-1)
+    with pytest.raises(PageTimeout):
+        matchdata.load_match_page(NeverReadyDriver(), "https://example.com/m")
@@ -0,0 +1,32 @@
+from Collection.merge import merge_stats
+
+CONFIGS = [{"name": "blocking", "columns_to_keep": ["Player Name", "Team", "Blocks", "Blocks Per Match"]},
+           {"name": "serving", "columns_to_keep": ["Player Name", "Team", "Aces", "Serves Per Match"]}]
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+
+
+def test_players_sharing_a_key_keep_their_own_profile_rows(tmp_path):
+    write(tmp_path / "player_profiles.csv", "Player Name,Team,Position,Age,Height\n"
+          "Petkov,BUL,MIDDLE BLOCKER,28,200cm\nYant,CUB,OUTSIDE HITTER,24,204cm\nPetkov,BUL,OPPOSITE,21,207cm\n")
+    write(tmp_path / "blocking_stats.csv", "Player Name,Team,Blocks,Blocks Per Match\nPetkov,BUL,11,0.92\n")
+    write(tmp_path / "serving_stats.csv", "Player Name,Team,Aces,Serves Per Match\nYant,CUB,9,0.69\nPetkov,BUL,1,0.08\n")
+    merged = merge_stats(str(tmp_path), CONFIGS)
+    petkov = merged[merged["Player Name"] == "Petkov"]
+    assert list(petkov["Position"]) == ["MIDDLE BLOCKER", "OPPOSITE"]
+    assert list(petkov["Age"]) == [28, 21]
+    assert list(petkov["Blocks"]) == [11, 11] and list(petkov["Aces"]) == [1, 1]
+    assert list(merged["Player Name"]) == ["Petkov", "Petkov", "Yant"]
+    assert merged.loc[merged["Player Name"] == "Yant", "Blocks"].tolist() == [0]
+    assert merged.attrs["repeated_profiles"] == [("Petkov", "BUL", 2)]
+    assert merged.attrs["duplicate_keys"] == {}
+
+
+def test_key_repeated_in_a_stat_file_is_left_out_and_reported(tmp_path):
+    write(tmp_path / "player_profiles.csv", "Player Name,Team,Position,Age,Height\nPetkov,BUL,MIDDLE BLOCKER,28,200cm\n")
+    write(tmp_path / "blocking_stats.csv", "Player Name,Team,Blocks,Blocks Per Match\nPetkov,BUL,11,0.92\nPetkov,BUL,3,0.2\n")
+    merged = merge_stats(str(tmp_path), CONFIGS[:1])
+    assert merged["Position"].tolist() == ["MIDDLE BLOCKER"] and merged["Blocks"].tolist() == [0]
+    assert merged.attrs["duplicate_keys"] == {"blocking_stats.csv": [("Petkov", "BUL", 2)]}
@@ -0,0 +1,36 @@
+import time
+import numpy as np
+import pandas as pd
+from ML import online
+from ML.ml import MATCH_FILE, load_team_features
+
+STORE = load_team_features()
+PLAYED = pd.read_csv(MATCH_FILE).dropna(subset=['Winner'])
+
+
+def test_online_models_stay_within_tolerance_of_the_refit():
+    state = online.new_state(STORE)
+    rows, dates = online.new_rows(state, STORE, PLAYED)
+    for date in sorted(set(dates)):
+        online.learn(state, {key: values[dates == date] for key, values in rows.items()})
+    state['seen'].update(online.match_keys(PLAYED))
+    result = online.refit_check(state, STORE, PLAYED, tolerance=0.05)
+    assert result['within_tolerance'] and not result['anchored']
+
+
+def test_update_cost_stays_flat_as_history_grows():
+    # The season replayed 6 times (~700 matches, 120 match days) against a replay of 64 rows
+    state = online.new_state(STORE, replay_size=64)
+    rows, dates = online.new_rows(state, STORE, PLAYED)
+    days = sorted(set(dates))
+    trained, timings = [], []
+    for season in range(6):
+        for date in days:
+            day = {key: values[dates == date] for key, values in rows.items()}
+            start = time.perf_counter()
+            trained.append(online.learn(state, day) - len(day['y']))
+            timings.append(time.perf_counter() - start)
+    assert len(state['replay']['y']) == 64 and state['offered'] == 6 * len(dates)
+    assert max(trained) == 64 and trained[-len(days):] == [64] * len(days)
+    early, late = np.median(timings[len(days):2 * len(days)]), np.median(timings[-len(days):])
+    assert late < 2 * early
@@ -0,0 +1,44 @@
+from Collection.tableparser import parse_html, parse_match_page, parse_stat_table
+
+
+def test_text_skips_hidden_descendants():
+    cell = parse_html(
+        '<td>Yant<span style="display: none">Yant Herrera</span><span hidden>x</span>'
+        '<i style="visibility:hidden">y</i><script>z</script> CUB</td>'
+    ).find("td")
+    assert cell.text() == "Yant CUB"
+
+
+def test_stat_table_cells_ignore_hidden_labels():
+    html = (
+        '<table class="vbw-o-table vbw-tournament-player-statistic-table vbw-stats-scorers"><tbody>'
+        '<tr><td class="playername"><span class="d-none" style="display:none">Long Name</span>Yant</td>'
+        '<td class="federation">CUB</td><td class="kills"><span hidden>Kills</span>219</td></tr>'
+        '</tbody></table>'
+    )
+    rows = parse_stat_table(html, {"playername": "Player Name", "federation": "Team", "kills": "Kills"},
+                            ["Player Name", "Team", "Kills"])
+    assert rows == {("Yant", "CUB"): {"Player Name": "Yant", "Team": "CUB", "Kills": "219"}}
+
+
+MATCH_PAGE = """
+<div class="vbw-mu__team vbw-mu__team--home">
+  <div class="vbw-mu__team__name">Italy</div><div class="vbw-mu__team__name vbw-mu__team__name--abbr">ITA</div>
+</div>
+<div class="vbw-mu__score vbw-mu__score--home winner">3</div>
+<div class="vbw-mu__score vbw-mu__score--away">0</div>
+<div class="vbw-mu__team vbw-mu__team--away">
+  <div class="vbw-mu__team__name vbw-mu__team__name--abbr">BRA</div><div class="vbw-mu__team__name">Brazil</div>
+</div>
+"""
+
+
+def test_match_teams_use_full_names_like_the_csv():
+    page = parse_match_page(MATCH_PAGE, [])
+    assert (page["home"], page["away"], page["winner"], page["loser"]) == ("Italy", "Brazil", "Italy", "Brazil")
+
+
+def test_match_team_falls_back_to_abbreviation():
+    page = parse_match_page('<div class="vbw-mu_team vbw-mu_team--home">'
+                            '<span class="vbw-mu_team_name vbw-mu_team_name--abbr">ITA</span></div>', [])
+    assert page["home"] == "ITA"